@@ -0,0 +1,94 @@
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools import access_index  # pylint: disable=wrong-import-position
+from tools.access_index import AccessIndex, IndexQuery, key_prefixes  # pylint: disable=wrong-import-position
+from tools.access_records import split_resource  # pylint: disable=wrong-import-position
+from tools.generate_fixtures import GeneratorConfig, build_exceptions, build_manifest, iter_traffic  # pylint: disable=wrong-import-position
+
+
+def _traffic(records: int, seed: int = 3) -> List[Dict[str, Any]]:
+    config = GeneratorConfig(seed=seed, buckets=2, exceptions=6, records=records, days=5)
+    return list(iter_traffic(config, build_manifest(config), build_exceptions(config)))
+
+
+def _write(path: Path, records: List[Dict[str, Any]], mode: str = "w") -> None:
+    with path.open(mode, encoding="utf-8") as handle:
+        handle.writelines(json.dumps(record) + "\n" for record in records)
+
+
+def _ids(records) -> List[str]:
+    return sorted(record["id"] for record in records)
+
+
+def test_queries_match_a_full_scan(tmp_path: Path) -> None:
+    traffic = _traffic(3000)
+    for record in traffic[::7]:
+        del record["secureTransport"]  # absent means TLS, as in the evaluator
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    _write(logs / "traffic.ndjson", traffic)
+
+    with AccessIndex(tmp_path / "index") as index:
+        summary = index.ingest([logs], segment_records=700)
+        assert summary == {"sources": 1, "indexed": 3000, "records": 3000}
+        assert len(index.manifest["partitions"]) == 5
+
+        denied = next(record for record in traffic if record["expected"] == "Deny")
+        start, end = datetime(2025, 1, 2, tzinfo=timezone.utc), datetime(2025, 1, 4, 12, tzinfo=timezone.utc)
+        query = IndexQuery(principal=denied["principalArn"], effect="Deny", start=start, end=end)
+        results = list(index.query(query))
+        expected = [
+            record
+            for record in traffic
+            if record["principalArn"] == denied["principalArn"]
+            and record["expected"] == "Deny"
+            and start <= datetime.fromisoformat(record["eventTime"].replace("Z", "+00:00")) < end
+        ]
+        assert _ids(results) == _ids(expected)
+        assert [record["eventTime"] for record in results] == sorted(record["eventTime"] for record in results)
+
+        key = split_resource(next(record["resource"] for record in traffic if "/" in split_resource(record["resource"])[1]))[1]
+        for prefix in (key_prefixes(key)[0], key[: len(key_prefixes(key)[0]) + 2]):
+            results = list(index.query(IndexQuery(prefix=prefix, action="s3:GetObject")))
+            expected = [
+                record
+                for record in traffic
+                if split_resource(record["resource"])[1].startswith(prefix) and record["action"] == "s3:GetObject"
+            ]
+            assert results and _ids(results) == _ids(expected)
+        assert list(index.query(IndexQuery(principal="arn:aws:iam::000000000000:role/Nobody"))) == []
+
+        stored = {record["id"]: record["secureTransport"] for record in index.query(IndexQuery())}
+        assert stored == {record["id"]: record.get("secureTransport", True) for record in traffic}
+
+
+def test_ingest_is_incremental(tmp_path: Path, capsys) -> None:
+    traffic = _traffic(400)
+    log = tmp_path / "traffic.ndjson"
+    _write(log, traffic[:250])
+    with log.open("a", encoding="utf-8") as handle:
+        handle.write(json.dumps(traffic[250])[:20])  # partial line still being written
+
+    argv = ["--index", str(tmp_path / "index"), "--json", "build", str(log)]
+    assert access_index.main(argv) == 0
+    assert json.loads(capsys.readouterr().out)["indexed"] == 250
+
+    _write(log, traffic, mode="w")
+    _write(tmp_path / "more.json", traffic[:10])
+    assert access_index.main(argv + [str(tmp_path / "more.json")]) == 0
+    assert json.loads(capsys.readouterr().out)["indexed"] == 160
+
+    assert access_index.main(argv + [str(tmp_path / "more.json")]) == 0
+    assert json.loads(capsys.readouterr().out) == {"sources": 2, "indexed": 0, "records": 410, "status": "success"}
+
+    assert access_index.main(["--index", str(tmp_path / "index"), "--json", "query", "--count", "--effect", "Deny"]) == 0
+    denies = sum(record["expected"] == "Deny" for record in traffic + traffic[:10])
+    assert json.loads(capsys.readouterr().out) == {"count": denies}
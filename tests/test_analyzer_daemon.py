@@ -0,0 +1,167 @@
+import asyncio
+import gzip
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from test_policy_enforcement import load_sample_requests, strip_general_allow  # pylint: disable=wrong-import-position
+from tools.access_records import iter_records, normalize_event  # pylint: disable=wrong-import-position
+from tools.analyzer_daemon import (  # pylint: disable=wrong-import-position
+    AnalyzerDaemon,
+    DirectoryTailer,
+    FileSink,
+    ScoringSink,
+    WebhookSink,
+    WebhookStub,
+)
+from tools.evaluate_policy import CompiledPolicy  # pylint: disable=wrong-import-position
+from tools.risk_scoring import RiskScorer, load_scorer  # pylint: disable=wrong-import-position
+from tools.merge_policy import (  # pylint: disable=wrong-import-position
+    _ensure_variables,
+    load_exceptions,
+    load_policy,
+    merge_policies,
+)
+
+POLICIES_DIR = PROJECT_ROOT / "policies"
+CLOUDTRAIL_EVENT = {
+    "eventID": "evt-1",
+    "eventTime": "2025-01-01T00:00:00Z",
+    "eventSource": "s3.amazonaws.com",
+    "eventName": "ListObjectsV2",
+    "userIdentity": {"type": "AssumedRole", "accountId": "999999999999", "arn": "arn:aws:sts::999999999999:assumed-role/External/s"},
+    "requestParameters": {"bucketName": "example-data-perimeter-bucket"},
+    "vpcEndpointId": "vpce-00000000000000000",
+    "tlsDetails": {"tlsVersion": "TLSv1.2"},
+}
+
+
+@pytest.fixture(scope="module")
+def policy() -> CompiledPolicy:
+    variables = _ensure_variables(
+        {"BucketName": "example-data-perimeter-bucket", "OrgId": "o-exampleorg", "VpcEndpointId": "vpce-00000000000000000"}
+    )
+    exceptions = load_exceptions(POLICIES_DIR / "bucket-policy.exceptions.json", current_date=date(2025, 1, 1))
+    merged = merge_policies(load_policy(POLICIES_DIR / "bucket-policy.base.json"), exceptions, variables).policy
+    return CompiledPolicy.compile(strip_general_allow(merged))
+
+
+async def _iterate(records: Iterable[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+    for record in records:
+        yield record
+
+
+def _expected_denies(policy: CompiledPolicy, records: Iterable[Dict[str, Any]]) -> List[str]:
+    return [record["id"] for record in records if not policy.is_allowed(record)]
+
+
+def test_cloudtrail_events_are_normalized(tmp_path: Path, policy: CompiledPolicy) -> None:
+    record = normalize_event(CLOUDTRAIL_EVENT, {"999999999999": "o-otherorg"})
+    assert record["action"] == "s3:ListBucket"
+    assert record["resource"] == "arn:aws:s3:::example-data-perimeter-bucket"
+    assert record["principalOrgId"] == "o-otherorg"
+    assert record["secureTransport"] is True and record["observed"] == "Allow"
+    assert policy.decide(record).sid == "DenyRequestsOutsideOrganization"
+
+    delivery = tmp_path / "delivery.json.gz"
+    with gzip.open(delivery, "wt", encoding="utf-8") as handle:
+        json.dump({"Records": [CLOUDTRAIL_EVENT, {"eventName": "GetObject"}]}, handle)
+    assert [item["id"] for item in iter_records(delivery)] == ["evt-1"]
+
+
+def test_daemon_applies_backpressure_and_batches_alerts(tmp_path: Path, policy: CompiledPolicy) -> None:
+    records = list(load_sample_requests()) * 50
+    alerts_path = tmp_path / "alerts.ndjson"
+    daemon = AnalyzerDaemon({None: policy}, FileSink(alerts_path), queue_size=4, workers=2, batch_size=16, flush_interval=0.05)
+
+    summary = asyncio.run(daemon.run(_iterate(records)))
+
+    findings = [json.loads(line) for line in alerts_path.read_text(encoding="utf-8").splitlines()]
+    assert sorted(item["requestId"] for item in findings) == sorted(_expected_denies(policy, records))
+    assert {item["ruleId"] for item in findings} >= {"S3-GUARD-001", "S3-GUARD-002"}
+    assert summary["evaluated"] == len(records)
+    assert summary["alerts"] == len(findings)
+    assert summary["queueDepth"]["eventsMax"] <= 4
+    assert summary["batches"] >= len(findings) // 16
+
+
+class _FailingPolicy:
+    """Delegates to ``policy`` but raises for records whose id starts with ``bad``."""
+
+    def __init__(self, policy: CompiledPolicy) -> None:
+        self.policy = policy
+
+    def decide(self, record: Dict[str, Any]) -> Any:
+        if str(record.get("id")).startswith("bad"):
+            raise TypeError("unhashable type: 'dict'")
+        return self.policy.decide(record)
+
+
+def test_daemon_survives_records_that_fail_evaluation(tmp_path: Path, policy: CompiledPolicy) -> None:
+    records = list(load_sample_requests())
+    bad = [dict(records[0], id=f"bad-{index}") for index in range(5)]
+    odd = [dict(records[0], id="dict-principal", principalArn={"AWS": "*"})]
+    daemon = AnalyzerDaemon({None: _FailingPolicy(policy)}, FileSink(tmp_path / "alerts.ndjson"), workers=2, flush_interval=0.05)
+
+    summary = asyncio.run(asyncio.wait_for(daemon.run(_iterate(bad + records + odd)), timeout=10))
+
+    assert summary["invalid"] == len(bad)
+    assert summary["evaluated"] == len(records) + len(odd)
+    assert summary["alerts"] == len(_expected_denies(policy, records + odd))
+
+
+def test_scoring_sink_scores_each_delivered_batch_once(tmp_path: Path, policy: CompiledPolicy) -> None:
+    records = list(load_sample_requests()) * 3
+    expected = len(_expected_denies(policy, records))
+    for state, interval in ((tmp_path / "risk.state", 30.0), (tmp_path / "alerts.ndjson" / "risk.state", 0.0)):
+        alerts = tmp_path / "alerts.ndjson"
+        alerts.unlink(missing_ok=True)
+        sink = ScoringSink(FileSink(alerts), RiskScorer(), state, checkpoint_interval=interval)
+        daemon = AnalyzerDaemon({None: policy}, sink, batch_size=4, flush_interval=0.05)
+
+        summary = asyncio.run(daemon.run(_iterate(records)))
+
+        # An unwritable checkpoint (the second pass nests it under a file) must not turn into a sink retry.
+        assert summary["sinkErrors"] == 0 and summary["alerts"] == expected
+        assert len(alerts.read_text(encoding="utf-8").splitlines()) == expected
+        assert sink.scorer.observed == expected
+        if interval:
+            assert sink.checkpoint_errors == 0 and load_scorer(state).observed == expected
+        else:
+            assert sink.checkpoint_errors == summary["batches"] + 1 and not state.exists()
+
+
+def test_directory_tail_feeds_webhook_sink(tmp_path: Path, policy: CompiledPolicy) -> None:
+    records = list(load_sample_requests())
+    log = tmp_path / "events.ndjson"
+    lines = [json.dumps(record) for record in records]
+    log.write_text("\n".join(lines[:-1]) + "\n" + lines[-1][:10], encoding="utf-8")
+
+    async def scenario() -> Dict[str, Any]:
+        stub = WebhookStub()
+        host, port = await stub.start()
+        tailer = DirectoryTailer(tmp_path, once=True)
+        try:
+            first = [record async for record in tailer.records()]
+            assert len(first) == len(records) - 1
+            log.write_text("\n".join(lines) + "\n", encoding="utf-8")
+            second = [record async for record in tailer.records()]
+            assert [record["id"] for record in second] == [records[-1]["id"]]
+
+            daemon = AnalyzerDaemon({None: policy}, WebhookSink(f"http://{host}:{port}/alerts"), batch_size=2, flush_interval=0.05)
+            summary = await daemon.run(DirectoryTailer(tmp_path, once=True).records())
+        finally:
+            await stub.close()
+        assert stub.received == summary["alerts"] == len(_expected_denies(policy, records))
+        assert all(len(batch) <= 2 for batch in stub.batches)
+        return summary
+
+    assert asyncio.run(scenario())["sinkErrors"] == 0
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from test_policy_enforcement import load_sample_requests, strip_general_allow  # pylint: disable=wrong-import-position
+from tools.enforcement_proxy import (  # pylint: disable=wrong-import-position
+    METRICS_PATH,
+    EnforcementProxy,
+    http_to_request,
+    request_to_http,
+)
+from tools.load_driver import cross_account_scenarios, prepare_requests, run_load  # pylint: disable=wrong-import-position
+from tools.merge_policy import (  # pylint: disable=wrong-import-position
+    _ensure_variables,
+    load_exceptions,
+    load_policy,
+    merge_policies,
+)
+
+POLICIES_DIR = PROJECT_ROOT / "policies"
+
+
+@pytest.fixture(scope="module")
+def policy() -> Dict[str, Any]:
+    variables = _ensure_variables(
+        {"BucketName": "example-data-perimeter-bucket", "OrgId": "o-exampleorg", "VpcEndpointId": "vpce-00000000000000000"}
+    )
+    exceptions = load_exceptions(POLICIES_DIR / "bucket-policy.exceptions.json", current_date=date(2025, 1, 1))
+    merged = merge_policies(load_policy(POLICIES_DIR / "bucket-policy.base.json"), exceptions, variables).policy
+    return strip_general_allow(merged)
+
+
+def test_http_mapping_round_trips_fixture_requests() -> None:
+    for record in load_sample_requests():
+        method, target, headers = request_to_http(record)
+        _, request = http_to_request(method, target, headers)
+        for key in ("principalOrgId", "principalArn", "sourceVpce", "action", "resource", "secureTransport", "isAnonymous"):
+            assert request[key] == record[key], key
+
+
+def test_load_run_enforces_policy(policy: Dict[str, Any]) -> None:
+    async def scenario() -> Dict[str, Any]:
+        proxy = EnforcementProxy(policy)
+        host, port = await proxy.start("127.0.0.1", 0)
+        try:
+            records = list(load_sample_requests()) + cross_account_scenarios()
+            prepared = prepare_requests(records, f"{host}:{port}")
+            report = await run_load(f"http://{host}:{port}", prepared, total=500, concurrency=8)
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET {METRICS_PATH} HTTP/1.1\r\nconnection: close\r\n\r\n".encode("latin-1"))
+            raw = await reader.read()
+            writer.close()
+            return {"report": report.to_json(), "metrics": json.loads(raw.split(b"\r\n\r\n", 1)[1])}
+        finally:
+            await proxy.close()
+
+    result = asyncio.run(scenario())
+    assert result["report"]["sent"] == 500
+    assert result["report"]["mismatches"] == {}
+    assert result["report"]["errors"] == 0
+    assert result["metrics"]["requests"] == 500
+    assert set(result["metrics"]["decisions"]) == {"Allow", "Deny"}
+
+
+def test_unknown_bucket_and_operation_rejected(policy: Dict[str, Any]) -> None:
+    proxy = EnforcementProxy(policy)
+    assert proxy.handle("GET", "/other-bucket/key", {})[0] == 404
+    assert proxy.handle("POST", "/example-data-perimeter-bucket/key", {})[0] == 400
+
+    async def send(head: bytes) -> bytes:
+        host, port = await proxy.start("127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(head)
+            response = await reader.read()
+            writer.close()
+            return response
+        finally:
+            await proxy.close()
+
+    for length in (b"abc", b"-5"):
+        response = asyncio.run(send(b"GET /example-data-perimeter-bucket/key HTTP/1.1\r\ncontent-length: " + length + b"\r\n\r\n"))
+        assert response.startswith(b"HTTP/1.1 400 ")
@@ -0,0 +1,78 @@
+import random
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, Mapping
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from test_policy_enforcement import evaluate_access, load_sample_requests  # pylint: disable=wrong-import-position
+from tools import differential_check  # pylint: disable=wrong-import-position
+from tools.evaluate_policy import (  # pylint: disable=wrong-import-position
+    EVALUATORS,
+    CompiledPolicy,
+    evaluate_reference,
+)
+from tools.merge_policy import (  # pylint: disable=wrong-import-position
+    _ensure_variables,
+    load_exceptions,
+    load_policy,
+    merge_policies,
+)
+
+POLICIES_DIR = PROJECT_ROOT / "policies"
+
+
+@pytest.fixture(scope="module")
+def merged_policy() -> Dict[str, Any]:
+    variables = _ensure_variables(
+        {"BucketName": "example-data-perimeter-bucket", "OrgId": "o-exampleorg", "VpcEndpointId": "vpce-00000000000000000"}
+    )
+    exceptions = load_exceptions(POLICIES_DIR / "bucket-policy.exceptions.json", current_date=date(2025, 1, 1))
+    return merge_policies(load_policy(POLICIES_DIR / "bucket-policy.base.json"), exceptions, variables).policy
+
+
+def test_compiled_decisions_match_fixtures(merged_policy: Dict[str, Any]) -> None:
+    compiled = CompiledPolicy.compile(merged_policy)
+    for request in load_sample_requests():
+        assert compiled.is_allowed(request) == evaluate_access(merged_policy, request)
+        assert evaluate_reference(merged_policy, request) == evaluate_access(merged_policy, request)
+
+
+def test_decision_reports_deciding_statement(merged_policy: Dict[str, Any]) -> None:
+    compiled = CompiledPolicy.compile(merged_policy)
+    requests = {entry["id"]: entry for entry in load_sample_requests()}
+    assert compiled.decide(requests["org_mismatch"]).sid == "DenyRequestsOutsideOrganization"
+    assert compiled.matching_allow_sids(requests["exception_allowed"]) == ["AllowException1", "AllowOrgAccessViaVpce"]
+
+
+def test_reference_matches_test_harness_on_random_cases() -> None:
+    rng = random.Random(11)
+    for _ in range(2000):
+        policy = differential_check.random_policy(rng)
+        request = differential_check.random_request(rng)
+        assert evaluate_reference(policy, request) == evaluate_access(policy, request)
+
+
+def test_differential_run_finds_no_disagreement() -> None:
+    result = differential_check.run_differential("compiled", 20000, seed=5, chunk_size=5000)
+    assert result.cases == 20000
+    assert result.counterexamples == []
+
+
+def test_disagreement_is_shrunk_to_minimal_case(monkeypatch: pytest.MonkeyPatch) -> None:
+    def ignore_conditions(policy: Mapping[str, Any]) -> Any:
+        stripped = {"Statement": [{k: v for k, v in stmt.items() if k != "Condition"} for stmt in policy["Statement"]]}
+        return CompiledPolicy.compile(stripped).is_allowed
+
+    monkeypatch.setitem(EVALUATORS, "broken", ignore_conditions)
+    result = differential_check.run_differential("broken", 5000, seed=1, max_failures=1)
+    assert result.counterexamples
+    example = result.counterexamples[0]
+    assert len(example.policy["Statement"]) == 1
+    assert "Condition" in example.policy["Statement"][0]
+    assert example.reference != example.candidate
@@ -0,0 +1,130 @@
+import gzip
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools import exception_usage  # pylint: disable=wrong-import-position
+from tools.evaluate_policy import CompiledPolicy  # pylint: disable=wrong-import-position
+from tools.exception_usage import UsageCollector, UsageState, exception_sids  # pylint: disable=wrong-import-position
+from tools.merge_policy import ExceptionEntry, _ensure_variables, load_policy, merge_policies  # pylint: disable=wrong-import-position
+from tools.sketches import CountMinSketch, HyperLogLog  # pylint: disable=wrong-import-position
+
+POLICIES_DIR = PROJECT_ROOT / "policies"
+BUCKET = "example-data-perimeter-bucket"
+VARIABLES = _ensure_variables({"BucketName": BUCKET, "OrgId": "o-exampleorg", "VpcEndpointId": "vpce-1"})
+PARTNER = "arn:aws:iam::123456789012:role/Partner"
+EXCEPTIONS = [
+    ExceptionEntry("exc-partner", PARTNER, ("s3:GetObject",), "partner/*", date(2026, 1, 31), "analytics"),
+    ExceptionEntry("exc-idle", "arn:aws:iam::123456789012:role/Idle", ("s3:PutObject",), "idle/*", date(2026, 1, 31), "idle"),
+]
+
+
+def _request(principal: str, key: str, org_id: str = "o-exampleorg", **extra: Any) -> Dict[str, Any]:
+    record = {
+        "principalOrgId": org_id,
+        "principalArn": principal,
+        "sourceVpce": "vpce-1",
+        "action": "s3:GetObject",
+        "resource": f"arn:aws:s3:::{BUCKET}/{key}",
+        "secureTransport": True,
+        "isAnonymous": False,
+        "eventTime": "2025-06-01T12:00:00Z",
+    }
+    record.update(extra)
+    return record
+
+
+def _collect(records: List[Dict[str, Any]]) -> UsageState:
+    policy = merge_policies(load_policy(POLICIES_DIR / "bucket-policy.base.json"), EXCEPTIONS, VARIABLES).policy
+    state = UsageState()
+    collector = UsageCollector(CompiledPolicy.compile(policy), exception_sids(EXCEPTIONS, VARIABLES), state)
+    for record in records:
+        collector.observe(record)
+    return state
+
+
+def test_sketches_estimate_and_merge() -> None:
+    left, right = HyperLogLog(12), HyperLogLog(12)
+    for index in range(6000):
+        (left if index % 2 else right).add(f"key-{index}")
+        left.add(f"key-{index % 100}")
+    left.merge(HyperLogLog.from_json(json.loads(json.dumps(right.to_json()))))
+    assert abs(left.estimate() - 6000) < 6000 * 0.05
+
+    counts = CountMinSketch(width=256, depth=4)
+    for index in range(2000):
+        counts.add(f"item-{index % 50}")
+    restored = CountMinSketch.from_json(counts.to_json())
+    restored.merge(counts)
+    assert all(restored.estimate(f"item-{index}") >= 80 for index in range(50))
+    assert restored.total == 4000
+
+
+def test_usage_attributes_allowed_requests_to_exceptions() -> None:
+    records = [_request(PARTNER, f"partner/file-{index % 30}.csv", sessionArn=f"{PARTNER}/s{index % 3}") for index in range(200)]
+    records.append(_request(PARTNER, "partner/outside-org.csv", org_id="o-otherorg"))
+    records.append(_request("arn:aws:iam::123456789012:role/Other", "partner/file-1.csv"))
+
+    state = _collect(records)
+    rows = {row["id"]: row for row in state.report(date(2025, 7, 1), principal=PARTNER)}
+
+    partner = rows["exc-partner"]
+    assert partner["hits"] == 200
+    assert partner["exclusiveHits"] == 0  # AllowOrgAccessViaVpce also admits in-org callers
+    assert partner["status"] == "redundant"
+    assert partner["distinctPrincipals"] == 3
+    assert 28 <= partner["distinctKeys"] <= 32
+    assert partner["estimatedHits"] >= 200
+    assert partner["daysToExpiry"] == 214
+    assert rows["exc-idle"]["status"] == "unused"
+    assert state.records == 202 and state.allowed == 201 and state.attributed == 200
+
+
+def test_usage_state_files_merge(tmp_path: Path, capsys) -> None:
+    first, second = _collect([_request(PARTNER, "partner/a")]), _collect([_request(PARTNER, "partner/b")] * 2)
+    exception_usage.save_state(first, tmp_path / "first.json")
+    exception_usage.save_state(second, tmp_path / "second.json")
+    combined = tmp_path / "combined.json"
+
+    assert exception_usage.main(["--state", str(combined), "merge", str(tmp_path / "first.json"), str(tmp_path / "second.json")]) == 0
+    capsys.readouterr()
+    assert exception_usage.main(["--state", str(combined), "--now", "2025-07-01", "--json", "report", "--day", "2025-06-01"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    partner = next(row for row in report["exceptions"] if row["id"] == "exc-partner")
+    assert partner["hits"] == 3 and partner["distinctKeys"] == 2 and partner["estimatedHits"] >= 3
+    assert combined.stat().st_size < 16 * 1024
+
+
+def test_ingest_skips_log_data_already_consumed(tmp_path: Path, capsys) -> None:
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    (logs / "batch.json").write_text(json.dumps([_request(PARTNER, "partner/a"), _request(PARTNER, "partner/b")]))
+    tailed = logs / "tail.ndjson"
+    tailed.write_text(json.dumps(_request(PARTNER, "partner/c")) + "\n" + json.dumps(_request(PARTNER, "partner/d"))[:20])
+    exceptions = tmp_path / "exceptions.json"
+    exceptions.write_text(json.dumps({"Exceptions": [entry.to_json() for entry in EXCEPTIONS]}))
+    state = tmp_path / "usage.json"
+    argv = ["--state", str(state), "--now", "2025-07-01", "--json", "ingest", str(logs), "--exceptions", str(exceptions)]
+    argv += ["--vars", f"BucketName={BUCKET}", "OrgId=o-exampleorg", "VpcEndpointId=vpce-1"]
+
+    ingested = []
+    for append in ("", json.dumps(_request(PARTNER, "partner/d"))[20:] + "\n", ""):
+        with tailed.open("a", encoding="utf-8") as handle:
+            handle.write(append)
+        assert exception_usage.main(argv) == 0
+        ingested.append(json.loads(capsys.readouterr().out)["records"])
+    assert ingested == [3, 1, 0]
+
+    assert exception_usage.main(["--state", str(state), "--now", "2025-07-01", "--json", "report"]) == 0
+    partner = next(row for row in json.loads(capsys.readouterr().out)["exceptions"] if row["id"] == "exc-partner")
+    assert partner["hits"] == 4 and partner["distinctKeys"] == 4
+
+    (logs / "truncated.json.gz").write_bytes(gzip.compress(json.dumps([_request(PARTNER, "partner/e")] * 50).encode())[:60])
+    assert exception_usage.main(argv) == 2
+    assert json.loads(capsys.readouterr().out)["status"] == "error"
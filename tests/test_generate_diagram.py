@@ -0,0 +1,87 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools.generate_diagram import build_mermaid, group_exceptions, main, truncate_prefix  # pylint: disable=wrong-import-position
+from tools.generate_fixtures import GeneratorConfig, build_exceptions  # pylint: disable=wrong-import-position
+from tools.merge_policy import ExceptionEntry  # pylint: disable=wrong-import-position
+
+VARIABLES = {"OrgId": "o-exampleorg", "VpcEndpointId": "vpce-1", "BucketName": "bucket", "BucketArn": "arn:aws:s3:::bucket"}
+
+
+def synthetic_exceptions(count: int):
+    return [
+        ExceptionEntry(
+            identifier=item.identifier,
+            principal_arn=item.principal_arn,
+            actions=tuple(item.actions),
+            prefix=item.prefix,
+            expires_at=date(2099, 12, 31),
+            reason=item.reason,
+        )
+        for item in build_exceptions(GeneratorConfig(seed=2, exceptions=count))
+    ]
+
+
+def test_small_exception_sets_render_one_node_each() -> None:
+    exceptions = synthetic_exceptions(3)
+    diagram = build_mermaid({}, exceptions, VARIABLES, node_budget=10)
+    assert diagram.count("[Approved Exception: ") == 3
+    assert "    Exc1[Approved Exception: " in diagram
+
+
+def test_large_exception_sets_are_grouped_within_budget() -> None:
+    exceptions = synthetic_exceptions(500)
+    diagram = build_mermaid({}, exceptions, VARIABLES, node_budget=25)
+    groups = [line for line in diagram.splitlines() if "[Approved Exceptions: " in line]
+    assert 0 < len(groups) <= 25
+    assert "Exc1[" not in diagram
+    total = sum(int(line.rsplit("(", 1)[1].split()[0]) for line in groups)
+    assert total == 500
+
+
+def test_overflow_group_is_labelled_and_counts_distinct_principals() -> None:
+    exceptions = [("arn:aws:iam::111111111111:role/a", ("s3:GetObject",), f"team-{index}/*") for index in range(3)]
+    for account in ("222222222222", "333333333333"):
+        for role in ("a", "b", "a"):
+            exceptions.append((f"arn:aws:iam::{account}:role/{role}", ("s3:PutObject",), "drop/*"))
+    groups = group_exceptions(exceptions, node_budget=2, group_depth=1)
+    assert groups == [(("111111111111", "*", "*"), 3, 1), ((None, "*", "*"), 6, 4)]
+
+    entries = [{"principalArn": principal, "actions": list(actions), "prefix": prefix} for principal, actions, prefix in exceptions]
+    diagram = build_mermaid({}, entries, VARIABLES, node_budget=2)
+    assert "ExcGroup2[Approved Exceptions: other accounts (4 principals)] -->|Allow * on * (6 exceptions)| Policy" in diagram
+
+
+def test_truncate_prefix() -> None:
+    assert truncate_prefix("team-a/reports/2024/*", 2) == "team-a/reports/*"
+    assert truncate_prefix("team-a/*", 2) == "team-a/*"
+    assert truncate_prefix("team-a/report.csv", 2) == "team-a/report.csv"
+    assert truncate_prefix("team-a/*", 0) == "*"
+
+
+def test_cli_streams_diagram_without_base_policy(tmp_path: Path) -> None:
+    out = tmp_path / "diagram.mmd"
+    exit_code = main(
+        [
+            "--base",
+            str(tmp_path / "missing.json"),
+            "--exceptions",
+            str(PROJECT_ROOT / "policies" / "bucket-policy.exceptions.json"),
+            "--requests-dir",
+            str(PROJECT_ROOT / ".exception-requests"),
+            "--out",
+            str(out),
+            "--vars",
+            "BucketName=bucket,OrgId=o-exampleorg,VpcEndpointId=vpce-1",
+            "--now",
+            "2025-01-01",
+        ]
+    )
+    assert exit_code == 0
+    content = out.read_text(encoding="utf-8")
+    assert "PartnerReader" in content and "TeamADataConsumer" in content
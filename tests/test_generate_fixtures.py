@@ -0,0 +1,59 @@
+import json
+import sys
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from test_policy_enforcement import evaluate_access  # pylint: disable=wrong-import-position
+from tools.generate_fixtures import GeneratorConfig, generate  # pylint: disable=wrong-import-position
+from tools.merge_policy import (  # pylint: disable=wrong-import-position
+    _ensure_variables,
+    load_policy,
+    load_requests_directory,
+    merge_policies,
+)
+
+BASE_POLICY = PROJECT_ROOT / "policies" / "bucket-policy.base.json"
+
+
+def read_ndjson(path: Path) -> List[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle]
+
+
+def test_generated_dataset_matches_expected_outcomes(tmp_path: Path) -> None:
+    config = GeneratorConfig(seed=7, buckets=3, exceptions=12, records=600, deny_ratio=0.4)
+    summary = generate(config, tmp_path)
+    assert summary["records"] == 600
+
+    exceptions = load_requests_directory(tmp_path / "requests", date(2025, 1, 1))
+    assert len(exceptions) == 12
+
+    base_policy = load_policy(BASE_POLICY)
+    policies = {}
+    for variables in read_ndjson(tmp_path / "manifest.ndjson"):
+        merged = merge_policies(base_policy, exceptions, _ensure_variables(dict(variables)))
+        policies[variables["BucketArn"]] = merged.policy
+
+    records = read_ndjson(tmp_path / "traffic.ndjson")
+    outcomes = Counter()
+    for record in records:
+        bucket_arn = record["resource"].split("/", 1)[0]
+        allowed = evaluate_access(policies[bucket_arn], record)
+        assert ("Allow" if allowed else "Deny") == record["expected"], record
+        outcomes[record["expected"]] += 1
+    assert 0.3 < outcomes["Deny"] / len(records) < 0.5
+    assert {record["description"] for record in records} >= {"exception_allowed", "exception_prefix_miss"}
+
+
+def test_generation_is_deterministic_for_seed(tmp_path: Path) -> None:
+    config = GeneratorConfig(seed=3, exceptions=4, records=50)
+    generate(config, tmp_path / "first")
+    generate(config, tmp_path / "second")
+    for name in ("traffic.ndjson", "manifest.ndjson", "requests/exc-000001.json"):
+        assert (tmp_path / "first" / name).read_bytes() == (tmp_path / "second" / name).read_bytes()
@@ -0,0 +1,84 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from test_policy_enforcement import load_sample_requests  # pylint: disable=wrong-import-position
+from tools import differential_check, evaluate_policy, merge_policy, policy_artifact  # pylint: disable=wrong-import-position
+from tools.evaluate_policy import CompiledPolicy  # pylint: disable=wrong-import-position
+from tools.generate_fixtures import GeneratorConfig, generate  # pylint: disable=wrong-import-position
+from tools.policy_artifact import PolicyArtifact, PolicyArtifactError, load_artifact_for, policy_digest  # pylint: disable=wrong-import-position
+
+POLICIES_DIR = PROJECT_ROOT / "policies"
+VARS = ["BucketName=example-data-perimeter-bucket,OrgId=o-exampleorg,VpcEndpointId=vpce-00000000000000000"]
+
+
+def test_merge_writes_artifact_with_identical_decisions(tmp_path: Path, capsys) -> None:
+    out = tmp_path / "bucket-policy.merged.json"
+    argv = ["--base", str(POLICIES_DIR / "bucket-policy.base.json"), "--exceptions", str(POLICIES_DIR / "bucket-policy.exceptions.json")]
+    argv += ["--out", str(out), "--vars", *VARS, "--now", "2025-01-01", "--json", "--artifact"]
+    assert merge_policy.main(argv) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary["artifact"] == str(out.with_suffix(".bin"))
+
+    policy = json.loads(out.read_text())
+    compiled = CompiledPolicy.compile(policy)
+    with load_artifact_for(out) as artifact:
+        assert artifact.digest == policy_digest(policy)
+        for request in load_sample_requests():
+            assert artifact.decide(request) == compiled.decide(request)
+            assert artifact.matching_allow_sids(request) == compiled.matching_allow_sids(request)
+
+    requests = tmp_path / "requests.json"
+    requests.write_text(json.dumps(load_sample_requests()))
+    outputs = []
+    for source in (["--policy", str(out)], ["--artifact", str(out.with_suffix(".bin"))]):
+        evaluate_policy.main([*source, "--requests", str(requests), "--json"])
+        outputs.append(json.loads(capsys.readouterr().out)["details"])
+    assert outputs[0] == outputs[1]
+
+    # Same statements in another order: the fingerprint is equal but the first matching Sid can differ.
+    out.write_text(json.dumps(dict(policy, Statement=policy["Statement"][::-1])))
+    with pytest.raises(PolicyArtifactError, match="was built from policy"):
+        load_artifact_for(out)
+    assert merge_policy.main(argv + ["--skip-unchanged"]) == 0
+    assert json.loads(capsys.readouterr().out)["status"] == "unchanged"
+    with load_artifact_for(out) as artifact:
+        reordered = CompiledPolicy.compile(json.loads(out.read_text()))
+        assert all(artifact.decide(request) == reordered.decide(request) for request in load_sample_requests())
+
+    out.write_text(json.dumps(dict(policy, Statement=policy["Statement"][:-1])))
+    with pytest.raises(PolicyArtifactError, match="was built from policy"):
+        load_artifact_for(out)
+    assert merge_policy.main(argv + ["--skip-unchanged"]) == 0
+    assert json.loads(capsys.readouterr().out)["status"] == "success"
+    load_artifact_for(out).close()
+
+    artifact_bytes = bytearray(out.with_suffix(".bin").read_bytes())
+    artifact_bytes[-1] ^= 0xFF
+    out.with_suffix(".bin").write_bytes(bytes(artifact_bytes))
+    assert policy_artifact.main(["--json", "inspect", str(out.with_suffix(".bin"))]) == 2
+    assert "checksum mismatch" in json.loads(capsys.readouterr().out)["message"]
+
+
+def test_artifact_matches_compiled_on_large_and_random_policies(tmp_path: Path) -> None:
+    generate(GeneratorConfig(seed=4, buckets=1, exceptions=300, records=3000), tmp_path)
+    manifest = json.loads((tmp_path / "manifest.ndjson").read_text().splitlines()[0])
+    variables = merge_policy._ensure_variables(dict(manifest))  # pylint: disable=protected-access
+    exceptions = merge_policy.load_requests_directory(tmp_path / "requests", merge_policy._parse_date("2025-01-01"))  # pylint: disable=protected-access
+    policy = merge_policy.merge_policies(merge_policy.load_policy(POLICIES_DIR / "bucket-policy.base.json"), exceptions, variables).policy
+    compiled = CompiledPolicy.compile(policy)
+    policy_artifact.write_artifact(policy, tmp_path / "policy.bin")
+    with PolicyArtifact.open(tmp_path / "policy.bin") as artifact:
+        assert artifact.describe()["statements"] == len(policy["Statement"])
+        for line in (tmp_path / "traffic.ndjson").read_text().splitlines():
+            request = json.loads(line)
+            assert artifact.decide(request) == compiled.decide(request)
+
+    result = differential_check.run_differential("artifact", 10000, seed=9, chunk_size=5000)
+    assert result.cases == 10000 and result.counterexamples == []
@@ -0,0 +1,97 @@
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools import merge_policy  # pylint: disable=wrong-import-position
+from tools.merge_policy import deduplicate_statements  # pylint: disable=wrong-import-position
+from tools.policy_fingerprint import policy_fingerprint, statement_fingerprint  # pylint: disable=wrong-import-position
+
+STATEMENT = {
+    "Sid": "AllowPartner",
+    "Effect": "Allow",
+    "Principal": {"AWS": ["arn:aws:iam::1:role/A", "arn:aws:iam::2:role/B"]},
+    "Action": ["s3:GetObject", "s3:ListBucket"],
+    "Resource": "arn:aws:s3:::bucket/*",
+    "Condition": {
+        "StringEquals": {"aws:SourceVpce": ["vpce-2", "vpce-1"], "aws:PrincipalOrgID": "o-1"},
+        "Bool": {"aws:SecureTransport": True},
+    },
+}
+EQUIVALENT = {
+    "Condition": {
+        "Bool": {"aws:SecureTransport": "true"},
+        "StringEquals": {"aws:PrincipalOrgID": ["o-1"], "aws:SourceVpce": ["vpce-1", "vpce-2", "vpce-1"]},
+        "StringNotEquals": {},
+    },
+    "Resource": ["arn:aws:s3:::bucket/*"],
+    "Action": ["s3:ListBucket", "s3:GetObject"],
+    "Principal": {"AWS": ["arn:aws:iam::2:role/B", "arn:aws:iam::1:role/A"]},
+    "Effect": "Allow",
+    "Sid": "AllowPartner",
+}
+
+
+def test_statement_fingerprint_is_canonical() -> None:
+    assert statement_fingerprint(STATEMENT) == statement_fingerprint(EQUIVALENT)
+    widened = dict(STATEMENT, Resource="arn:aws:s3:::bucket/team-a/*")
+    assert statement_fingerprint(widened) != statement_fingerprint(STATEMENT)
+    assert deduplicate_statements([STATEMENT, EQUIVALENT]) == [STATEMENT]
+
+
+def test_policy_fingerprint_ignores_statement_order() -> None:
+    other = {"Sid": "DenyAll", "Effect": "Deny", "Principal": "*", "Action": "s3:*", "Resource": "*"}
+    first = policy_fingerprint({"Version": "2012-10-17", "Statement": [STATEMENT, other]})
+    second = policy_fingerprint({"Version": "2012-10-17", "Statement": [other, EQUIVALENT]})
+    assert first.digest == second.digest
+    assert first.diff(second) == {"added": [], "removed": []}
+
+    changed = policy_fingerprint({"Version": "2012-10-17", "Statement": [other]})
+    assert changed.digest != first.digest
+    assert changed.diff(first) == {"added": [statement_fingerprint(STATEMENT)], "removed": []}
+
+
+
+def test_policy_fingerprint_covers_single_statement_and_top_level_keys() -> None:
+    empty = policy_fingerprint({"Version": "2012-10-17", "Statement": []})
+    single = policy_fingerprint({"Version": "2012-10-17", "Statement": STATEMENT})
+    assert single.digest != empty.digest
+    assert single.digest == policy_fingerprint({"Version": "2012-10-17", "Statement": [EQUIVALENT]}).digest
+    assert single.statements == ((STATEMENT["Sid"], statement_fingerprint(STATEMENT)),)
+
+    named = policy_fingerprint({"Version": "2012-10-17", "Id": "perimeter-v1", "Statement": [STATEMENT]})
+    assert named.digest != single.digest
+    assert named.digest != policy_fingerprint({"Version": "2012-10-17", "Id": "perimeter-v2", "Statement": [STATEMENT]}).digest
+
+def test_merge_skips_unchanged_output(tmp_path: Path, capsys) -> None:
+    out = tmp_path / "merged.json"
+    argv = [
+        "--base",
+        str(PROJECT_ROOT / "policies" / "bucket-policy.base.json"),
+        "--exceptions",
+        str(PROJECT_ROOT / "policies" / "bucket-policy.exceptions.json"),
+        "--out",
+        str(out),
+        "--vars",
+        "BucketName=b,OrgId=o-1,VpcEndpointId=vpce-1",
+        "--now",
+        "2025-01-01",
+        "--json",
+        "--skip-unchanged",
+    ]
+    assert merge_policy.main(argv) == 0
+    first = json.loads(capsys.readouterr().out)
+    assert first["status"] == "success"
+
+    document = json.loads(out.read_text(encoding="utf-8"))
+    document["Statement"].reverse()
+    out.write_text(json.dumps(document), encoding="utf-8")
+
+    assert merge_policy.main(argv) == 0
+    second = json.loads(capsys.readouterr().out)
+    assert second["status"] == "unchanged"
+    assert second["fingerprint"] == first["fingerprint"]
+    assert out.read_text(encoding="utf-8") == json.dumps(document)
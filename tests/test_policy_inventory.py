@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools import policy_inventory  # pylint: disable=wrong-import-position
+from tools.generate_fixtures import GeneratorConfig, build_exceptions, build_manifest  # pylint: disable=wrong-import-position
+from tools.merge_policy import ExceptionEntry, _ensure_variables, load_policy, merge_policies  # pylint: disable=wrong-import-position
+
+BASE = PROJECT_ROOT / "policies" / "bucket-policy.base.json"
+
+
+def _fleet(root: Path, buckets: int) -> Dict[str, List[ExceptionEntry]]:
+    """One merged policy per bucket; bucket ``i`` carries the exceptions whose index is ``i`` mod 4."""
+    config = GeneratorConfig(seed=8, buckets=buckets, exceptions=12)
+    exceptions = [ExceptionEntry.from_json(entry.to_request()) for entry in build_exceptions(config)]
+    granted = {}
+    for index, row in enumerate(build_manifest(config)):
+        chosen = [entry for position, entry in enumerate(exceptions) if position % 4 == index % 4]
+        policy = merge_policies(load_policy(BASE), chosen, _ensure_variables(dict(row))).policy
+        directory = root / f"account-{index % 3}" / row["BucketName"]
+        directory.mkdir(parents=True)
+        (directory / "bucket-policy.merged.json").write_text(json.dumps(policy, indent=2))
+        (directory / "bucket-policy.exceptions.json").write_text(json.dumps({"Exceptions": [e.to_json() for e in chosen]}))
+        granted[row["BucketName"]] = chosen
+    return granted
+
+
+def _query(state: Path, capsys, *args: str) -> dict:
+    assert policy_inventory.main(["--state", str(state), "--json", "query", *args]) == 0
+    return json.loads(capsys.readouterr().out)
+
+
+def test_scan_indexes_grants_across_buckets(tmp_path: Path, capsys) -> None:
+    granted = _fleet(tmp_path / "fleet", 20)
+    state = tmp_path / "inventory.json"
+    argv = ["--state", str(state), "--json", "scan", str(tmp_path / "fleet"), "--workers", "2"]
+    assert policy_inventory.main(argv) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert (summary["files"], summary["policies"], summary["invalid"], summary["parsed"]) == (40, 20, 0, 40)
+
+    entry = next(iter(granted.values()))[0]
+    expected = sorted(bucket for bucket, chosen in granted.items() if any(e.principal_arn == entry.principal_arn for e in chosen))
+    result = _query(state, capsys, "--principal", entry.principal_arn, "--effect", "Allow", "--exact", "--buckets")
+    assert result["buckets"] == expected
+    action = entry.actions[0]
+    grants = _query(state, capsys, "--principal", entry.principal_arn, "--action", action, "--exact")["grants"]
+    assert {(item["bucket"], item["prefix"]) for item in grants} >= {(bucket, entry.prefix) for bucket, chosen in granted.items() if entry in chosen}
+    assert all(item["sid"].startswith("AllowException") for item in grants)
+
+    widened = _query(state, capsys, "--principal", entry.principal_arn, "--action", "s3:GetObject")["grants"]
+    assert {item["sid"] for item in widened if item["principal"] == "*"} >= {"AllowOrgAccessViaVpce", "DenyRequestsOutsideVpce"}
+    assert len(_query(state, capsys, "--principal", "*", "--action", "s3:PutBucketAcl", "--effect", "Deny", "--exact")["grants"]) == 40
+
+
+def test_rescan_only_reparses_changed_files(tmp_path: Path, capsys) -> None:
+    granted = _fleet(tmp_path / "fleet", 6)
+    state = tmp_path / "inventory.json"
+    argv = ["--state", str(state), "--json", "scan", str(tmp_path / "fleet"), "--workers", "1"]
+    assert policy_inventory.main(argv) == 0
+    capsys.readouterr()
+
+    paths = sorted((tmp_path / "fleet").rglob("bucket-policy.merged.json"))
+    edited, touched, deleted, broken = paths[0], paths[1], paths[2], paths[3]
+    policy = json.loads(edited.read_text())
+    policy["Statement"] = [stmt for stmt in policy["Statement"] if not stmt["Sid"].startswith("AllowException")]
+    edited.write_text(json.dumps(policy))
+    os.utime(touched, ns=(touched.stat().st_atime_ns, touched.stat().st_mtime_ns + 10**9))
+    deleted.unlink()
+    broken_policy = json.loads(broken.read_text())
+    broken_policy["Statement"][0]["Effect"] = "Maybe"
+    broken.write_text(json.dumps(broken_policy))
+
+    assert policy_inventory.main(argv) == 2
+    summary = json.loads(capsys.readouterr().out)
+    assert (summary["parsed"], summary["reindexed"], summary["removed"], summary["policies"]) == (3, 2, 1, 5)
+    assert list(summary["errors"]) == [str(broken)] and "Effect must be one of" in summary["errors"][str(broken)][0]
+
+    bucket = edited.parent.name
+    for entry in granted[bucket]:
+        buckets = _query(state, capsys, "--principal", entry.principal_arn, "--exact", "--buckets")["buckets"]
+        assert bucket not in buckets and deleted.parent.name not in buckets
+        assert touched.parent.name in buckets or entry.principal_arn not in {e.principal_arn for e in granted[touched.parent.name]}
+
+    assert policy_inventory.main(argv) == 2
+    assert json.loads(capsys.readouterr().out)["parsed"] == 0
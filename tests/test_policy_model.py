@@ -0,0 +1,92 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools.merge_policy import (  # pylint: disable=wrong-import-position
+    ExceptionEntry,
+    PolicyMergeError,
+    apply_variables,
+    build_exception_statement,
+    deduplicate_statements,
+    load_policy,
+)
+from tools.policy_model import PolicyDocument, PolicyStatement  # pylint: disable=wrong-import-position
+
+POLICIES_DIR = PROJECT_ROOT / "policies"
+
+
+def test_round_trip_is_lossless() -> None:
+    for name in ("bucket-policy.base.json", "scp-deny-external.json", "scp-restrict-s3-actions.json"):
+        document = load_policy(POLICIES_DIR / name)
+        assert PolicyDocument.from_json(document).to_json() == document
+
+    odd = {
+        "Effect": "Allow",
+        "Principal": {"AWS": ["arn:aws:iam::1:role/A", "arn:aws:iam::2:role/B"]},
+        "NotAction": "s3:DeleteObject",
+        "Resource": "arn:aws:s3:::bucket/*",
+        "Condition": {"Bool": {"aws:SecureTransport": True}, "StringEquals": {}},
+        "Sid": None,
+    }
+    statement = PolicyStatement.from_json(odd)
+    assert statement.to_json() == odd
+    assert not hasattr(statement, "__dict__")
+
+
+def test_statement_equality_ignores_key_order() -> None:
+    first = {"Sid": "A", "Effect": "Deny", "Action": "s3:*", "Condition": {"StringEquals": {"a": "1", "b": "2"}}}
+    second = {"Condition": {"StringEquals": {"b": "2", "a": "1"}}, "Action": "s3:*", "Effect": "Deny", "Sid": "A"}
+    assert deduplicate_statements([first, second]) == [first]
+    assert deduplicate_statements([PolicyStatement.from_json(first), PolicyStatement.from_json(second)]) == [
+        PolicyStatement.from_json(first)
+    ]
+
+
+def test_apply_variables_substitutes_keys_and_values() -> None:
+    document = {
+        "Version": "2012-10-17",
+        "Statement": [{"Effect": "Allow", "Resource": ["${BucketArn}/*"], "Condition": {"StringEquals": {"${Key}": "${OrgId}"}}}],
+    }
+    result = apply_variables(document, {"BucketArn": "arn:aws:s3:::b", "Key": "aws:PrincipalOrgID", "OrgId": "o-1"})
+    statement = result["Statement"][0]
+    assert statement["Resource"] == ["arn:aws:s3:::b/*"]
+    assert statement["Condition"] == {"StringEquals": {"aws:PrincipalOrgID": "o-1"}}
+    with pytest.raises(PolicyMergeError):
+        apply_variables(document, {"BucketArn": "arn:aws:s3:::b"})
+
+    # Equal-but-differently-typed values must not share a memoized result.
+    typed = {"Statement": [{"Condition": {"Bool": {"k": value}}} for value in ([1], [True], [1.0], ["${Key}"])]}
+    conditions = [item["Condition"]["Bool"]["k"] for item in apply_variables(typed, {"Key": "v"})["Statement"]]
+    assert conditions == [[1], [True], [1.0], ["v"]]
+    assert [type(value[0]) for value in conditions] == [int, bool, float, str]
+
+
+def test_exception_entry_json_round_trip() -> None:
+    entry = ExceptionEntry.from_json(
+        {
+            "id": "partner-x",
+            "principalArn": "arn:aws:iam::123456789012:role/PartnerReader",
+            "actions": ["s3:PutObject", "s3:GetObject"],
+            "prefix": "partner-x/*",
+            "expiresAt": "2025-12-31",
+            "reason": "POC",
+        }
+    )
+    assert entry.actions == ("s3:PutObject", "s3:GetObject")
+    assert entry.expires_at == date(2025, 12, 31)
+    assert ExceptionEntry.from_json(entry.to_json()) == entry
+    for actions in ("s3:GetObject", [], ["s3:GetObject", 7]):
+        with pytest.raises(PolicyMergeError, match="actions must be a non-empty list of strings"):
+            ExceptionEntry.from_json(dict(entry.to_json(), actions=actions))
+
+    variables = {"BucketArn": "arn:aws:s3:::b", "BucketName": "b", "OrgId": "o-1", "VpcEndpointId": "vpce-1"}
+    statement = build_exception_statement(entry, variables, 0)
+    assert statement["Sid"] == "AllowException1"
+    assert statement["Action"] == ["s3:GetObject", "s3:PutObject"]
+    assert statement["Condition"]["StringEqualsIfPresent"] == {"s3:x-amz-server-side-encryption": ["AES256", "aws:kms"]}
@@ -0,0 +1,95 @@
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from test_policy_enforcement import strip_general_allow  # pylint: disable=wrong-import-position
+from tools import recommend_exceptions  # pylint: disable=wrong-import-position
+from tools.evaluate_policy import CompiledPolicy  # pylint: disable=wrong-import-position
+from tools.generate_fixtures import GeneratorConfig, generate  # pylint: disable=wrong-import-position
+from tools.merge_policy import _ensure_variables, load_exceptions, load_policy, merge_policies  # pylint: disable=wrong-import-position
+from tools.recommend_exceptions import PrefixTrie, recommend_prefixes  # pylint: disable=wrong-import-position
+
+TODAY = date(2025, 1, 1)
+
+
+def _read_ndjson(path: Path) -> List[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle]
+
+
+def test_recommendations_cover_observed_traffic(tmp_path: Path, capsys) -> None:
+    generate(GeneratorConfig(seed=2, buckets=1, exceptions=9, records=3000, deny_ratio=0.2, exception_share=0.7), tmp_path)
+    variables = _ensure_variables(dict(_read_ndjson(tmp_path / "manifest.ndjson")[0]))
+    traffic = _read_ndjson(tmp_path / "traffic.ndjson")
+    current = tmp_path / "exceptions.json"
+    current.write_text(json.dumps({"Exceptions": [json.loads(path.read_text()) for path in sorted((tmp_path / "requests").glob("*.json"))]}))
+    out = tmp_path / "recommended.json"
+
+    argv = ["--logs", str(tmp_path / "traffic.ndjson"), "--exceptions", str(current), "--budget", "2"]
+    assert recommend_exceptions.main(argv + ["--now", "2025-01-01", "--out", str(out), "--json"]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    recommended = load_exceptions(out, TODAY)
+    assert summary["principals"] == 3 and summary["recommended"] == len(recommended) > 3
+    principals = {entry.principal_arn for entry in recommended}
+    assert all(sum(entry.principal_arn == principal for entry in recommended) <= 2 for principal in principals)
+
+    base = strip_general_allow(load_policy(PROJECT_ROOT / "policies" / "bucket-policy.base.json"))
+    policy = CompiledPolicy.compile(merge_policies(base, recommended, variables).policy)
+    observed = [record for record in traffic if record["principalArn"] in principals and record["expected"] == "Allow"]
+    assert observed and all(policy.is_allowed(record) for record in observed)
+    denied = [record for record in traffic if record["principalArn"] in principals and record["expected"] == "Deny"]
+    assert sum(policy.is_allowed(record) for record in denied) < len(denied)
+
+
+def test_trie_stays_bounded_and_merges_within_budget() -> None:
+    trie = PrefixTrie(max_nodes=64)
+    for team in range(40):
+        for part in range(50):
+            trie.add(f"team-{team:02d}/part-{part:03d}/object-{part}.csv", "s3:GetObject")
+    trie.add("team-00/part-000/object-0.csv", "s3:PutObject")
+    trie.add("", "s3:ListBucket")
+    assert trie.nodes <= 64 and trie.requests == 2002
+
+    grants = recommend_prefixes(trie, budget=50)
+    assert trie.depth_limit is not None and {grant.prefix for grant in grants} == {f"team-{team:02d}/part-0*" for team in range(40)}
+    assert sum(grant.requests for grant in grants) == 2001
+    assert grants[0].prefix == "team-00/part-0*" and grants[0].actions == ("s3:GetObject", "s3:ListBucket", "s3:PutObject")
+    assert [grant.prefix for grant in recommend_prefixes(trie, budget=4)] == ["team-0*", "team-1*", "team-2*", "team-3*"]
+
+    small = PrefixTrie()
+    for key in ("logs/2025/01/a.gz", "logs/2025/02/b.gz", "logs/2024/12/c.gz", "raw/x.csv"):
+        small.add(key, "s3:GetObject")
+    expected = {
+        4: ["logs/2024/12/*", "logs/2025/01/*", "logs/2025/02/*", "raw/*"],
+        3: ["logs/2024/12/*", "logs/2025/0*", "raw/*"],
+        2: ["logs/202*", "raw/*"],
+        1: ["*"],
+    }
+    for budget, prefixes in expected.items():
+        assert sorted(grant.prefix for grant in recommend_prefixes(small, budget)) == prefixes
+
+
+def test_top_level_keys_are_granted_exactly() -> None:
+    trie = PrefixTrie()
+    for key in ("team-a/x/1.csv", "team-a/x/2.csv", "README.txt", "README.txt"):
+        trie.add(key, "s3:GetObject")
+    trie.add("README.txt", "s3:PutObject")
+    grants = recommend_prefixes(trie, budget=3)
+    assert [(grant.prefix, grant.actions, grant.requests) for grant in grants] == [
+        ("README.txt", ("s3:GetObject", "s3:PutObject"), 3),
+        ("team-a/x/*", ("s3:GetObject",), 2),
+    ]
+    assert [grant.prefix for grant in recommend_prefixes(trie, budget=1)] == ["*"]
+
+    crowded = PrefixTrie(max_nodes=8)
+    for index in range(12):
+        crowded.add(f"object-{index}.csv", "s3:GetObject")
+    crowded.add("team-a/x/1.csv", "s3:GetObject")
+    assert crowded.nodes <= 8 and not crowded.objects
+    assert [grant.prefix for grant in recommend_prefixes(crowded, budget=3)] == ["*"]
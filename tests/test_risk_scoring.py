@@ -0,0 +1,123 @@
+import gzip
+import json
+import random
+import sys
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from tools import risk_scoring  # pylint: disable=wrong-import-position
+from tools.analyzer_daemon import RULES  # pylint: disable=wrong-import-position
+from tools.risk_scoring import RiskScorer, blended_score, severity  # pylint: disable=wrong-import-position
+
+START = datetime(2025, 3, 1, tzinfo=timezone.utc)
+
+
+def _findings(count: int, seed: int) -> List[Dict[str, Any]]:
+    """Findings over two days; ``bucket-0`` and the ``intruder`` role are the heavy offenders."""
+    rng = random.Random(seed)
+    scores = [score for _, score, _ in RULES.values()]
+    findings = []
+    for index in range(count):
+        hot = rng.random() < 0.3
+        findings.append(
+            {
+                "ruleId": "S3-GUARD-001",
+                "principal": "arn:aws:iam::111122223333:role/intruder" if hot else f"arn:aws:iam::{rng.randrange(10**12):012d}:role/r{index}",
+                "bucketName": "bucket-0" if hot else f"bucket-{rng.randrange(1, 500)}",
+                "riskScore": 95 if hot else rng.choice(scores),
+                "eventTime": (START + timedelta(seconds=index * 172800 // count)).isoformat().replace("+00:00", "Z"),
+            }
+        )
+    return findings
+
+
+def _recompute(findings: List[Dict[str, Any]], begin: datetime, end: datetime) -> Dict[str, int]:
+    chosen = [f["riskScore"] for f in findings if begin <= datetime.fromisoformat(f["eventTime"].replace("Z", "+00:00")) <= end]
+    levels = Counter(severity(score) for score in chosen)
+    score = blended_score(sum(chosen), sum(score * score for score in chosen))
+    return {"totalFindings": len(chosen), "high": levels["high"], "medium": levels["medium"], "low": levels["low"], "riskScore": score}
+
+
+def test_incremental_summary_matches_full_recompute(tmp_path: Path, capsys) -> None:
+    findings = _findings(6000, seed=1)
+    scorer = RiskScorer(slot_seconds=3600, retention=86400, capacity=16)
+    for finding in findings:
+        scorer.observe(finding)
+    assert len(scorer.slots) <= 25  # a day of hourly slots plus the slot in progress
+
+    end = START + timedelta(days=2) - timedelta(seconds=1)
+    for hours in (1, 6, 24):
+        report = scorer.summary(hours * 3600, now=end, top=3)
+        assert report["summary"] == _recompute(findings, end - timedelta(hours=hours) + timedelta(seconds=1), end)
+        bucket, principal = report["topBuckets"][0], report["topPrincipals"][0]
+        assert (bucket["bucketName"], principal["principal"]) == ("bucket-0", "arn:aws:iam::111122223333:role/intruder")
+        assert bucket["riskScore"] == 95 and bucket["error"] < bucket["riskWeight"] // 10
+
+    alerts = tmp_path / "alerts.ndjson"
+    alerts.write_text("".join(json.dumps(finding) + "\n" for finding in findings[:4000]))
+    batch = tmp_path / "batch.json"
+    batch.write_text(json.dumps({"findings": findings[4000:] + [{"riskScore": "high"}, dict(findings[0], riskScore=50)]}))
+    state = tmp_path / "risk-state.json"
+    argv = ["--state", str(state), "--json", "ingest", str(alerts), "--slot", "1h", "--retention", "1d", "--capacity", "16"]
+    assert risk_scoring.main(argv) == 0
+    assert json.loads(capsys.readouterr().out)["observed"] == 4000
+    assert risk_scoring.main(["--state", str(state), "--json", "ingest", str(batch)]) == 0
+    assert json.loads(capsys.readouterr().out) == {"status": "success", "observed": 2000, "late": 1, "invalid": 1, "slots": 25}
+    assert risk_scoring.main(["--state", str(state), "--json", "ingest", str(alerts), str(batch)]) == 0
+    assert json.loads(capsys.readouterr().out) == {"status": "success", "observed": 0, "late": 0, "invalid": 0, "slots": 25}
+    truncated = tmp_path / "truncated.ndjson.gz"
+    truncated.write_bytes(gzip.compress(alerts.read_bytes())[:200])
+    assert risk_scoring.main(["--state", str(state), "--json", "ingest", str(truncated)]) == 2
+    assert json.loads(capsys.readouterr().out)["status"] == "error"
+
+    assert risk_scoring.main(["--state", str(state), "--json", "summary", "--window", "6h", "--now", end.isoformat()]) == 0
+    assert json.loads(capsys.readouterr().out)["windows"]["6h"] == scorer.summary(6 * 3600, now=end)
+    assert risk_scoring.main(["--state", str(state), "--json", "summary", "--window", "7d"]) == 2
+    assert "exceeds" in json.loads(capsys.readouterr().out)["message"]
+
+
+def test_sharded_states_merge_to_single_stream(tmp_path: Path, capsys) -> None:
+    findings = _findings(3000, seed=2)
+    single = RiskScorer(slot_seconds=900, retention=3 * 86400, capacity=1024)
+    single.observe_all(findings)
+    shards = []
+    for shard in range(3):
+        path = tmp_path / f"shard-{shard}.json"
+        scorer = RiskScorer(slot_seconds=900, retention=3 * 86400, capacity=1024)
+        scorer.observe_all(findings[shard::3])
+        risk_scoring.save_scorer(scorer, path)
+        shards.append(str(path))
+
+    state = tmp_path / "merged.json"
+    assert risk_scoring.main(["--state", str(state), "--json", "merge", *shards]) == 0
+    assert json.loads(capsys.readouterr().out)["observed"] == 3000
+    merged = risk_scoring.load_scorer(state)
+    for window in (3600, 86400, 3 * 86400):
+        assert merged.summary(window, top=20) == single.summary(window, top=20)
+    assert risk_scoring.main(["--state", str(state), "--json", "merge", *shards]) == 0
+    assert json.loads(capsys.readouterr().out) == {"status": "success", "shards": 0, "skipped": 3, "observed": 3000, "slots": len(merged.slots)}
+    assert risk_scoring.load_scorer(state).summary(86400, top=20) == single.summary(86400, top=20)
+
+    grown = risk_scoring.load_scorer(Path(shards[0]))
+    grown.observe_all(_findings(10, seed=3))
+    risk_scoring.save_scorer(grown, Path(shards[0]))
+    assert risk_scoring.main(["--state", str(state), "--json", "merge", shards[0]]) == 2
+    assert "changed since it was merged" in json.loads(capsys.readouterr().out)["message"]
+    nested = tmp_path / "nested.json"
+    assert risk_scoring.main(["--state", str(nested), "--json", "merge", shards[1]]) == 0
+    capsys.readouterr()
+    assert risk_scoring.main(["--state", str(state), "--json", "merge", str(nested)]) == 2
+    assert "already merged" in json.loads(capsys.readouterr().out)["message"]
+
+    small = RiskScorer(slot_seconds=900, retention=3 * 86400, capacity=8)
+    small.merge(RiskScorer.from_json(small.to_json()))
+    with pytest.raises(risk_scoring.RiskScoringError, match="cannot merge"):
+        small.merge(merged)
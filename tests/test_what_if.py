@@ -0,0 +1,77 @@
+import json
+import sys
+from datetime import date
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from test_policy_enforcement import strip_general_allow  # pylint: disable=wrong-import-position
+from tools import what_if  # pylint: disable=wrong-import-position
+from tools.access_index import AccessIndex  # pylint: disable=wrong-import-position
+from tools.evaluate_policy import CompiledPolicy  # pylint: disable=wrong-import-position
+from tools.generate_fixtures import GeneratorConfig, generate  # pylint: disable=wrong-import-position
+from tools.merge_policy import (  # pylint: disable=wrong-import-position
+    _ensure_variables,
+    load_policy,
+    load_requests_directory,
+    merge_policies,
+)
+
+TODAY = date(2025, 1, 1)
+
+
+def _read_ndjson(path: Path) -> List[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle]
+
+
+def test_what_if_matches_full_reevaluation(tmp_path: Path, capsys) -> None:
+    generate(GeneratorConfig(seed=11, buckets=1, exceptions=6, records=4000, deny_ratio=0.5, exception_share=0.6), tmp_path)
+    variables = _ensure_variables(dict(_read_ndjson(tmp_path / "manifest.ndjson")[0]))
+    traffic = _read_ndjson(tmp_path / "traffic.ndjson")
+    base = tmp_path / "base.json"
+    base.write_text(json.dumps(strip_general_allow(load_policy(PROJECT_ROOT / "policies" / "bucket-policy.base.json"))))
+    approved = load_requests_directory(tmp_path / "requests", TODAY)
+
+    renewal = tmp_path / "renewal.json"
+    renewal.write_text(json.dumps(dict(approved[1].to_json(), actions=["s3:GetObjectTagging"])))
+    widening = tmp_path / "widening.json"
+    widening.write_text(
+        json.dumps(
+            {
+                "id": "exc-new",
+                "principalArn": approved[0].principal_arn,
+                "actions": ["s3:PutObject", "s3:DeleteObject"],
+                "prefix": "restricted/*",
+                "expiresAt": "2025-06-30",
+                "reason": "backfill",
+            }
+        )
+    )
+
+    candidates = [what_if.load_candidate(path, TODAY) for path in (renewal, widening)]
+    _, _, proposed = what_if.plan_change(approved, candidates, variables)
+    before = CompiledPolicy.compile(merge_policies(load_policy(base), approved, variables).policy)
+    after = CompiledPolicy.compile(merge_policies(load_policy(base), proposed, variables).policy)
+    flips = [(before.is_allowed(record), after.is_allowed(record)) for record in traffic]
+    newly_allowed, newly_denied = flips.count((False, True)), flips.count((True, False))
+    assert newly_allowed and newly_denied
+
+    AccessIndex(tmp_path / "index").ingest([tmp_path / "traffic.ndjson"])
+    argv = ["--candidate", str(renewal), "--candidate", str(widening), "--base", str(base)]
+    argv += ["--exceptions", str(tmp_path / "none.json"), "--requests-dir", str(tmp_path / "requests")]
+    argv += ["--vars", ",".join(f"{key}={value}" for key, value in variables.items()), "--now", "2025-01-01", "--json"]
+    scanned = {}
+    for corpus in ("--index", "--logs"):
+        source = tmp_path / ("index" if corpus == "--index" else "traffic.ndjson")
+        assert what_if.main(argv + [corpus, str(source)]) == 0
+        summary = json.loads(capsys.readouterr().out)
+        assert (summary["newlyAllowed"], summary["newlyDenied"]) == (newly_allowed, newly_denied)
+        assert summary["replaces"] == [approved[1].identifier]
+        assert summary["samples"]["newlyAllowed"][0]["principalArn"] == approved[0].principal_arn
+        scanned[corpus] = summary["scanned"]
+    assert scanned["--logs"] == len(traffic)
+    assert scanned["--index"] < len(traffic) // 4
@@ -0,0 +1,587 @@
+"""Append-only, memory-mapped index of access records partitioned by day for fast historical queries."""
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.access_records import (
+        RecordFormatError,
+        iter_log_paths,
+        iter_unconsumed,
+        load_org_ids,
+        normalize_event,
+        parse_event_time,
+        split_resource,
+    )
+    from tools.evaluate_policy import CompiledPolicy, PolicyEvaluationError
+except ImportError:  # pragma: no cover
+    from access_records import (
+        RecordFormatError,
+        iter_log_paths,
+        iter_unconsumed,
+        load_org_ids,
+        normalize_event,
+        parse_event_time,
+        split_resource,
+    )
+    from evaluate_policy import CompiledPolicy, PolicyEvaluationError
+
+LOG = logging.getLogger("s3_data_perimeter.index")
+MAGIC = b"S3PIDX01"
+FORMAT_VERSION = 1
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+UNDATED = "undated"
+NONE_ID = 0xFFFFFFFF
+MAX_PREFIX_DEPTH = 4
+DEFAULT_SEGMENT_RECORDS = 250_000
+
+# magic, version, reserved, records, strings, terms per kind (3), then section offsets:
+# records, string offsets, string blob, term tables (3), postings.
+HEADER = struct.Struct("<8sHHII3I7Q")
+# eventTime (epoch seconds, -1 when unknown), string ids for principal, action, bucket, key,
+# org id, source vpce, deciding Sid and request id, then flags.
+RECORD = struct.Struct("<q8IB")
+TERM = struct.Struct("<III")
+OFFSET = struct.Struct("<I")
+TIMESTAMP = struct.Struct("<q")
+TERM_KINDS = ("principal", "action", "prefix")
+STRING_FIELDS = ("principalArn", "action", "bucket", "key", "principalOrgId", "sourceVpce", "sid", "id")
+EFFECTS = {1: "Allow", 2: "Deny"}
+EFFECT_CODES = {name: code for code, name in EFFECTS.items()}
+FLAG_EFFECT = 0x03
+FLAG_SECURE = 0x04
+FLAG_ANONYMOUS = 0x08
+_DAY_NAMES: Dict[int, str] = {}
+
+
+class AccessIndexError(RuntimeError):
+    """Raised when the index directory or a segment file is unusable."""
+
+
+def key_prefixes(key: str) -> List[str]:
+    """``a/b/c.txt`` -> ``["a/", "a/b/"]``; only the first :data:`MAX_PREFIX_DEPTH` levels are indexed."""
+    prefixes: List[str] = []
+    position = key.find("/")
+    while position != -1 and len(prefixes) < MAX_PREFIX_DEPTH:
+        prefixes.append(key[: position + 1])
+        position = key.find("/", position + 1)
+    return prefixes
+
+
+def _epoch(value: Any) -> int:
+    parsed = parse_event_time(value)
+    return int(parsed.timestamp()) if parsed else -1
+
+
+def _partition(timestamp: int) -> str:
+    if timestamp < 0:
+        return UNDATED
+    day = timestamp // 86400
+    name = _DAY_NAMES.get(day)
+    if name is None:
+        name = _DAY_NAMES[day] = datetime.fromtimestamp(day * 86400, timezone.utc).strftime("%Y-%m-%d")
+    return name
+
+
+def _record_fields(record: Mapping[str, Any], decision: Tuple[Optional[str], Optional[str]]) -> Dict[str, Any]:
+    bucket, key = split_resource(str(record.get("resource", "")))
+    effect, sid = decision
+    return {
+        "principalArn": record.get("principalArn"),
+        "action": record.get("action"),
+        "bucket": bucket or None,
+        "key": key or None,
+        "principalOrgId": record.get("principalOrgId"),
+        "sourceVpce": record.get("sourceVpce"),
+        "sid": sid,
+        "id": record.get("id"),
+        "effect": effect,
+        "secureTransport": str(record.get("secureTransport", True)).lower() == "true",  # as build_request_context
+        "isAnonymous": bool(record.get("isAnonymous")),
+        "eventTime": _epoch(record.get("eventTime")),
+        "prefixes": key_prefixes(key),
+    }
+
+
+def write_segment(path: Path, rows: Sequence[Mapping[str, Any]]) -> None:
+    """Write rows produced by :func:`_record_fields` as one immutable segment, ordered by eventTime."""
+    rows = sorted(rows, key=lambda row: row["eventTime"])
+    strings = set()
+    for row in rows:
+        strings.update(str(row[name]) for name in STRING_FIELDS if row[name] is not None)
+        strings.update(row["prefixes"])
+    ordered = sorted(strings)
+    ids = {text: index for index, text in enumerate(ordered)}
+
+    postings: List[Dict[int, List[int]]] = [defaultdict(list) for _ in TERM_KINDS]
+    records = bytearray()
+    for ordinal, row in enumerate(rows):
+        values = [NONE_ID if row[name] is None else ids[str(row[name])] for name in STRING_FIELDS]
+        flags = EFFECT_CODES.get(row["effect"], 0)
+        flags |= FLAG_SECURE if row["secureTransport"] else 0
+        flags |= FLAG_ANONYMOUS if row["isAnonymous"] else 0
+        records += RECORD.pack(row["eventTime"], *values, flags)
+        for kind, term in ((0, values[0]), (1, values[1])):
+            if term != NONE_ID:
+                postings[kind][term].append(ordinal)
+        for prefix in row["prefixes"]:
+            postings[2][ids[prefix]].append(ordinal)
+
+    encoded = [text.encode("utf-8") for text in ordered]
+    string_offsets = array("I", [0])
+    for item in encoded:
+        string_offsets.append(string_offsets[-1] + len(item))
+    tables: List[bytes] = []
+    posting_values = array("I")
+    for kind_postings in postings:
+        table = bytearray()
+        for term in sorted(kind_postings):
+            ordinals = kind_postings[term]
+            table += TERM.pack(term, len(posting_values), len(ordinals))
+            posting_values.extend(ordinals)
+        tables.append(bytes(table))
+    if sys.byteorder != "little":
+        string_offsets.byteswap()
+        posting_values.byteswap()
+
+    sections = [bytes(records), string_offsets.tobytes(), b"".join(encoded), *tables, posting_values.tobytes()]
+    offsets: List[int] = []
+    position = HEADER.size
+    for section in sections:
+        offsets.append(position)
+        position += len(section)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, len(rows), len(ordered), *(len(kind) for kind in postings), *offsets
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("wb") as handle:
+        handle.write(header)
+        for section in sections:
+            handle.write(section)
+    os.replace(tmp, path)
+
+
+class _Timestamps:
+    """Sequence view over the eventTime column so :func:`bisect.bisect_left` can search it."""
+
+    __slots__ = ("_segment",)
+
+    def __init__(self, segment: "Segment") -> None:
+        self._segment = segment
+
+    def __len__(self) -> int:
+        return self._segment.records
+
+    def __getitem__(self, ordinal: int) -> int:
+        return self._segment.timestamp(ordinal)
+
+
+class Segment:
+    """Read-only view of a segment file through ``mmap``; nothing is loaded until it is touched."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._handle = path.open("rb")
+        try:
+            self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:
+            self._handle.close()
+            raise AccessIndexError(f"empty segment {path}") from exc
+        try:
+            header = HEADER.unpack_from(self._map, 0)
+        except struct.error as exc:
+            self.close()
+            raise AccessIndexError(f"truncated segment {path}") from exc
+        magic, version, _, self.records, self.strings = header[:5]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise AccessIndexError(f"{path} is not a version {FORMAT_VERSION} index segment")
+        self._terms = header[5:8]
+        self._records_at, self._offsets_at, self._blob_at = header[8:11]
+        self._tables_at = header[11:14]
+        self._postings_at = header[14]
+        self._cache: Dict[int, str] = {}
+
+    def close(self) -> None:
+        if not self._map.closed:
+            self._map.close()
+        self._handle.close()
+
+    def string(self, string_id: int) -> Optional[str]:
+        if string_id == NONE_ID:
+            return None
+        cached = self._cache.get(string_id)
+        if cached is None:
+            start = OFFSET.unpack_from(self._map, self._offsets_at + 4 * string_id)[0]
+            end = OFFSET.unpack_from(self._map, self._offsets_at + 4 * string_id + 4)[0]
+            cached = self._cache[string_id] = self._map[self._blob_at + start : self._blob_at + end].decode("utf-8")
+        return cached
+
+    def find(self, text: str) -> Optional[int]:
+        """Binary search the sorted string table."""
+        target = text.encode("utf-8")
+        low, high = 0, self.strings
+        while low < high:
+            middle = (low + high) // 2
+            start, end = struct.unpack_from("<II", self._map, self._offsets_at + 4 * middle)
+            probe = self._map[self._blob_at + start : self._blob_at + end]
+            if probe < target:
+                low = middle + 1
+            elif probe > target:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def postings(self, kind: str, term: str) -> Optional[array]:
+        """Sorted record ordinals for ``term``; ``None`` when the term does not occur in this segment."""
+        string_id = self.find(term)
+        if string_id is None:
+            return None
+        index = TERM_KINDS.index(kind)
+        base, low, high = self._tables_at[index], 0, self._terms[index]
+        while low < high:
+            middle = (low + high) // 2
+            term_id, offset, count = TERM.unpack_from(self._map, base + TERM.size * middle)
+            if term_id < string_id:
+                low = middle + 1
+            elif term_id > string_id:
+                high = middle
+            else:
+                start = self._postings_at + 4 * offset
+                ordinals = array("I")
+                ordinals.frombytes(self._map[start : start + 4 * count])
+                if sys.byteorder != "little":
+                    ordinals.byteswap()
+                return ordinals
+        return None
+
+    def timestamp(self, ordinal: int) -> int:
+        return TIMESTAMP.unpack_from(self._map, self._records_at + RECORD.size * ordinal)[0]
+
+    def bounds(self, start: Optional[int], end: Optional[int]) -> Tuple[int, int]:
+        timestamps = _Timestamps(self)
+        low = bisect_left(timestamps, start) if start is not None else 0
+        high = bisect_left(timestamps, end) if end is not None else self.records
+        return low, high
+
+    def row(self, ordinal: int) -> Tuple[int, ...]:
+        return RECORD.unpack_from(self._map, self._records_at + RECORD.size * ordinal)
+
+    def decode(self, row: Tuple[int, ...]) -> Dict[str, Any]:
+        timestamp, principal, action, bucket, key, org_id, vpce, sid, identifier, flags = row
+        bucket_name, key_name = self.string(bucket), self.string(key)
+        resource = f"arn:aws:s3:::{bucket_name}/{key_name}" if key_name else f"arn:aws:s3:::{bucket_name}"
+        return {
+            "id": self.string(identifier),
+            "eventTime": (
+                datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if timestamp >= 0 else None
+            ),
+            "principalOrgId": self.string(org_id),
+            "principalArn": self.string(principal),
+            "sourceVpce": self.string(vpce),
+            "action": self.string(action),
+            "resource": resource if bucket_name else None,
+            "secureTransport": bool(flags & FLAG_SECURE),
+            "isAnonymous": bool(flags & FLAG_ANONYMOUS),
+            "effect": EFFECTS.get(flags & FLAG_EFFECT),
+            "sid": self.string(sid),
+        }
+
+
+@dataclass(frozen=True)
+class IndexQuery:
+    principal: Optional[str] = None
+    action: Optional[str] = None
+    prefix: Optional[str] = None
+    bucket: Optional[str] = None
+    effect: Optional[str] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+
+def _indexed_prefix(prefix: str) -> Optional[str]:
+    """Deepest indexed ``/`` boundary that covers ``prefix``; the rest is filtered per record."""
+    candidates = key_prefixes(prefix)
+    return candidates[-1] if candidates else None
+
+
+def _intersect(lists: Sequence[array], low: int, high: int) -> Iterator[int]:
+    ordered = sorted(lists, key=len)
+    smallest, others = ordered[0], ordered[1:]
+    for ordinal in smallest[bisect_left(smallest, low) : bisect_left(smallest, high)]:
+        for other in others:
+            position = bisect_left(other, ordinal)
+            if position == len(other) or other[position] != ordinal:
+                break
+        else:
+            yield ordinal
+
+
+def _scan_segment(segment: Segment, query: IndexQuery, start: Optional[int], end: Optional[int]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    low, high = segment.bounds(start, end)
+    if low >= high:
+        return
+    lists: List[array] = []
+    for kind, term in (("principal", query.principal), ("action", query.action), ("prefix", _indexed_prefix(query.prefix or ""))):
+        if term:
+            ordinals = segment.postings(kind, term)
+            if ordinals is None:
+                return
+            lists.append(ordinals)
+    effect_code = EFFECT_CODES.get(query.effect) if query.effect else None
+    bucket_id = None
+    if query.bucket:
+        bucket_id = segment.find(query.bucket)
+        if bucket_id is None:
+            return
+    candidates: Iterable[int] = _intersect(lists, low, high) if lists else range(low, high)
+    for ordinal in candidates:
+        row = segment.row(ordinal)
+        if effect_code is not None and row[9] & FLAG_EFFECT != effect_code:
+            continue
+        if bucket_id is not None and row[3] != bucket_id:
+            continue
+        if query.prefix and not (segment.string(row[4]) or "").startswith(query.prefix):
+            continue
+        yield row[0], segment.decode(row)
+
+
+class AccessIndex:
+    """Directory of day partitions; ``manifest.json`` lists committed segments and ingested sources.
+
+    Segments are immutable and written before the manifest that references them, so an
+    interrupted ingest leaves at most an orphan file and never a partially indexed source.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.manifest = self._load_manifest()
+        self._segments: Dict[str, Segment] = {}
+
+    def __enter__(self) -> "AccessIndex":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        path = self.directory / MANIFEST_NAME
+        if not path.exists():
+            return {"version": MANIFEST_VERSION, "records": 0, "nextSegment": 1, "sources": {}, "partitions": {}}
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                manifest = json.load(handle)
+        except (OSError, json.JSONDecodeError) as exc:
+            raise AccessIndexError(f"unreadable manifest {path}: {exc}") from exc
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise AccessIndexError(f"unsupported manifest version {manifest.get('version')!r}")
+        return manifest
+
+    def _save_manifest(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / MANIFEST_NAME
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(self.manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _flush(self, partition: str, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        name = f"{partition}/seg-{self.manifest['nextSegment']:06d}.idx"
+        write_segment(self.directory / name, rows)
+        self.manifest["nextSegment"] += 1
+        self.manifest["partitions"].setdefault(partition, []).append(name)
+        self.manifest["records"] += len(rows)
+        rows.clear()
+
+    def _source_records(self, path: Path, org_ids: Mapping[str, str]) -> Iterator[Dict[str, Any]]:
+        for raw in iter_unconsumed(path, self.manifest["sources"]):
+            try:
+                yield normalize_event(raw, org_ids)
+            except RecordFormatError as exc:
+                LOG.debug("skipping record in %s: %s", path, exc)
+
+    def ingest(
+        self,
+        paths: Iterable[Path],
+        *,
+        org_ids: Optional[Mapping[str, str]] = None,
+        policy: Optional[CompiledPolicy] = None,
+        segment_records: int = DEFAULT_SEGMENT_RECORDS,
+    ) -> Dict[str, Any]:
+        """Index records that earlier runs have not seen; returns counts for this run.
+
+        The recorded effect is the observed outcome (CloudTrail ``errorCode``), else the
+        ``policy`` decision, else the fixture's ``expected`` value.
+        """
+        buffers: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        buffered = indexed = sources = 0
+        for path in iter_log_paths(paths):
+            sources += 1
+            for record in self._source_records(path, org_ids or {}):
+                decision = policy.decide(record) if policy is not None else None
+                effect = record.get("observed") if record.get("observed") in EFFECT_CODES else None
+                effect = effect or (decision.effect if decision else record.get("expected"))
+                row = _record_fields(record, (effect, decision.sid if decision else None))
+                partition = _partition(row["eventTime"])
+                buffers[partition].append(row)
+                buffered += 1
+                indexed += 1
+                if len(buffers[partition]) >= segment_records:
+                    buffered -= len(buffers[partition])
+                    self._flush(partition, buffers[partition])
+                elif buffered >= 4 * segment_records:
+                    for name, rows in buffers.items():
+                        self._flush(name, rows)
+                    buffered = 0
+        for name, rows in sorted(buffers.items()):
+            self._flush(name, rows)
+        self._save_manifest()
+        return {"sources": sources, "indexed": indexed, "records": self.manifest["records"]}
+
+    def _segment(self, name: str) -> Segment:
+        segment = self._segments.get(name)
+        if segment is None:
+            segment = self._segments[name] = Segment(self.directory / name)
+        return segment
+
+    def query(self, query: IndexQuery) -> Iterator[Dict[str, Any]]:
+        """Matching records in eventTime order (undated records last, only for unbounded queries)."""
+        start = int(query.start.timestamp()) if query.start else None
+        end = int(query.end.timestamp()) if query.end else None
+        first_day = _partition(start) if start is not None else None
+        last_day = _partition(end) if end is not None else None
+        for partition in sorted(self.manifest["partitions"], key=lambda name: (name == UNDATED, name)):
+            if partition == UNDATED:
+                if start is not None or end is not None:
+                    continue
+            elif (first_day and partition < first_day) or (last_day and partition > last_day):
+                continue
+            streams = [_scan_segment(self._segment(name), query, start, end) for name in self.manifest["partitions"][partition]]
+            for _, record in heapq.merge(*streams, key=lambda item: item[0]):
+                yield record
+
+
+def parse_window(since: Optional[str], start: Optional[str], end: Optional[str], now: datetime) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Turn ``--since 7d``/``12h``/``30m`` or ISO ``--start``/``--end`` values into UTC datetimes."""
+    begin = parse_event_time(start) if start else None
+    finish = parse_event_time(end) if end else None
+    if (start and begin is None) or (end and finish is None):
+        raise AccessIndexError("--start/--end must be ISO-8601 dates or timestamps")
+    if since:
+        units = {"d": "days", "h": "hours", "m": "minutes"}
+        try:
+            begin = now - timedelta(**{units[since[-1]]: int(since[:-1])})
+        except (KeyError, ValueError) as exc:
+            raise AccessIndexError(f"invalid --since value {since!r}; use e.g. 7d, 12h or 30m") from exc
+    return begin, finish
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--index", type=Path, default=Path("artifacts/access-index"), help="Index directory")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Index new log files and appended lines")
+    build.add_argument("logs", type=Path, nargs="+", help="Log files or directories (NDJSON, JSON, CloudTrail .json.gz)")
+    build.add_argument("--policy", type=Path, default=None, help="Merged policy used to record decisions and Sids")
+    build.add_argument("--org-ids", type=Path, default=None, help="JSON map of CloudTrail accountId to org id")
+    build.add_argument("--segment-records", type=int, default=DEFAULT_SEGMENT_RECORDS, help="Records per segment file")
+
+    query = commands.add_parser("query", help="Print matching records as NDJSON")
+    query.add_argument("--principal", default=None, help="Exact principal ARN")
+    query.add_argument("--action", default=None, help="Exact action, e.g. s3:GetObject")
+    query.add_argument("--prefix", default=None, help="Object key prefix, e.g. team-a/")
+    query.add_argument("--bucket", default=None, help="Bucket name")
+    query.add_argument("--effect", choices=sorted(EFFECT_CODES), default=None, help="Recorded effect")
+    query.add_argument("--since", default=None, help="Relative window such as 7d, 12h or 30m")
+    query.add_argument("--start", default=None, help="Inclusive ISO-8601 start")
+    query.add_argument("--end", default=None, help="Exclusive ISO-8601 end")
+    query.add_argument("--now", default=None, help="Override the current time for --since (ISO-8601)")
+    query.add_argument("--limit", type=int, default=None, help="Stop after this many records")
+    query.add_argument("--count", action="store_true", help="Print only the number of matches")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def _load_policy(path: Optional[Path]) -> Optional[CompiledPolicy]:
+    if path is None:
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            return CompiledPolicy.compile(json.load(handle))
+    except (OSError, json.JSONDecodeError, PolicyEvaluationError) as exc:
+        raise AccessIndexError(f"failed to load policy {path}: {exc}") from exc
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        with AccessIndex(args.index) as index:
+            if args.command == "build":
+                summary = index.ingest(
+                    args.logs,
+                    org_ids=load_org_ids(args.org_ids),
+                    policy=_load_policy(args.policy),
+                    segment_records=max(1, args.segment_records),
+                )
+                summary["status"] = "success"
+                if args.json:
+                    sys.stdout.write(json.dumps(summary) + "\n")
+                else:
+                    sys.stdout.write(
+                        f"index updated: sources={summary['sources']} indexed={summary['indexed']} total={summary['records']}\n"
+                    )
+                return 0
+
+            now = parse_event_time(args.now) if args.now else datetime.now(timezone.utc)
+            start, end = parse_window(args.since, args.start, args.end, now or datetime.now(timezone.utc))
+            query = IndexQuery(args.principal, args.action, args.prefix, args.bucket, args.effect, start, end)
+            matches = 0
+            for record in index.query(query):
+                if args.limit is not None and matches >= args.limit:
+                    break
+                matches += 1
+                if not args.count:
+                    sys.stdout.write(json.dumps(record) + "\n")
+            if args.count:
+                sys.stdout.write((json.dumps({"count": matches}) if args.json else str(matches)) + "\n")
+    except (AccessIndexError, RecordFormatError, OSError) as exc:
+        LOG.error("access index failed: %s", exc)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,218 @@
+"""Read access logs and normalize CloudTrail S3 data events into request records."""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, Mapping, Optional
+
+LOG = logging.getLogger("s3_data_perimeter.records")
+LOG_SUFFIXES = (".json", ".ndjson", ".jsonl", ".json.gz", ".ndjson.gz", ".jsonl.gz")
+TAILED_SUFFIXES = (".ndjson", ".jsonl")
+ANONYMOUS_ACCOUNT = "ANONYMOUS_PRINCIPAL"
+EVENT_ACTIONS = {
+    "ListObjects": "s3:ListBucket",
+    "ListObjectsV2": "s3:ListBucket",
+    "HeadBucket": "s3:ListBucket",
+    "ListObjectVersions": "s3:ListBucketVersions",
+    "ListMultipartUploads": "s3:ListBucketMultipartUploads",
+    "HeadObject": "s3:GetObject",
+    "SelectObjectContent": "s3:GetObject",
+    "CopyObject": "s3:PutObject",
+    "CreateMultipartUpload": "s3:PutObject",
+    "UploadPart": "s3:PutObject",
+    "UploadPartCopy": "s3:PutObject",
+    "CompleteMultipartUpload": "s3:PutObject",
+    "DeleteObjects": "s3:DeleteObject",
+}
+
+
+class RecordFormatError(ValueError):
+    """Raised when a log line cannot be turned into a request record."""
+
+
+def is_log_file(path: Path) -> bool:
+    return path.is_file() and path.name.endswith(LOG_SUFFIXES)
+
+
+def iter_log_paths(paths: Iterable[Path]) -> Iterator[Path]:
+    """Expand directories into their log files (recursively, sorted); files are passed through."""
+    for path in paths:
+        if path.is_dir():
+            yield from sorted(child for child in path.rglob("*") if is_log_file(child))
+        else:
+            yield path
+
+
+def open_text(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return path.open("r", encoding="utf-8")
+
+
+def iter_raw(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield raw objects from a JSON array, a CloudTrail ``{"Records": [...]}`` file or NDJSON."""
+    with open_text(path) as handle:
+        first_line = handle.readline()
+        stripped = first_line.strip()
+        if stripped.startswith("{"):
+            try:
+                first = json.loads(stripped)
+            except json.JSONDecodeError:
+                first = None  # pretty-printed document spanning several lines
+            if isinstance(first, dict) and "Records" not in first:
+                yield first
+                yield from iter_ndjson(handle)
+                return
+        text = first_line + handle.read()
+    if not text.strip():
+        return
+    payload = json.loads(text)
+    if isinstance(payload, dict) and isinstance(payload.get("Records"), list):
+        yield from payload["Records"]
+    elif isinstance(payload, list):
+        yield from payload
+    else:
+        yield payload
+
+
+def iter_ndjson(handle: IO[str]) -> Iterator[Dict[str, Any]]:
+    for line in handle:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_records(path: Path, org_ids: Optional[Mapping[str, str]] = None) -> Iterator[Dict[str, Any]]:
+    for raw in iter_raw(path):
+        try:
+            yield normalize_event(raw, org_ids)
+        except RecordFormatError as exc:
+            LOG.debug("skipping record in %s: %s", path, exc)
+
+
+def iter_unconsumed(path: Path, sources: Dict[str, Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Raw objects from ``path`` that earlier runs did not consume; progress is recorded in ``sources``.
+
+    NDJSON files resume from the recorded byte offset and stop before a partial last line, so
+    appended lines are picked up on the next run. Other files are read once; a later change is
+    logged and skipped because counts already folded in cannot be taken back out.
+    """
+    key = str(path.resolve())
+    stat = path.stat()
+    previous = sources.get(key)
+    if path.name.endswith(TAILED_SUFFIXES):
+        offset = previous["offset"] if previous else 0
+        if stat.st_size < offset:
+            LOG.warning("%s shrank since it was consumed; skipping", path)
+            return
+        with path.open("rb") as handle:
+            handle.seek(offset)
+            for line in handle:
+                if not line.endswith(b"\n"):
+                    break  # partial line still being written
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    LOG.debug("skipping line in %s: %s", path, exc)
+        sources[key] = {"size": stat.st_size, "mtime": stat.st_mtime, "offset": offset}
+        return
+    if previous is not None:
+        if (previous["size"], previous["mtime"]) != (stat.st_size, stat.st_mtime):
+            LOG.warning("%s changed since it was consumed; skipping", path)
+        return
+    yield from iter_raw(path)
+    sources[key] = {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def merge_sources(sources: Dict[str, Dict[str, Any]], other: Mapping[str, Mapping[str, Any]]) -> None:
+    """Union of two consumed-source maps; for a file both consumed, keep the further offset."""
+    for key, entry in other.items():
+        mine = sources.get(key)
+        if mine is None or entry.get("offset", 0) > mine.get("offset", 0):
+            sources[key] = dict(entry)
+
+
+def load_org_ids(path: Optional[Path]) -> Dict[str, str]:
+    """Read a JSON object mapping CloudTrail ``accountId`` to ``PrincipalOrgID``."""
+    if path is None:
+        return {}
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+    except (OSError, json.JSONDecodeError) as exc:
+        raise RecordFormatError(f"failed to load account map {path}: {exc}") from exc
+    if not isinstance(payload, dict):
+        raise RecordFormatError("account map must be a JSON object of accountId -> orgId")
+    return {str(account): str(org_id) for account, org_id in payload.items()}
+
+
+def normalize_event(event: Mapping[str, Any], org_ids: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """Return a request record in the ``tests/fixtures/sample-requests.json`` shape.
+
+    Records already in that shape pass through unchanged. CloudTrail S3 data events are
+    mapped field by field; CloudTrail does not carry the caller's organization, so it is
+    looked up by account in ``org_ids`` (or read from a non-standard
+    ``userIdentity.principalOrgId``).
+    """
+    if "action" in event and "resource" in event:
+        return dict(event)
+    if "eventName" not in event:
+        raise RecordFormatError("record is neither a request record nor a CloudTrail event")
+
+    identity = event.get("userIdentity") or {}
+    params = event.get("requestParameters") or {}
+    event_name = str(event["eventName"])
+    bucket = params.get("bucketName") or params.get("Host", "").split(".", 1)[0]
+    if not bucket:
+        raise RecordFormatError(f"event {event.get('eventID')} has no bucket")
+    key = params.get("key")
+
+    account = identity.get("accountId")
+    anonymous = account == ANONYMOUS_ACCOUNT or identity.get("type") == "Anonymous"
+    principal_arn = identity.get("arn")
+    session_issuer = (identity.get("sessionContext") or {}).get("sessionIssuer") or {}
+    if identity.get("type") == "AssumedRole" and session_issuer.get("arn"):
+        principal_arn = session_issuer["arn"]
+    org_id = identity.get("principalOrgId") or (org_ids or {}).get(str(account))
+
+    record: Dict[str, Any] = {
+        "id": event.get("eventID"),
+        "eventTime": event.get("eventTime"),
+        "eventName": event_name,
+        "principalOrgId": None if anonymous else org_id,
+        "principalArn": "anonymous" if anonymous else principal_arn,
+        "sessionArn": None if anonymous else identity.get("arn"),
+        "sourceVpce": event.get("vpcEndpointId"),
+        "action": EVENT_ACTIONS.get(event_name, f"s3:{event_name}"),
+        "resource": f"arn:aws:s3:::{bucket}/{key}" if key else f"arn:aws:s3:::{bucket}",
+        "secureTransport": bool(event.get("tlsDetails")),
+        "isAnonymous": anonymous,
+    }
+    if event.get("errorCode"):
+        record["observed"] = "Deny" if event["errorCode"] == "AccessDenied" else "Error"
+    else:
+        record["observed"] = "Allow"
+    return record
+
+
+def split_resource(resource: str) -> tuple:
+    """Split an S3 ARN into ``(bucket, key)``; ``key`` is empty for bucket-level resources."""
+    if not resource.startswith("arn:aws:s3:::"):
+        return "", ""
+    bucket, _, key = resource[len("arn:aws:s3:::") :].partition("/")
+    return bucket, key
+
+
+def parse_event_time(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
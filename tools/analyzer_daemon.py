@@ -0,0 +1,688 @@
+"""Local analyzer service: tail access logs, evaluate events against the merged policy and batch alerts."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.access_records import (
+        TAILED_SUFFIXES,
+        RecordFormatError,
+        is_log_file,
+        iter_raw,
+        load_org_ids,
+        normalize_event,
+        split_resource,
+    )
+    from tools.enforcement_proxy import infer_bucket, percentile
+    from tools.evaluate_policy import CompiledPolicy, Decision, PolicyEvaluationError
+    from tools.risk_scoring import RiskScorer, RiskScoringError, load_scorer, save_scorer
+except ImportError:  # pragma: no cover
+    from access_records import (
+        TAILED_SUFFIXES,
+        RecordFormatError,
+        is_log_file,
+        iter_raw,
+        load_org_ids,
+        normalize_event,
+        split_resource,
+    )
+    from enforcement_proxy import infer_bucket, percentile
+    from evaluate_policy import CompiledPolicy, Decision, PolicyEvaluationError
+    from risk_scoring import RiskScorer, RiskScoringError, load_scorer, save_scorer
+
+LOG = logging.getLogger("s3_data_perimeter.analyzer")
+LATENCY_SAMPLES = 10000
+READ_CHUNK = 1 << 20
+
+# Deciding statement Sid -> (ruleId, riskScore, condition). ``None`` is the implicit deny.
+RULES: Dict[Optional[str], Tuple[str, int, str]] = {
+    "DenyRequestsOutsideOrganization": ("S3-GUARD-001", 95, "PrincipalOrgID mismatch"),
+    "DenyRequestsOutsideVpce": ("S3-GUARD-002", 85, "SourceVpce mismatch"),
+    "EnforceSecureTransportOptional": ("S3-GUARD-003", 60, "SecureTransport=false"),
+    "DenyPublicACLAndPolicyChanges": ("S3-GUARD-010", 70, "ACL or bucket policy change attempt"),
+    None: ("S3-GUARD-020", 45, "No statement allows the request"),
+}
+OTHER_DENY_RULE = ("S3-GUARD-030", 50, "Denied by {sid}")
+BYPASS_RULE = ("S3-GUARD-099", 100, "Request succeeded although the merged policy denies it ({sid})")
+
+
+class AnalyzerError(RuntimeError):
+    """Raised when the analyzer cannot load its inputs or deliver alerts."""
+
+
+def build_finding(record: Mapping[str, Any], decision: Decision) -> Optional[Dict[str, Any]]:
+    """Turn a Deny decision into a finding in the ``findings.json`` shape; Allow yields ``None``."""
+    if decision.allowed:
+        return None
+    if record.get("observed") == "Allow":
+        rule_id, score, condition = BYPASS_RULE
+    else:
+        rule_id, score, condition = RULES.get(decision.sid, OTHER_DENY_RULE)
+    action = str(record.get("action", ""))
+    bucket, key = split_resource(str(record.get("resource", "")))
+    finding: Dict[str, Any] = {
+        "ruleId": rule_id,
+        "eventName": record.get("eventName") or action.split(":", 1)[-1],
+        "principal": record.get("principalArn"),
+        "bucketName": bucket,
+        "key": key or None,
+        "action": action,
+        "effect": "DENY",
+        "statement": decision.sid,
+        "condition": condition.format(sid=decision.sid),
+        "riskScore": score,
+        "eventTime": record.get("eventTime"),
+        "requestId": record.get("id"),
+    }
+    if "observed" in record:
+        finding["observed"] = record["observed"]
+    return finding
+
+
+class AlertSink(ABC):
+    """Destination for alert batches. Subclasses implement :meth:`emit`."""
+
+    @abstractmethod
+    async def emit(self, batch: Sequence[Mapping[str, Any]]) -> None:
+        """Deliver one batch; raise ``OSError``/``AnalyzerError`` to have it retried."""
+
+    async def close(self) -> None:
+        return None
+
+
+class FileSink(AlertSink):
+    """Appends each finding as one NDJSON line."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._handle = path.open("a", encoding="utf-8")
+
+    async def emit(self, batch: Sequence[Mapping[str, Any]]) -> None:
+        payload = "".join(json.dumps(finding, separators=(",", ":")) + "\n" for finding in batch)
+        await asyncio.to_thread(self._write, payload)
+
+    def _write(self, payload: str) -> None:
+        self._handle.write(payload)
+        self._handle.flush()
+
+    async def close(self) -> None:
+        self._handle.close()
+
+
+class WebhookSink(AlertSink):
+    """POSTs each batch as ``{"findings": [...]}`` to a plain-HTTP endpoint such as :class:`WebhookStub`."""
+
+    def __init__(self, url: str, timeout: float = 5.0) -> None:
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise AnalyzerError(f"webhook sink only supports http:// URLs, got {url!r}")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or "/"
+        self.timeout = timeout
+
+    async def emit(self, batch: Sequence[Mapping[str, Any]]) -> None:
+        body = json.dumps({"findings": list(batch)}, separators=(",", ":")).encode("utf-8")
+        head = (
+            f"POST {self.path} HTTP/1.1\r\nhost: {self.host}:{self.port}\r\ncontent-type: application/json\r\n"
+            f"content-length: {len(body)}\r\nconnection: close\r\n\r\n"
+        ).encode("latin-1")
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        try:
+            writer.write(head + body)
+            await writer.drain()
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+        finally:
+            writer.close()
+        try:
+            status = int(status_line.split(b" ", 2)[1])
+        except (IndexError, ValueError) as exc:
+            raise AnalyzerError(f"malformed webhook response {status_line!r}") from exc
+        if not 200 <= status < 300:
+            raise AnalyzerError(f"webhook answered HTTP {status}")
+
+
+class ScoringSink(AlertSink):
+    """Delivers to ``inner`` and then folds the delivered batch into a :class:`RiskScorer` checkpointed at ``path``.
+
+    Checkpoint failures are logged and counted, never raised: once ``inner`` accepted a batch,
+    raising would make the daemon deliver and score it again.
+    """
+
+    def __init__(self, inner: AlertSink, scorer: RiskScorer, path: Path, checkpoint_interval: float = 30.0) -> None:
+        self.inner = inner
+        self.scorer = scorer
+        self.path = path
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_errors = 0
+        self._last_checkpoint = time.monotonic()
+
+    async def emit(self, batch: Sequence[Mapping[str, Any]]) -> None:
+        await self.inner.emit(batch)  # score only delivered batches so sink retries do not double count
+        self.scorer.observe_all(batch)
+        if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            await self._checkpoint()
+
+    async def _checkpoint(self) -> None:
+        self._last_checkpoint = time.monotonic()
+        payload = RiskScorer.from_json(self.scorer.to_json())
+        try:
+            await asyncio.to_thread(save_scorer, payload, self.path)
+        except OSError as exc:
+            self.checkpoint_errors += 1
+            LOG.warning("risk state checkpoint to %s failed: %s", self.path, exc)
+
+    async def close(self) -> None:
+        try:
+            await self.inner.close()
+        finally:
+            await self._checkpoint()
+
+
+class WebhookStub:
+    """Minimal local receiver for :class:`WebhookSink`; keeps recent batches and can append them to a file."""
+
+    def __init__(self, out: Optional[Path] = None, keep: int = 1000) -> None:
+        self.out = out
+        self.batches: Deque[List[Dict[str, Any]]] = deque(maxlen=keep)
+        self.received = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> Tuple[str, int]:
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        address = self._server.sockets[0].getsockname()
+        LOG.info("webhook stub listening on %s:%s", address[0], address[1])
+        return address[0], address[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            raise AnalyzerError("webhook stub not started")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        status = 202
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.decode("latin-1").split("\r\n")[1:]:
+                if line.lower().startswith("content-length:"):
+                    length = int(line.split(":", 1)[1])
+            findings = json.loads(await reader.readexactly(length)).get("findings", [])
+            self.batches.append(findings)
+            self.received += len(findings)
+            if self.out is not None:
+                with self.out.open("a", encoding="utf-8") as handle:
+                    handle.writelines(json.dumps(finding) + "\n" for finding in findings)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, AttributeError):
+            status = 400
+        reason = "Accepted" if status == 202 else "Bad Request"
+        writer.write(f"HTTP/1.1 {status} {reason}\r\ncontent-length: 0\r\nconnection: close\r\n\r\n".encode("latin-1"))
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+
+@dataclass
+class AnalyzerMetrics:
+    received: int = 0
+    evaluated: int = 0
+    skipped: int = 0
+    invalid: int = 0
+    alerts: int = 0
+    batches: int = 0
+    sink_errors: int = 0
+    dropped_alerts: int = 0
+    max_event_depth: int = 0
+    max_alert_depth: int = 0
+    latency_seconds: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+    started: float = field(default_factory=time.perf_counter)
+
+
+class AnalyzerDaemon:
+    """Evaluate request records through bounded queues and hand findings to an :class:`AlertSink` in batches.
+
+    ``events`` and ``alerts`` are bounded: a slow sink fills ``alerts``, which stalls the
+    workers, which fills ``events``, which stalls the source. Memory therefore stays at
+    ``queue_size`` records plus ``queue_size`` findings regardless of the input rate.
+    """
+
+    def __init__(
+        self,
+        policies: Mapping[Optional[str], CompiledPolicy],
+        sink: AlertSink,
+        *,
+        queue_size: int = 1024,
+        workers: int = 2,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        sink_retries: int = 2,
+        org_ids: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        if not policies:
+            raise AnalyzerError("at least one policy is required")
+        self.policies = dict(policies)
+        self.sink = sink
+        self.queue_size = max(1, queue_size)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.sink_retries = sink_retries
+        self.org_ids = dict(org_ids or {})
+        self.metrics = AnalyzerMetrics()
+        self._events: "asyncio.Queue[Tuple[float, Dict[str, Any]]]" = asyncio.Queue(self.queue_size)
+        self._alerts: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(self.queue_size)
+
+    def policy_for(self, record: Mapping[str, Any]) -> Optional[CompiledPolicy]:
+        bucket, _ = split_resource(str(record.get("resource", "")))
+        return self.policies.get(bucket) or self.policies.get(None)
+
+    async def submit(self, raw: Mapping[str, Any]) -> None:
+        """Queue one raw event, waiting while the event queue is full."""
+        self.metrics.received += 1
+        try:
+            record = normalize_event(raw, self.org_ids)
+        except RecordFormatError as exc:
+            self.metrics.invalid += 1
+            LOG.debug("dropping event: %s", exc)
+            return
+        await self._events.put((time.perf_counter(), record))
+        depth = self._events.qsize()
+        if depth > self.metrics.max_event_depth:
+            self.metrics.max_event_depth = depth
+
+    async def run(
+        self,
+        source: AsyncIterator[Mapping[str, Any]],
+        metrics_interval: float = 0.0,
+        metrics_file: Optional[Path] = None,
+    ) -> Dict[str, Any]:
+        """Consume ``source`` to exhaustion, flush every pending alert and return the final metrics."""
+        workers = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        batcher = asyncio.create_task(self._batch_alerts())
+        reporter = asyncio.create_task(self._report(metrics_interval, metrics_file)) if metrics_interval > 0 else None
+        try:
+            async for raw in source:
+                await self.submit(raw)
+            await self._events.join()
+            await self._alerts.join()
+        finally:
+            for task in [*workers, batcher, *([reporter] if reporter else [])]:
+                task.cancel()
+            await asyncio.gather(*workers, batcher, *([reporter] if reporter else []), return_exceptions=True)
+            await self.sink.close()
+        snapshot = self.metrics_json()
+        if metrics_file is not None:
+            _write_json_atomic(metrics_file, snapshot)
+        return snapshot
+
+    def metrics_json(self) -> Dict[str, Any]:
+        metrics = self.metrics
+        samples = sorted(metrics.latency_seconds)
+        elapsed = time.perf_counter() - metrics.started
+        return {
+            "received": metrics.received,
+            "evaluated": metrics.evaluated,
+            "skipped": metrics.skipped,
+            "invalid": metrics.invalid,
+            "alerts": metrics.alerts,
+            "batches": metrics.batches,
+            "sinkErrors": metrics.sink_errors,
+            "droppedAlerts": metrics.dropped_alerts,
+            "eventsPerSecond": round(metrics.evaluated / elapsed, 1) if elapsed else None,
+            "queueDepth": {
+                "capacity": self.queue_size,
+                "events": self._events.qsize(),
+                "eventsMax": metrics.max_event_depth,
+                "alerts": self._alerts.qsize(),
+                "alertsMax": metrics.max_alert_depth,
+            },
+            "latencyMillis": {
+                name: round(percentile(samples, q) * 1e3, 3)
+                for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+            },
+        }
+
+    async def _worker(self) -> None:
+        while True:
+            enqueued, record = await self._events.get()
+            try:
+                policy = self.policy_for(record)
+                if policy is None:
+                    self.metrics.skipped += 1
+                    continue
+                try:
+                    finding = build_finding(record, policy.decide(record))
+                except Exception as exc:  # pylint: disable=broad-except
+                    # One malformed record must not kill the worker and leave run() waiting on the queue.
+                    self.metrics.invalid += 1
+                    LOG.warning("cannot evaluate record %s: %s: %s", record.get("id"), type(exc).__name__, exc)
+                    continue
+                self.metrics.evaluated += 1
+                self.metrics.latency_seconds.append(time.perf_counter() - enqueued)
+                if finding is not None:
+                    await self._alerts.put(finding)
+                    depth = self._alerts.qsize()
+                    if depth > self.metrics.max_alert_depth:
+                        self.metrics.max_alert_depth = depth
+            finally:
+                self._events.task_done()
+
+    async def _batch_alerts(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._alerts.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                if not self._alerts.empty():
+                    batch.append(self._alerts.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._alerts.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._emit(batch)
+            finally:
+                for _ in batch:
+                    self._alerts.task_done()
+
+    async def _emit(self, batch: List[Dict[str, Any]]) -> None:
+        for attempt in range(self.sink_retries + 1):
+            try:
+                await self.sink.emit(batch)
+            except (OSError, asyncio.TimeoutError, AnalyzerError) as exc:
+                self.metrics.sink_errors += 1
+                LOG.warning("alert sink failed (attempt %d): %s", attempt + 1, exc)
+                await asyncio.sleep(min(0.1 * 2**attempt, 2.0))
+                continue
+            except Exception:  # pylint: disable=broad-except
+                # Retrying cannot fix a programming or payload error; drop the batch but keep the batcher alive.
+                self.metrics.sink_errors += 1
+                LOG.exception("alert sink failed on a batch of %d findings; dropping it", len(batch))
+                break
+            self.metrics.batches += 1
+            self.metrics.alerts += len(batch)
+            return
+        self.metrics.dropped_alerts += len(batch)
+
+    async def _report(self, interval: float, metrics_file: Optional[Path]) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            snapshot = self.metrics_json()
+            LOG.info("metrics %s", json.dumps(snapshot))
+            if metrics_file is not None:
+                await asyncio.to_thread(_write_json_atomic, metrics_file, snapshot)
+
+
+def _write_json_atomic(path: Path, payload: Mapping[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _parse_lines(buffer: bytes) -> Iterator[Dict[str, Any]]:
+    for line in buffer.split(b"\n"):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as exc:
+            LOG.warning("skipping malformed line: %s", exc)
+
+
+async def read_stream(fd: int) -> AsyncIterator[Dict[str, Any]]:
+    """Yield NDJSON objects from a file descriptor (stdin, a pipe or a file) without blocking the loop."""
+    pending = b""
+    while True:
+        chunk = await asyncio.to_thread(os.read, fd, READ_CHUNK)
+        if not chunk:
+            break
+        pending += chunk
+        complete, _, pending = pending.rpartition(b"\n")
+        for record in _parse_lines(complete):
+            yield record
+    for record in _parse_lines(pending):
+        yield record
+
+
+def _next_batch(iterator: Iterator[Dict[str, Any]], size: int = 1000) -> List[Dict[str, Any]]:
+    return list(itertools.islice(iterator, size))
+
+
+class DirectoryTailer:
+    """Follow a log directory.
+
+    ``*.ndjson``/``*.jsonl`` files are tailed by byte offset (a partial last line waits for
+    the next poll, truncation restarts the file). Other log files - CloudTrail ``.json.gz``
+    deliveries or JSON arrays - are read once per (mtime, size).
+    """
+
+    def __init__(self, directory: Path, poll_interval: float = 1.0, once: bool = False) -> None:
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.once = once
+        self._offsets: Dict[Path, int] = {}
+        self._seen: Dict[Path, Tuple[float, int]] = {}
+
+    async def records(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            paths = sorted(path for path in self.directory.iterdir() if is_log_file(path))
+            live = set(paths)
+            for known in (self._offsets, self._seen):
+                for stale in [path for path in known if path not in live]:
+                    del known[stale]
+            for path in paths:
+                if path.name.endswith(TAILED_SUFFIXES):
+                    async for record in self._tail(path):
+                        yield record
+                else:
+                    async for record in self._read_once(path):
+                        yield record
+            if self.once:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    async def _tail(self, path: Path) -> AsyncIterator[Dict[str, Any]]:
+        offset = self._offsets.get(path, 0)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            return
+        if size < offset:
+            LOG.info("%s was truncated; reading from the start", path)
+            offset = 0
+        while offset < size:
+            with path.open("rb") as handle:
+                handle.seek(offset)
+                chunk = handle.read(min(READ_CHUNK, size - offset))
+            complete, newline, _ = chunk.rpartition(b"\n")
+            if not newline:
+                if len(chunk) < READ_CHUNK:
+                    break  # partial line still being written
+                complete = chunk  # pathological line longer than a chunk
+            offset += len(complete) + len(newline)
+            self._offsets[path] = offset
+            for record in _parse_lines(complete):
+                yield record
+
+    async def _read_once(self, path: Path) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            stat = path.stat()
+        except OSError:
+            return
+        marker = (stat.st_mtime, stat.st_size)
+        if self._seen.get(path) == marker:
+            return
+        self._seen[path] = marker
+        iterator = iter_raw(path)
+        while True:
+            try:
+                batch = await asyncio.to_thread(_next_batch, iterator)
+            except (OSError, EOFError, json.JSONDecodeError) as exc:
+                LOG.warning("skipping unreadable log %s: %s", path, exc)
+                return
+            if not batch:
+                return
+            for record in batch:
+                yield record
+
+
+def load_policies(paths: Sequence[Path]) -> Dict[Optional[str], CompiledPolicy]:
+    """Compile each policy keyed by the bucket it protects; a single policy also serves unknown buckets."""
+    policies: Dict[Optional[str], CompiledPolicy] = {}
+    for path in paths:
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                document = json.load(handle)
+            compiled = CompiledPolicy.compile(document)
+        except (OSError, json.JSONDecodeError, PolicyEvaluationError) as exc:
+            raise AnalyzerError(f"failed to load policy {path}: {exc}") from exc
+        policies[infer_bucket(document)] = compiled
+    if len(paths) == 1:
+        policies[None] = next(iter(policies.values()))
+    return policies
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Analyze events from a log directory or stdin")
+    run.add_argument(
+        "--policy",
+        type=Path,
+        action="append",
+        default=[],
+        help="Merged policy JSON; repeatable, one per bucket (default: build/bucket-policy.merged.json)",
+    )
+    source = run.add_mutually_exclusive_group()
+    source.add_argument("--watch", type=Path, default=None, help="Log directory to tail (default: stdin)")
+    source.add_argument("--stdin", action="store_true", help="Read NDJSON events from stdin")
+    run.add_argument("--once", action="store_true", help="With --watch, process the current files and exit")
+    run.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between directory scans")
+    run.add_argument("--org-ids", type=Path, default=None, help="JSON map of CloudTrail accountId to org id")
+    sink = run.add_mutually_exclusive_group()
+    sink.add_argument("--alerts", type=Path, default=Path("artifacts/alerts.ndjson"), help="NDJSON alert file")
+    sink.add_argument("--webhook", default=None, help="POST alert batches to this http:// URL instead of a file")
+    run.add_argument("--risk-state", type=Path, default=None, help="Update this risk-scoring state with delivered alerts")
+    run.add_argument("--queue-size", type=int, default=1024, help="Capacity of the event and alert queues")
+    run.add_argument("--workers", type=int, default=2, help="Evaluation worker tasks")
+    run.add_argument("--batch-size", type=int, default=100, help="Maximum findings per alert batch")
+    run.add_argument("--flush-interval", type=float, default=1.0, help="Seconds before a partial batch is sent")
+    run.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between metrics logs (0: off)")
+    run.add_argument("--metrics-file", type=Path, default=None, help="Latest metrics snapshot JSON path")
+    run.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    run.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+
+    stub = commands.add_parser("webhook-stub", help="Run a local receiver for --webhook alerts")
+    stub.add_argument("--host", default="127.0.0.1", help="Listen address")
+    stub.add_argument("--port", type=int, default=8089, help="Listen port")
+    stub.add_argument("--out", type=Path, default=None, help="Append received findings to this NDJSON file")
+    stub.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+async def _serve_stub(stub: WebhookStub, host: str, port: int) -> None:
+    await stub.start(host, port)
+    await stub.serve_forever()
+
+
+def _run_stub(args: argparse.Namespace) -> int:
+    stub = WebhookStub(out=args.out)
+    try:
+        asyncio.run(_serve_stub(stub, args.host, args.port))
+    except KeyboardInterrupt:  # pragma: no cover - interactive shutdown
+        LOG.info("webhook stub stopped after %d findings", stub.received)
+    except OSError as exc:
+        LOG.error("webhook stub failed: %s", exc)
+        return 2
+    return 0
+
+
+async def _analyze(
+    args: argparse.Namespace, policies: Mapping[Optional[str], CompiledPolicy], org_ids: Mapping[str, str]
+) -> Dict[str, Any]:
+    sink: AlertSink = WebhookSink(args.webhook) if args.webhook else FileSink(args.alerts)
+    if args.risk_state is not None:
+        sink = ScoringSink(sink, load_scorer(args.risk_state, missing_ok=True), args.risk_state)
+    daemon = AnalyzerDaemon(
+        policies,
+        sink,
+        queue_size=args.queue_size,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval,
+        org_ids=org_ids,
+    )
+    if args.watch is not None:
+        source: AsyncIterator[Dict[str, Any]] = DirectoryTailer(args.watch, args.poll_interval, args.once).records()
+    else:
+        source = read_stream(sys.stdin.fileno())
+    return await daemon.run(source, metrics_interval=args.metrics_interval, metrics_file=args.metrics_file)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+    if args.command == "webhook-stub":
+        return _run_stub(args)
+
+    if args.watch is not None and not args.watch.is_dir():
+        LOG.error("log directory %s does not exist", args.watch)
+        return 2
+    try:
+        policies = load_policies(args.policy or [Path("build/bucket-policy.merged.json")])
+        org_ids = load_org_ids(args.org_ids)
+        summary = asyncio.run(_analyze(args, policies, org_ids))
+    except (AnalyzerError, RecordFormatError, RiskScoringError, OSError) as exc:
+        LOG.error("analyzer failed: %s", exc)
+        return 2
+    except KeyboardInterrupt:  # pragma: no cover - interactive shutdown
+        LOG.info("analyzer stopped")
+        return 0
+
+    if args.json:
+        sys.stdout.write(json.dumps(summary) + "\n")
+    else:
+        latency = summary["latencyMillis"]
+        sys.stdout.write(
+            f"analyzer finished: evaluated={summary['evaluated']} alerts={summary['alerts']} "
+            f"skipped={summary['skipped']} invalid={summary['invalid']} p99={latency['p99']}ms "
+            f"maxQueue={summary['queueDepth']['eventsMax']}/{summary['queueDepth']['capacity']}\n"
+        )
+    return 0 if not summary["droppedAlerts"] else 1
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
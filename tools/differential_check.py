@@ -0,0 +1,364 @@
+"""Differential testing of fast policy evaluators against the reference evaluator."""
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import logging
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.evaluate_policy import EVALUATORS
+except ImportError:  # pragma: no cover
+    from evaluate_policy import EVALUATORS
+
+LOG = logging.getLogger("s3_data_perimeter.differential")
+BUCKET_ARN = "arn:aws:s3:::diff-bucket"
+ACTIONS = ("s3:GetObject", "s3:PutObject", "s3:ListBucket", "s3:DeleteObject", "s3:*")
+RESOURCES = (
+    BUCKET_ARN,
+    f"{BUCKET_ARN}/*",
+    f"{BUCKET_ARN}/team-a/*",
+    f"{BUCKET_ARN}/team-a/report.csv",
+    f"{BUCKET_ARN}/team-b/*",
+    "arn:aws:s3:::other-bucket/*",
+    "*",
+)
+REQUEST_RESOURCES = (
+    BUCKET_ARN,
+    f"{BUCKET_ARN}/team-a/report.csv",
+    f"{BUCKET_ARN}/team-a/other.csv",
+    f"{BUCKET_ARN}/team-b/data.csv",
+    f"{BUCKET_ARN}/public/file.txt",
+    "arn:aws:s3:::other-bucket/x",
+)
+PRINCIPALS = (
+    "arn:aws:iam::111111111111:role/Engineering",
+    "arn:aws:iam::123456789012:role/Partner",
+    "arn:aws:iam::999999999999:role/External",
+    "anonymous",
+    "*",
+)
+ORG_IDS = ("o-exampleorg", "o-otherorg", None)
+VPCE_IDS = ("vpce-00000000000000000", "vpce-1234567890", None)
+STRING_KEYS = {
+    "aws:PrincipalOrgID": ORG_IDS[:2],
+    "aws:SourceVpce": VPCE_IDS[:2],
+    "aws:PrincipalType": ("AWS", "Anonymous"),
+    "s3:x-amz-server-side-encryption": ("AES256", "aws:kms"),
+}
+# Malformed request values (e.g. JSON lists or objects in a log field) that evaluators must not choke on.
+UNHASHABLE_VALUES = (["arn:aws:iam::111111111111:role/Engineering"], {"AWS": "*"}, [], ["o-exampleorg"])
+UNHASHABLE_FIELDS = ("principalArn", "resource", "principalOrgId", "sourceVpce")
+STRING_OPERATORS = ("StringEquals", "StringNotEquals", "StringEqualsIfPresent")
+REQUESTS_PER_POLICY = 8
+
+
+@dataclass(frozen=True)
+class Counterexample:
+    policy: Mapping[str, Any]
+    request: Mapping[str, Any]
+    reference: Any
+    candidate: Any
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"policy": self.policy, "request": self.request, "reference": self.reference, "candidate": self.candidate}
+
+
+@dataclass
+class ChunkResult:
+    cases: int = 0
+    counterexamples: List[Counterexample] = field(default_factory=list)
+
+
+def _one_or_many(rng: random.Random, pool: Sequence[Any], limit: int = 3) -> Any:
+    values = rng.sample(pool, rng.randint(1, min(limit, len(pool))))
+    if len(values) == 1 and rng.random() < 0.5:
+        return values[0]
+    return values
+
+
+def random_condition(rng: random.Random) -> Dict[str, Any]:
+    condition: Dict[str, Any] = {}
+    for _ in range(rng.randint(1, 2)):
+        if rng.random() < 0.25:
+            condition.setdefault("Bool", {})["aws:SecureTransport"] = rng.choice((True, False, "true", "false"))
+            continue
+        key = rng.choice(tuple(STRING_KEYS))
+        operator = rng.choice(STRING_OPERATORS)
+        condition.setdefault(operator, {})[key] = _one_or_many(rng, STRING_KEYS[key], limit=2)
+    return condition
+
+
+def random_principal(rng: random.Random) -> Any:
+    roll = rng.random()
+    if roll < 0.4:
+        return "*"
+    if roll < 0.85:
+        return {"AWS": _one_or_many(rng, PRINCIPALS[:4])}
+    if roll < 0.95:
+        return {"AWS": "*"}
+    return {"Service": "cloudtrail.amazonaws.com"}
+
+
+def random_policy(rng: random.Random) -> Dict[str, Any]:
+    statements = []
+    for index in range(rng.randint(1, 6)):
+        statement: Dict[str, Any] = {
+            "Sid": f"S{index}",
+            "Effect": "Deny" if rng.random() < 0.4 else "Allow",
+            "Principal": random_principal(rng),
+            "Action": _one_or_many(rng, ACTIONS),
+            "Resource": _one_or_many(rng, RESOURCES),
+        }
+        if rng.random() < 0.6:
+            statement["Condition"] = random_condition(rng)
+        statements.append(statement)
+    return {"Version": "2012-10-17", "Statement": statements}
+
+
+def random_request(rng: random.Random) -> Dict[str, Any]:
+    anonymous = rng.random() < 0.1
+    request: Dict[str, Any] = {
+        "principalOrgId": rng.choice(ORG_IDS),
+        "principalArn": "anonymous" if anonymous else rng.choice(PRINCIPALS[:3]),
+        "sourceVpce": rng.choice(VPCE_IDS),
+        "action": rng.choice(ACTIONS[:4]),
+        "resource": rng.choice(REQUEST_RESOURCES),
+        "secureTransport": rng.random() < 0.8,
+        "isAnonymous": anonymous,
+    }
+    if rng.random() < 0.05:
+        del request["principalArn"]
+    return request
+
+
+def malformed_request(rng: random.Random) -> Dict[str, Any]:
+    """A :func:`random_request` with one field replaced by a list or object, as a garbled log line might carry."""
+    request = random_request(rng)
+    request[rng.choice(UNHASHABLE_FIELDS)] = rng.choice(UNHASHABLE_VALUES)
+    return request
+
+
+def _outcome(factory: Callable[[Mapping[str, Any]], Callable[[Mapping[str, Any]], bool]], policy: Mapping[str, Any], request: Mapping[str, Any]) -> Any:
+    try:
+        return factory(policy)(request)
+    except Exception as exc:  # pylint: disable=broad-except
+        return f"error: {type(exc).__name__}"
+
+
+def disagrees(candidate: str, policy: Mapping[str, Any], request: Mapping[str, Any]) -> bool:
+    return _outcome(EVALUATORS["reference"], policy, request) != _outcome(EVALUATORS[candidate], policy, request)
+
+
+def _policy_reductions(policy: Mapping[str, Any]) -> Iterator[Dict[str, Any]]:
+    statements = policy.get("Statement", [])
+    for index in range(len(statements)):
+        reduced = copy.deepcopy(dict(policy))
+        del reduced["Statement"][index]
+        yield reduced
+    for index, statement in enumerate(statements):
+        for key, value in statement.items():
+            if key == "Condition":
+                reduced = copy.deepcopy(dict(policy))
+                del reduced["Statement"][index]["Condition"]
+                yield reduced
+                for operator, expression in value.items():
+                    reduced = copy.deepcopy(dict(policy))
+                    condition = reduced["Statement"][index]["Condition"]
+                    if len(expression) > 1:
+                        for cond_key in expression:
+                            narrowed = copy.deepcopy(reduced)
+                            del narrowed["Statement"][index]["Condition"][operator][cond_key]
+                            yield narrowed
+                    del condition[operator]
+                    yield reduced
+            elif isinstance(value, list):
+                for item_index in range(len(value)):
+                    reduced = copy.deepcopy(dict(policy))
+                    items = reduced["Statement"][index][key]
+                    if len(items) > 1:
+                        del items[item_index]
+                    else:
+                        reduced["Statement"][index][key] = items[0]
+                    yield reduced
+            elif key == "Principal" and value != "*":
+                reduced = copy.deepcopy(dict(policy))
+                reduced["Statement"][index]["Principal"] = "*"
+                yield reduced
+
+
+def _request_reductions(request: Mapping[str, Any]) -> Iterator[Dict[str, Any]]:
+    defaults = {"secureTransport": True, "isAnonymous": False}
+    for key in list(request):
+        reduced = dict(request)
+        del reduced[key]
+        yield reduced
+        if key in defaults and request[key] != defaults[key]:
+            reduced = dict(request)
+            reduced[key] = defaults[key]
+            yield reduced
+
+
+def shrink(candidate: str, policy: Mapping[str, Any], request: Mapping[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Greedily drop statements, list items, conditions and request fields while the disagreement persists."""
+    current_policy = copy.deepcopy(dict(policy))
+    current_request = dict(request)
+    progress = True
+    while progress:
+        progress = False
+        for reduced in _policy_reductions(current_policy):
+            if disagrees(candidate, reduced, current_request):
+                current_policy = reduced
+                progress = True
+                break
+        if progress:
+            continue
+        for reduced_request in _request_reductions(current_request):
+            if disagrees(candidate, current_policy, reduced_request):
+                current_request = reduced_request
+                progress = True
+                break
+    return current_policy, current_request
+
+
+def run_chunk(candidate: str, seed: int, chunk: int, cases: int, max_failures: int = 5) -> ChunkResult:
+    rng = random.Random(f"{seed}:{chunk}")
+    reference_factory = EVALUATORS["reference"]
+    candidate_factory = EVALUATORS[candidate]
+    result = ChunkResult()
+    while result.cases < cases:
+        policy = random_policy(rng)
+        try:
+            reference_eval = reference_factory(policy)
+            candidate_eval = candidate_factory(policy)
+        except Exception:  # pylint: disable=broad-except
+            reference_eval = candidate_eval = None
+        for _ in range(min(REQUESTS_PER_POLICY, cases - result.cases)):
+            request = malformed_request(rng) if rng.random() < 0.05 else random_request(rng)
+            result.cases += 1
+            if reference_eval is not None and candidate_eval is not None:
+                try:
+                    if reference_eval(request) == candidate_eval(request):
+                        continue
+                except Exception:  # pylint: disable=broad-except
+                    pass
+            if not disagrees(candidate, policy, request):
+                continue
+            small_policy, small_request = shrink(candidate, policy, request)
+            result.counterexamples.append(
+                Counterexample(
+                    policy=small_policy,
+                    request=small_request,
+                    reference=_outcome(reference_factory, small_policy, small_request),
+                    candidate=_outcome(candidate_factory, small_policy, small_request),
+                )
+            )
+            if len(result.counterexamples) >= max_failures:
+                return result
+    return result
+
+
+def _run_chunk_args(args: Tuple[str, int, int, int, int]) -> ChunkResult:
+    return run_chunk(*args)
+
+
+def run_differential(
+    candidate: str,
+    cases: int,
+    *,
+    seed: int = 0,
+    workers: int = 1,
+    chunk_size: int = 20000,
+    max_failures: int = 5,
+) -> ChunkResult:
+    if candidate not in EVALUATORS:
+        raise KeyError(f"unknown evaluator {candidate}; choose from {', '.join(sorted(EVALUATORS))}")
+    chunks = [
+        (candidate, seed, index, min(chunk_size, cases - start), max_failures)
+        for index, start in enumerate(range(0, cases, chunk_size))
+    ]
+    total = ChunkResult()
+    if workers <= 1:
+        results: Iterator[ChunkResult] = map(_run_chunk_args, chunks)
+        for result in results:
+            _accumulate(total, result)
+            if len(total.counterexamples) >= max_failures:
+                break
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(_run_chunk_args, chunks):
+            _accumulate(total, result)
+    return total
+
+
+def _accumulate(total: ChunkResult, result: ChunkResult) -> None:
+    total.cases += result.cases
+    total.counterexamples.extend(result.counterexamples)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidate", default="compiled", help="Evaluator to compare against the reference")
+    parser.add_argument("--cases", type=int, default=200000, help="Number of policy/request pairs to check")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Cases per worker task")
+    parser.add_argument("--max-failures", type=int, default=5, help="Stop collecting after this many counterexamples")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    started = time.perf_counter()
+    try:
+        result = run_differential(
+            args.candidate,
+            args.cases,
+            seed=args.seed,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            max_failures=args.max_failures,
+        )
+    except KeyError as exc:
+        LOG.error("%s", exc.args[0])
+        return 2
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        "status": "success" if not result.counterexamples else "failed",
+        "candidate": args.candidate,
+        "cases": result.cases,
+        "casesPerMinute": int(result.cases / elapsed * 60) if elapsed else None,
+        "counterexamples": [item.to_json() for item in result.counterexamples[: args.max_failures]],
+    }
+    if args.json:
+        sys.stdout.write(json.dumps(summary) + "\n")
+    else:
+        sys.stdout.write(
+            f"differential {summary['status']}: candidate={args.candidate} cases={result.cases} "
+            f"rate={summary['casesPerMinute']}/min counterexamples={len(result.counterexamples)}\n"
+        )
+        for item in summary["counterexamples"]:
+            sys.stdout.write(json.dumps(item, indent=2) + "\n")
+    return 0 if not result.counterexamples else 1
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,308 @@
+"""Local S3-compatible HTTP stand-in that enforces a merged bucket policy from request headers."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Mapping, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, quote, unquote, urlsplit
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.evaluate_policy import CompiledPolicy, PolicyEvaluationError
+except ImportError:  # pragma: no cover
+    from evaluate_policy import CompiledPolicy, PolicyEvaluationError
+
+LOG = logging.getLogger("s3_data_perimeter.proxy")
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 9000
+METRICS_PATH = "/_perimeter/metrics"
+LATENCY_SAMPLES = 10000
+
+HEADER_PRINCIPAL = "x-perimeter-principal-arn"
+HEADER_ORG_ID = "x-perimeter-principal-org-id"
+HEADER_VPCE = "x-perimeter-source-vpce"
+HEADER_SECURE = "x-perimeter-secure-transport"
+HEADER_ANONYMOUS = "x-perimeter-anonymous"
+
+# (method, object-level?, sub-resource) -> action. The first route listed for an action is
+# the one used when turning a request record back into HTTP.
+ROUTES: Tuple[Tuple[Tuple[str, bool, Optional[str]], str], ...] = (
+    (("GET", True, None), "s3:GetObject"),
+    (("HEAD", True, None), "s3:GetObject"),
+    (("GET", True, "versionId"), "s3:GetObjectVersion"),
+    (("GET", True, "tagging"), "s3:GetObjectTagging"),
+    (("PUT", True, "tagging"), "s3:PutObjectTagging"),
+    (("PUT", True, "acl"), "s3:PutObjectAcl"),
+    (("PUT", True, None), "s3:PutObject"),
+    (("DELETE", True, None), "s3:DeleteObject"),
+    (("GET", False, None), "s3:ListBucket"),
+    (("GET", False, "versions"), "s3:ListBucketVersions"),
+    (("GET", False, "uploads"), "s3:ListBucketMultipartUploads"),
+    (("GET", False, "location"), "s3:GetBucketLocation"),
+    (("PUT", False, "acl"), "s3:PutBucketAcl"),
+    (("PUT", False, "policy"), "s3:PutBucketPolicy"),
+    (("DELETE", False, "policy"), "s3:DeleteBucketPolicy"),
+)
+ACTION_BY_ROUTE = dict(ROUTES)
+ROUTE_BY_ACTION: Dict[str, Tuple[str, bool, Optional[str]]] = {}
+for _route, _action in ROUTES:
+    ROUTE_BY_ACTION.setdefault(_action, _route)
+SUBRESOURCES = {route[2] for route, _ in ROUTES if route[2]}
+
+REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed"}
+ACCESS_DENIED_BODY = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    "<Error><Code>AccessDenied</Code><Message>Access Denied</Message></Error>"
+).encode("utf-8")
+
+
+class ProxyError(RuntimeError):
+    """Raised when an HTTP request cannot be mapped to an S3 action."""
+
+
+@dataclass
+class ProxyMetrics:
+    requests: int = 0
+    decisions: Counter = field(default_factory=Counter)
+    statuses: Counter = field(default_factory=Counter)
+    evaluation_seconds: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+    def to_json(self) -> Dict[str, Any]:
+        samples = sorted(self.evaluation_seconds)
+        return {
+            "requests": self.requests,
+            "decisions": dict(self.decisions),
+            "statuses": {str(key): value for key, value in self.statuses.items()},
+            "evaluationMicros": {
+                name: round(percentile(samples, q) * 1e6, 2) for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))
+            },
+        }
+
+
+def percentile(sorted_samples: Sequence[float], quantile: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, int(round(quantile * (len(sorted_samples) - 1)))))
+    return sorted_samples[index]
+
+
+def _header_bool(value: Optional[str], default: bool) -> bool:
+    if value is None:
+        return default
+    return value.strip().lower() == "true"
+
+
+def http_to_request(method: str, target: str, headers: Mapping[str, str]) -> Tuple[str, Dict[str, Any]]:
+    """Map an S3 path-style HTTP request to ``(bucket, request record)`` for the evaluator."""
+    parts = urlsplit(target)
+    path = unquote(parts.path.lstrip("/"))
+    if not path:
+        raise ProxyError("bucket name missing from path")
+    bucket, _, key = path.partition("/")
+    query = {name for name, _ in parse_qsl(parts.query, keep_blank_values=True)}
+    subresource = next((name for name in sorted(query) if name in SUBRESOURCES), None)
+    action = ACTION_BY_ROUTE.get((method, bool(key), subresource))
+    if action is None:
+        raise ProxyError(f"unsupported operation {method} {target}")
+
+    anonymous = _header_bool(headers.get(HEADER_ANONYMOUS), HEADER_PRINCIPAL not in headers)
+    request: Dict[str, Any] = {
+        "principalOrgId": headers.get(HEADER_ORG_ID),
+        "principalArn": "anonymous" if anonymous else headers.get(HEADER_PRINCIPAL),
+        "sourceVpce": headers.get(HEADER_VPCE),
+        "action": action,
+        "resource": f"arn:aws:s3:::{bucket}/{key}" if key else f"arn:aws:s3:::{bucket}",
+        "secureTransport": _header_bool(headers.get(HEADER_SECURE), True),
+        "isAnonymous": anonymous,
+    }
+    return bucket, request
+
+
+def request_to_http(request: Mapping[str, Any]) -> Tuple[str, str, Dict[str, str]]:
+    """Inverse of :func:`http_to_request` for records in the sample-requests shape."""
+    action = request.get("action")
+    resource = str(request.get("resource") or "")
+    if not resource.startswith("arn:aws:s3:::"):
+        raise ProxyError(f"unsupported resource {resource!r}")
+    bucket, _, key = resource[len("arn:aws:s3:::") :].partition("/")
+    route = ROUTE_BY_ACTION.get(str(action))
+    if route is None or route[1] != bool(key):
+        raise ProxyError(f"no HTTP route for {action} on {resource}")
+    method, _, subresource = route
+    target = "/" + quote(bucket) + ("/" + quote(key) if key else "")
+    if subresource:
+        target += f"?{subresource}" + ("=1" if subresource == "versionId" else "")
+
+    headers: Dict[str, str] = {HEADER_SECURE: "true" if request.get("secureTransport", True) else "false"}
+    if request.get("isAnonymous"):
+        headers[HEADER_ANONYMOUS] = "true"
+    elif request.get("principalArn") is not None:
+        headers[HEADER_PRINCIPAL] = str(request["principalArn"])
+    if request.get("principalOrgId") is not None:
+        headers[HEADER_ORG_ID] = str(request["principalOrgId"])
+    if request.get("sourceVpce") is not None:
+        headers[HEADER_VPCE] = str(request["sourceVpce"])
+    return method, target, headers
+
+
+def infer_bucket(policy: Mapping[str, Any]) -> Optional[str]:
+    for statement in policy.get("Statement", []):
+        resources = statement.get("Resource")
+        for resource in resources if isinstance(resources, list) else [resources]:
+            if isinstance(resource, str) and resource.startswith("arn:aws:s3:::"):
+                name = resource[len("arn:aws:s3:::") :].split("/", 1)[0]
+                if name and "*" not in name:
+                    return name
+    return None
+
+
+class EnforcementProxy:
+    """Answers S3 requests with 2xx or ``AccessDenied`` according to the compiled policy."""
+
+    def __init__(self, policy: Mapping[str, Any], bucket: Optional[str] = None) -> None:
+        self.policy = CompiledPolicy.compile(policy)
+        self.bucket = bucket or infer_bucket(policy)
+        self.metrics = ProxyMetrics()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> Tuple[str, int]:
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        address = self._server.sockets[0].getsockname()
+        LOG.info("enforcement proxy for bucket %s listening on %s:%s", self.bucket, address[0], address[1])
+        return address[0], address[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            raise ProxyError("proxy not started")
+        async with self._server:
+            await self._server.serve_forever()
+
+    def handle(self, method: str, target: str, headers: Mapping[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        if target == METRICS_PATH and method == "GET":
+            return 200, {"content-type": "application/json"}, json.dumps(self.metrics.to_json()).encode("utf-8")
+        status, headers, body = self._enforce(method, target, headers)
+        self.metrics.requests += 1
+        self.metrics.statuses[status] += 1
+        return status, headers, body
+
+    def _enforce(self, method: str, target: str, headers: Mapping[str, str]) -> Tuple[int, Dict[str, str], bytes]:
+        try:
+            bucket, request = http_to_request(method, target, headers)
+        except ProxyError as exc:
+            return 400, {"content-type": "text/plain"}, str(exc).encode("utf-8")
+        if self.bucket is not None and bucket != self.bucket:
+            return 404, {"content-type": "text/plain"}, b"NoSuchBucket"
+
+        started = time.perf_counter()
+        decision = self.policy.decide(request)
+        self.metrics.evaluation_seconds.append(time.perf_counter() - started)
+        self.metrics.decisions[decision.effect] += 1
+        response_headers = {"x-perimeter-decision": decision.effect, "x-perimeter-statement": decision.sid or ""}
+        if not decision.allowed:
+            response_headers["content-type"] = "application/xml"
+            return 403, response_headers, ACCESS_DENIED_BODY
+        return (204 if method == "DELETE" else 200), response_headers, b""
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 400, {}, b"request header too large", keep_alive=False)
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, _ = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {}, b"malformed request line", keep_alive=False)
+                    break
+                headers: Dict[str, str] = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except (TypeError, ValueError):
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {}, b"malformed content-length", keep_alive=False)
+                    break
+                if length:
+                    await reader.readexactly(length)
+
+                status, response_headers, body = self.handle(method.upper(), target, headers)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, response_headers, b"" if method.upper() == "HEAD" else body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):  # pragma: no cover - client went away
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(
+        writer: asyncio.StreamWriter, status: int, headers: Mapping[str, str], body: bytes, keep_alive: bool = True
+    ) -> None:
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}", f"content-length: {len(body)}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append("connection: keep-alive" if keep_alive else "connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--policy", type=Path, default=Path("build/bucket-policy.merged.json"), help="Merged policy JSON")
+    parser.add_argument("--bucket", default=None, help="Bucket name served (inferred from the policy by default)")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Listen address")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Listen port (0 picks a free port)")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+async def _serve(proxy: EnforcementProxy, host: str, port: int) -> None:
+    await proxy.start(host, port)
+    await proxy.serve_forever()
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        with args.policy.open("r", encoding="utf-8") as handle:
+            proxy = EnforcementProxy(json.load(handle), bucket=args.bucket)
+    except (OSError, json.JSONDecodeError, PolicyEvaluationError) as exc:
+        LOG.error("failed to load policy %s: %s", args.policy, exc)
+        return 2
+
+    try:
+        asyncio.run(_serve(proxy, args.host, args.port))
+    except KeyboardInterrupt:  # pragma: no cover - interactive shutdown
+        LOG.info("proxy stopped: %s", json.dumps(proxy.metrics.to_json()))
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,433 @@
+"""Evaluate bucket policy decisions for normalized access requests."""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+LOG = logging.getLogger("s3_data_perimeter.evaluate")
+DEFAULT_PRINCIPAL = "arn:aws:iam::external:role/Unknown"
+WILDCARD_ACTION = "s3:*"
+SUPPORTED_OPERATORS = ("StringEquals", "StringNotEquals", "Bool", "StringEqualsIfPresent")
+
+_OP_EQUALS = 0
+_OP_NOT_EQUALS = 1
+_OP_BOOL = 2
+_OP_EQUALS_IF_PRESENT = 3
+_OPERATOR_CODES = dict(zip(SUPPORTED_OPERATORS, (_OP_EQUALS, _OP_NOT_EQUALS, _OP_BOOL, _OP_EQUALS_IF_PRESENT)))
+_UNMATCHABLE = object()  # stands in for list/dict request values, which equal no policy string
+
+
+class PolicyEvaluationError(RuntimeError):
+    """Raised when a policy cannot be evaluated by the local engine."""
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    sid: Optional[str]
+
+    @property
+    def effect(self) -> str:
+        return "Allow" if self.allowed else "Deny"
+
+
+def build_request_context(request: Mapping[str, Any]) -> Dict[str, Any]:
+    return {
+        "aws:PrincipalOrgID": request.get("principalOrgId"),
+        "aws:SourceVpce": request.get("sourceVpce"),
+        "aws:SecureTransport": str(request.get("secureTransport", True)).lower(),
+        "aws:PrincipalType": "Anonymous" if request.get("isAnonymous") else "AWS",
+    }
+
+
+def _lookup_key(value: Any) -> Any:
+    if value is None or isinstance(value, str):
+        return value
+    try:
+        hash(value)
+    except TypeError:
+        return _UNMATCHABLE
+    return value
+
+
+def _request_keys(request: Mapping[str, Any]) -> Tuple[Any, Any, Dict[str, Any]]:
+    """Principal, resource and condition context for set lookups; unhashable values match nothing, as in the reference."""
+    context = build_request_context(request)
+    for key in ("aws:PrincipalOrgID", "aws:SourceVpce"):
+        context[key] = _lookup_key(context[key])
+    return _lookup_key(request.get("principalArn", DEFAULT_PRINCIPAL)), _lookup_key(request.get("resource")), context
+
+
+def evaluate_reference(policy: Mapping[str, Any], request: Mapping[str, Any]) -> bool:
+    """Straightforward statement-by-statement evaluation; the oracle for faster evaluators."""
+    context = build_request_context(request)
+    principal_arn = request.get("principalArn", DEFAULT_PRINCIPAL)
+    resource = request.get("resource")
+    action = request.get("action")
+
+    deny_match = False
+    allow_match = False
+    for statement in policy.get("Statement", []):
+        if not _reference_action(statement.get("Action"), action):
+            continue
+        if not _reference_resource(statement.get("Resource"), resource):
+            continue
+        if not _reference_principal(statement.get("Principal"), principal_arn, request.get("isAnonymous", False)):
+            continue
+        condition = statement.get("Condition")
+        if condition and not _reference_condition(condition, context):
+            continue
+        effect = statement.get("Effect")
+        if effect == "Deny":
+            deny_match = True
+        elif effect == "Allow":
+            allow_match = True
+    return allow_match and not deny_match
+
+
+def _reference_action(spec: Any, action: Any) -> bool:
+    if isinstance(spec, str):
+        return spec == action or spec == WILDCARD_ACTION
+    if isinstance(spec, list):
+        return any(_reference_action(item, action) for item in spec)
+    return False
+
+
+def _reference_resource(spec: Any, resource: Any) -> bool:
+    if isinstance(spec, str):
+        if spec.endswith("*"):
+            return isinstance(resource, str) and resource.startswith(spec[:-1])
+        return spec == resource
+    if isinstance(spec, list):
+        return any(_reference_resource(item, resource) for item in spec)
+    return False
+
+
+def _reference_principal(spec: Any, principal_arn: Any, is_anonymous: bool) -> bool:
+    if spec == "*":
+        return True
+    if isinstance(spec, dict) and "AWS" in spec:
+        value = spec["AWS"]
+        if isinstance(value, list):
+            return principal_arn in value
+        return value == principal_arn
+    if is_anonymous:
+        return spec == {"AWS": "*"}
+    return False
+
+
+def _reference_condition(condition: Mapping[str, Any], context: Mapping[str, Any]) -> bool:
+    for operator, expression in condition.items():
+        if operator not in _OPERATOR_CODES:
+            raise PolicyEvaluationError(f"unsupported condition operator: {operator}")
+        for key, expected in expression.items():
+            actual = context.get(key)
+            if operator == "Bool":
+                expected_val = expected if isinstance(expected, bool) else str(expected).lower() == "true"
+                if (str(actual).lower() == "true") != expected_val:
+                    return False
+                continue
+            if operator == "StringEqualsIfPresent" and actual is None:
+                continue
+            matched = actual in expected if isinstance(expected, list) else actual == expected
+            if operator == "StringNotEquals":
+                if matched:
+                    return False
+            elif not matched:
+                return False
+    return True
+
+
+class _CompiledStatement:
+    __slots__ = ("sid", "any_principal", "principals", "exact_resources", "resource_prefixes", "conditions")
+
+    def __init__(
+        self,
+        sid: Optional[str],
+        any_principal: bool,
+        principals: Union[FrozenSet[Any], Tuple[Any, ...]],
+        exact_resources: Union[FrozenSet[Any], Tuple[Any, ...]],
+        resource_prefixes: Tuple[str, ...],
+        conditions: Tuple[Tuple[int, str, Any], ...],
+    ) -> None:
+        self.sid = sid
+        self.any_principal = any_principal
+        self.principals = principals
+        self.exact_resources = exact_resources
+        self.resource_prefixes = resource_prefixes
+        self.conditions = conditions
+
+    def matches(self, principal_arn: Any, resource: Any, context: Mapping[str, Any]) -> bool:
+        if not self.any_principal and principal_arn not in self.principals:
+            return False
+        if resource not in self.exact_resources:
+            if not isinstance(resource, str) or not resource.startswith(self.resource_prefixes):
+                return False
+        for code, key, expected in self.conditions:
+            actual = context.get(key)
+            if code == _OP_BOOL:
+                if (str(actual).lower() == "true") != expected:
+                    return False
+            elif code == _OP_EQUALS:
+                if not (actual in expected if isinstance(expected, (frozenset, tuple)) else actual == expected):
+                    return False
+            elif code == _OP_NOT_EQUALS:
+                if actual in expected if isinstance(expected, (frozenset, tuple)) else actual == expected:
+                    return False
+            elif actual is not None:
+                if not (actual in expected if isinstance(expected, (frozenset, tuple)) else actual == expected):
+                    return False
+        return True
+
+
+class CompiledPolicy:
+    """Policy pre-indexed by action with Deny statements split from Allow statements.
+
+    Produces the same decisions as :func:`evaluate_reference` but only visits statements
+    whose Action can match, and stops at the first matching Deny.
+    """
+
+    __slots__ = ("_by_action", "_default")
+
+    def __init__(
+        self,
+        statements: Sequence[_CompiledStatement],
+        effects: Sequence[str],
+        by_action: Mapping[str, Tuple[int, ...]],
+        wildcard: Tuple[int, ...],
+    ) -> None:
+        def partition(indexes: Iterable[int]) -> Tuple[Tuple[_CompiledStatement, ...], Tuple[_CompiledStatement, ...]]:
+            ordered = sorted(set(indexes))
+            denies = tuple(statements[i] for i in ordered if effects[i] == "Deny")
+            allows = tuple(statements[i] for i in ordered if effects[i] == "Allow")
+            return denies, allows
+
+        self._by_action = {action: partition(indexes + wildcard) for action, indexes in by_action.items()}
+        self._default = partition(wildcard)
+
+    @classmethod
+    def compile(cls, policy: Mapping[str, Any]) -> "CompiledPolicy":
+        statements: List[_CompiledStatement] = []
+        effects: List[str] = []
+        by_action: Dict[str, List[int]] = {}
+        wildcard: List[int] = []
+        raw_statements = policy.get("Statement", [])
+        if not isinstance(raw_statements, list):
+            raise PolicyEvaluationError("policy must contain a Statement list")
+
+        for raw in raw_statements:
+            if not isinstance(raw, dict):
+                raise PolicyEvaluationError("each statement must be an object")
+            effect = raw.get("Effect")
+            if effect not in ("Allow", "Deny"):
+                continue
+            actions = _flatten(raw.get("Action"))
+            if not actions:
+                continue
+            index = len(statements)
+            statements.append(_compile_statement(raw))
+            effects.append(effect)
+            if WILDCARD_ACTION in actions:
+                wildcard.append(index)
+                continue
+            for action in dict.fromkeys(actions):
+                by_action.setdefault(action, []).append(index)
+
+        return cls(statements, effects, {key: tuple(value) for key, value in by_action.items()}, tuple(wildcard))
+
+    def _candidates(self, action: Any) -> Tuple[Tuple[_CompiledStatement, ...], Tuple[_CompiledStatement, ...]]:
+        try:
+            return self._by_action.get(action, self._default)
+        except TypeError:
+            return self._default
+
+    def decide(self, request: Mapping[str, Any]) -> Decision:
+        denies, allows = self._candidates(request.get("action"))
+        principal_arn, resource, context = _request_keys(request)
+        for statement in denies:
+            if statement.matches(principal_arn, resource, context):
+                return Decision(allowed=False, sid=statement.sid)
+        for statement in allows:
+            if statement.matches(principal_arn, resource, context):
+                return Decision(allowed=True, sid=statement.sid)
+        return Decision(allowed=False, sid=None)
+
+    def is_allowed(self, request: Mapping[str, Any]) -> bool:
+        return self.decide(request).allowed
+
+    def matching_allow_sids(self, request: Mapping[str, Any]) -> List[Optional[str]]:
+        _, allows = self._candidates(request.get("action"))
+        principal_arn, resource, context = _request_keys(request)
+        return [stmt.sid for stmt in allows if stmt.matches(principal_arn, resource, context)]
+
+
+def _flatten(value: Any) -> List[Any]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        flattened: List[Any] = []
+        for item in value:
+            flattened.extend(_flatten(item))
+        return flattened
+    return []
+
+
+def _as_lookup(values: Iterable[Any]) -> Union[FrozenSet[Any], Tuple[Any, ...]]:
+    items = tuple(values)
+    try:
+        return frozenset(items)
+    except TypeError:
+        return items
+
+
+def _compile_statement(raw: Mapping[str, Any]) -> _CompiledStatement:
+    principal = raw.get("Principal")
+    any_principal = principal == "*"
+    principals: Union[FrozenSet[Any], Tuple[Any, ...]] = frozenset()
+    if not any_principal and isinstance(principal, dict) and "AWS" in principal:
+        value = principal["AWS"]
+        principals = _as_lookup(value if isinstance(value, list) else [value])
+
+    resources = _flatten(raw.get("Resource"))
+    exact = _as_lookup(item for item in resources if not item.endswith("*"))
+    prefixes = tuple(item[:-1] for item in resources if item.endswith("*"))
+
+    sid = raw.get("Sid")
+    return _CompiledStatement(
+        sid=sid if isinstance(sid, str) else None,
+        any_principal=any_principal,
+        principals=principals,
+        exact_resources=exact,
+        resource_prefixes=prefixes,
+        conditions=_compile_conditions(raw.get("Condition")),
+    )
+
+
+def _compile_conditions(condition: Any) -> Tuple[Tuple[int, str, Any], ...]:
+    if not condition:
+        return ()
+    if not isinstance(condition, dict):
+        raise PolicyEvaluationError("Condition must be an object")
+    compiled: List[Tuple[int, str, Any]] = []
+    for operator, expression in condition.items():
+        code = _OPERATOR_CODES.get(operator)
+        if code is None:
+            raise PolicyEvaluationError(f"unsupported condition operator: {operator}")
+        if not isinstance(expression, dict):
+            raise PolicyEvaluationError(f"condition operator {operator} must map keys to values")
+        for key, expected in expression.items():
+            if code == _OP_BOOL:
+                if isinstance(expected, list):
+                    raise PolicyEvaluationError("Bool conditions must compare against a single value")
+                compiled.append((code, key, expected if isinstance(expected, bool) else str(expected).lower() == "true"))
+            elif isinstance(expected, list):
+                compiled.append((code, key, _as_lookup(expected)))
+            else:
+                compiled.append((code, key, expected))
+    return tuple(compiled)
+
+
+def evaluate_compiled(policy: Mapping[str, Any], request: Mapping[str, Any]) -> bool:
+    return CompiledPolicy.compile(policy).is_allowed(request)
+
+
+def _artifact_evaluator(policy: Mapping[str, Any]) -> Callable[[Mapping[str, Any]], bool]:
+    try:  # pragma: no cover - import shim for package vs script execution
+        from tools.policy_artifact import PolicyArtifact
+    except ImportError:  # pragma: no cover
+        from policy_artifact import PolicyArtifact
+    return PolicyArtifact.from_policy(policy).is_allowed
+
+
+EVALUATORS: Dict[str, Callable[[Mapping[str, Any]], Callable[[Mapping[str, Any]], bool]]] = {
+    "reference": lambda policy: lambda request: evaluate_reference(policy, request),
+    "compiled": lambda policy: CompiledPolicy.compile(policy).is_allowed,
+    "artifact": _artifact_evaluator,
+}
+
+
+def load_requests(path: Path) -> List[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as handle:
+        text = handle.read()
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def load_evaluator(policy_path: Optional[Path], artifact: Optional[Path] = None) -> Any:
+    """``CompiledPolicy`` for the JSON policy, or the mapped artifact when one is given."""
+    if artifact is not None:
+        try:  # pragma: no cover - import shim for package vs script execution
+            from tools.policy_artifact import PolicyArtifact, PolicyArtifactError, load_artifact_for
+        except ImportError:  # pragma: no cover
+            from policy_artifact import PolicyArtifact, PolicyArtifactError, load_artifact_for
+        try:
+            return load_artifact_for(policy_path, artifact) if policy_path is not None else PolicyArtifact.open(artifact)
+        except PolicyArtifactError as exc:
+            raise PolicyEvaluationError(str(exc)) from exc
+    if policy_path is None:
+        raise PolicyEvaluationError("a policy or an artifact is required")
+    with policy_path.open("r", encoding="utf-8") as handle:
+        return CompiledPolicy.compile(json.load(handle))
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--policy", type=Path, default=None, help="Merged policy JSON")
+    parser.add_argument(
+        "--artifact",
+        type=Path,
+        default=None,
+        help="Precompiled policy artifact; checked against --policy when both are given",
+    )
+    parser.add_argument("--requests", type=Path, required=True, help="Requests as a JSON array or NDJSON")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    if args.policy is None and args.artifact is None:
+        parser.error("one of --policy or --artifact is required")
+
+    try:
+        compiled = load_evaluator(args.policy, args.artifact)
+        requests = load_requests(args.requests)
+    except (OSError, json.JSONDecodeError, PolicyEvaluationError) as exc:
+        LOG.error("evaluation failed: %s", exc)
+        return 2
+
+    details = []
+    mismatches = 0
+    for request in requests:
+        decision = compiled.decide(request)
+        expected = request.get("expected")
+        if expected is not None and expected != decision.effect:
+            mismatches += 1
+        details.append({"id": request.get("id"), "decision": decision.effect, "sid": decision.sid, "expected": expected})
+
+    if args.json:
+        payload = {"status": "success" if not mismatches else "failed", "evaluated": len(details), "mismatches": mismatches, "details": details}
+        sys.stdout.write(json.dumps(payload) + "\n")
+    else:
+        for item in details:
+            sys.stdout.write(f"{item['id']}: {item['decision']} (sid={item['sid']}, expected={item['expected']})\n")
+    return 2 if mismatches else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,451 @@
+"""Attribute allowed requests to merged exception statements and keep usage in a small mergeable state file."""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.access_records import (
+        RecordFormatError,
+        iter_log_paths,
+        iter_unconsumed,
+        load_org_ids,
+        merge_sources,
+        normalize_event,
+        parse_event_time,
+        split_resource,
+    )
+    from tools.evaluate_policy import CompiledPolicy
+    from tools.merge_policy import (
+        ExceptionEntry,
+        PolicyMergeError,
+        _ensure_variables,
+        _parse_date,
+        build_exception_model,
+        load_exceptions,
+        load_policy,
+        load_requests_directory,
+        merge_policies,
+        parse_variables,
+    )
+    from tools.sketches import CountMinSketch, HyperLogLog, SketchError
+except ImportError:  # pragma: no cover
+    from access_records import (
+        RecordFormatError,
+        iter_log_paths,
+        iter_unconsumed,
+        load_org_ids,
+        merge_sources,
+        normalize_event,
+        parse_event_time,
+        split_resource,
+    )
+    from evaluate_policy import CompiledPolicy
+    from merge_policy import (
+        ExceptionEntry,
+        PolicyMergeError,
+        _ensure_variables,
+        _parse_date,
+        build_exception_model,
+        load_exceptions,
+        load_policy,
+        load_requests_directory,
+        merge_policies,
+        parse_variables,
+    )
+    from sketches import CountMinSketch, HyperLogLog, SketchError
+
+LOG = logging.getLogger("s3_data_perimeter.usage")
+STATE_VERSION = 1
+DEFAULT_STATE = Path("artifacts/exception-usage.json")
+DEFAULT_PRECISION = 10
+DEFAULT_CMS_WIDTH = 4096
+DEFAULT_CMS_DEPTH = 4
+KEY_SEPARATOR = "\x1f"
+
+
+class UsageError(RuntimeError):
+    """Raised when usage state cannot be loaded, merged or written."""
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    parsed = parse_event_time(value)
+    return parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ") if parsed else None
+
+
+@dataclass
+class ExceptionUsage:
+    identifier: str
+    principal_arn: str
+    prefix: str
+    expires_at: str
+    precision: int = DEFAULT_PRECISION
+    hits: int = 0
+    exclusive_hits: int = 0
+    first_seen: Optional[str] = None
+    last_seen: Optional[str] = None
+    principals: HyperLogLog = field(init=False)
+    keys: HyperLogLog = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.principals = HyperLogLog(self.precision)
+        self.keys = HyperLogLog(self.precision)
+
+    @classmethod
+    def for_entry(cls, entry: ExceptionEntry, precision: int) -> "ExceptionUsage":
+        return cls(entry.identifier, entry.principal_arn, entry.prefix, entry.expires_at.isoformat(), precision)
+
+    def observe(self, principal: str, key: str, seen_at: Optional[str], exclusive: bool) -> None:
+        self.hits += 1
+        if exclusive:
+            self.exclusive_hits += 1
+        self.principals.add(principal)
+        if key:
+            self.keys.add(key)
+        if seen_at:
+            if self.first_seen is None or seen_at < self.first_seen:
+                self.first_seen = seen_at
+            if self.last_seen is None or seen_at > self.last_seen:
+                self.last_seen = seen_at
+
+    def merge(self, other: "ExceptionUsage") -> None:
+        self.hits += other.hits
+        self.exclusive_hits += other.exclusive_hits
+        self.principals.merge(other.principals)
+        self.keys.merge(other.keys)
+        self.first_seen = min(filter(None, (self.first_seen, other.first_seen)), default=None)
+        self.last_seen = max(filter(None, (self.last_seen, other.last_seen)), default=None)
+        self.expires_at = max(self.expires_at, other.expires_at)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "principalArn": self.principal_arn,
+            "prefix": self.prefix,
+            "expiresAt": self.expires_at,
+            "hits": self.hits,
+            "exclusiveHits": self.exclusive_hits,
+            "firstSeen": self.first_seen,
+            "lastSeen": self.last_seen,
+            "principals": self.principals.to_json()["registers"],
+            "keys": self.keys.to_json()["registers"],
+        }
+
+    @classmethod
+    def from_json(cls, identifier: str, raw: Mapping[str, Any], precision: int) -> "ExceptionUsage":
+        usage = cls(identifier, str(raw["principalArn"]), str(raw["prefix"]), str(raw["expiresAt"]), precision)
+        usage.hits = int(raw.get("hits", 0))
+        usage.exclusive_hits = int(raw.get("exclusiveHits", 0))
+        usage.first_seen = raw.get("firstSeen")
+        usage.last_seen = raw.get("lastSeen")
+        usage.principals = HyperLogLog.from_json({"precision": precision, "registers": raw["principals"]})
+        usage.keys = HyperLogLog.from_json({"precision": precision, "registers": raw["keys"]})
+        return usage
+
+
+class UsageState:
+    """Per-exception counters and HyperLogLogs plus one count-min sketch shared by every exception.
+
+    Exact hit totals cost one integer per exception. The unbounded breakdowns - hits per
+    (exception, principal) and per (exception, day) - go into the count-min sketch, so the
+    state stays the same size no matter how many months of logs are ingested.
+    """
+
+    def __init__(
+        self,
+        precision: int = DEFAULT_PRECISION,
+        cms_width: int = DEFAULT_CMS_WIDTH,
+        cms_depth: int = DEFAULT_CMS_DEPTH,
+    ) -> None:
+        self.precision = precision
+        self.breakdown = CountMinSketch(cms_width, cms_depth)
+        self.exceptions: Dict[str, ExceptionUsage] = {}
+        self.records = 0
+        self.allowed = 0
+        self.attributed = 0
+        self.sources: Dict[str, Dict[str, Any]] = {}  # consumed log files, as in the access index manifest
+
+    def register(self, entry: ExceptionEntry) -> ExceptionUsage:
+        usage = self.exceptions.get(entry.identifier)
+        if usage is None:
+            usage = self.exceptions[entry.identifier] = ExceptionUsage.for_entry(entry, self.precision)
+        else:
+            usage.expires_at = max(usage.expires_at, entry.expires_at.isoformat())
+        return usage
+
+    def observe(self, entry: ExceptionEntry, record: Mapping[str, Any], exclusive: bool) -> None:
+        usage = self.register(entry)
+        principal = str(record.get("principalArn") or "anonymous")
+        _, key = split_resource(str(record.get("resource", "")))
+        seen_at = _timestamp(record.get("eventTime"))
+        # Sessions of one role count as distinct callers; the breakdown is keyed by the role itself.
+        usage.observe(str(record.get("sessionArn") or principal), key, seen_at, exclusive)
+        self.breakdown.add(KEY_SEPARATOR.join((entry.identifier, "principal", principal)))
+        if seen_at:
+            self.breakdown.add(KEY_SEPARATOR.join((entry.identifier, "day", seen_at[:10])))
+
+    def estimate(self, identifier: str, *, principal: Optional[str] = None, day: Optional[str] = None) -> int:
+        """Upper-bound hit estimate for one exception restricted to a principal or a UTC day."""
+        if principal is not None:
+            return self.breakdown.estimate(KEY_SEPARATOR.join((identifier, "principal", principal)))
+        if day is not None:
+            return self.breakdown.estimate(KEY_SEPARATOR.join((identifier, "day", day)))
+        usage = self.exceptions.get(identifier)
+        return usage.hits if usage else 0
+
+    def merge(self, other: "UsageState") -> None:
+        if other.precision != self.precision:
+            raise UsageError("cannot merge usage states with different HyperLogLog precision")
+        try:
+            self.breakdown.merge(other.breakdown)
+        except SketchError as exc:
+            raise UsageError(str(exc)) from exc
+        for identifier, usage in other.exceptions.items():
+            mine = self.exceptions.get(identifier)
+            if mine is None:
+                self.exceptions[identifier] = usage
+            else:
+                mine.merge(usage)
+        self.records += other.records
+        self.allowed += other.allowed
+        self.attributed += other.attributed
+        merge_sources(self.sources, other.sources)
+
+    def report(self, today: date, *, principal: Optional[str] = None, day: Optional[str] = None) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        for identifier in sorted(self.exceptions):
+            usage = self.exceptions[identifier]
+            if usage.hits == 0:
+                status = "unused"
+            elif usage.exclusive_hits == 0:
+                status = "redundant"
+            else:
+                status = "used"
+            row: Dict[str, Any] = {
+                "id": identifier,
+                "principalArn": usage.principal_arn,
+                "prefix": usage.prefix,
+                "expiresAt": usage.expires_at,
+                "daysToExpiry": (_parse_date(usage.expires_at) - today).days,
+                "status": status,
+                "hits": usage.hits,
+                "exclusiveHits": usage.exclusive_hits,
+                "distinctPrincipals": usage.principals.estimate(),
+                "distinctKeys": usage.keys.estimate(),
+                "firstSeen": usage.first_seen,
+                "lastSeen": usage.last_seen,
+            }
+            if principal is not None or day is not None:
+                row["estimatedHits"] = self.estimate(identifier, principal=principal, day=day)
+            rows.append(row)
+        return rows
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "precision": self.precision,
+            "records": self.records,
+            "allowed": self.allowed,
+            "attributed": self.attributed,
+            "breakdown": self.breakdown.to_json(),
+            "exceptions": {identifier: usage.to_json() for identifier, usage in sorted(self.exceptions.items())},
+            "sources": self.sources,
+        }
+
+    @classmethod
+    def from_json(cls, raw: Mapping[str, Any]) -> "UsageState":
+        if raw.get("version") != STATE_VERSION:
+            raise UsageError(f"unsupported usage state version {raw.get('version')!r}")
+        try:
+            breakdown = CountMinSketch.from_json(raw["breakdown"])
+            state = cls(int(raw["precision"]), breakdown.width, breakdown.depth)
+            state.breakdown = breakdown
+            state.records = int(raw.get("records", 0))
+            state.allowed = int(raw.get("allowed", 0))
+            state.attributed = int(raw.get("attributed", 0))
+            state.sources = {str(key): dict(entry) for key, entry in raw.get("sources", {}).items()}
+            for identifier, usage in raw.get("exceptions", {}).items():
+                state.exceptions[identifier] = ExceptionUsage.from_json(identifier, usage, state.precision)
+        except (KeyError, TypeError, ValueError) as exc:
+            raise UsageError(f"invalid usage state: {exc}") from exc
+        return state
+
+
+def load_state(path: Path, *, missing_ok: bool = False) -> UsageState:
+    if missing_ok and not path.exists():
+        return UsageState()
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            return UsageState.from_json(json.load(handle))
+    except (OSError, json.JSONDecodeError) as exc:
+        raise UsageError(f"failed to read usage state {path}: {exc}") from exc
+
+
+def save_state(state: UsageState, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as handle:
+        json.dump(state.to_json(), handle, separators=(",", ":"))
+        handle.write("\n")
+    os.replace(tmp, path)
+
+
+def exception_sids(exceptions: Sequence[ExceptionEntry], variables: Mapping[str, str]) -> Dict[str, ExceptionEntry]:
+    """Map ``AllowException{n}`` Sids back to the entries :func:`merge_policies` built them from."""
+    sids: Dict[str, ExceptionEntry] = {}
+    for index, entry in enumerate(exceptions):
+        try:
+            sids[build_exception_model(entry, variables, index).sid] = entry
+        except PolicyMergeError:
+            continue
+    return sids
+
+
+class UsageCollector:
+    """Evaluate records against the merged policy and credit every exception statement that allows them.
+
+    A hit is *exclusive* when no other Allow statement matches, i.e. the request would be
+    denied without the exception.
+    """
+
+    def __init__(self, policy: CompiledPolicy, sids: Mapping[str, ExceptionEntry], state: UsageState) -> None:
+        self.policy = policy
+        self.sids = dict(sids)
+        self.state = state
+        for entry in self.sids.values():
+            state.register(entry)
+
+    def observe(self, record: Mapping[str, Any]) -> List[str]:
+        self.state.records += 1
+        if not self.policy.decide(record).allowed:
+            return []
+        self.state.allowed += 1
+        matched = self.policy.matching_allow_sids(record)
+        credited = [sid for sid in matched if sid in self.sids]
+        if credited:
+            self.state.attributed += 1
+        exclusive = len(matched) == 1
+        for sid in credited:
+            self.state.observe(self.sids[sid], record, exclusive)
+        return [self.sids[sid].identifier for sid in credited]
+
+
+def _merge_inputs(args: argparse.Namespace, today: date) -> Tuple[CompiledPolicy, Dict[str, ExceptionEntry]]:
+    variables = _ensure_variables(parse_variables(args.vars))
+    exceptions = load_exceptions(args.exceptions, today, fail_on_expired=False)
+    if args.requests_dir:
+        exceptions.extend(load_requests_directory(args.requests_dir, today))
+    result = merge_policies(load_policy(args.base), exceptions, variables)
+    return CompiledPolicy.compile(result.policy), exception_sids(exceptions, variables)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE, help="Usage state JSON")
+    parser.add_argument("--now", default=None, help="Override current date (YYYY-MM-DD) for deterministic testing")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Add request logs to the usage state")
+    ingest.add_argument("logs", type=Path, nargs="+", help="Log files or directories (NDJSON, JSON, CloudTrail .json.gz)")
+    ingest.add_argument("--base", type=Path, default=Path("policies/bucket-policy.base.json"), help="Baseline policy")
+    ingest.add_argument(
+        "--exceptions", type=Path, default=Path("policies/bucket-policy.exceptions.json"), help="Exceptions JSON"
+    )
+    ingest.add_argument("--requests-dir", type=Path, default=None, help="Pending exception requests directory")
+    ingest.add_argument("--vars", metavar="KEY=VALUE", nargs="*", default=[], help="Template variables")
+    ingest.add_argument("--org-ids", type=Path, default=None, help="JSON map of CloudTrail accountId to org id")
+
+    merge = commands.add_parser("merge", help="Fold other usage states into --state")
+    merge.add_argument("others", type=Path, nargs="+", help="Usage state files to merge")
+
+    report = commands.add_parser("report", help="Summarize usage per exception")
+    report.add_argument("--principal", default=None, help="Also estimate hits by this principal ARN")
+    report.add_argument("--day", default=None, help="Also estimate hits on this UTC day (YYYY-MM-DD)")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        today = _parse_date(args.now) if args.now else datetime.now(timezone.utc).date()
+        if args.command == "ingest":
+            state = load_state(args.state, missing_ok=True)
+            policy, sids = _merge_inputs(args, today)
+            collector = UsageCollector(policy, sids, state)
+            org_ids = load_org_ids(args.org_ids)
+            before = state.records
+            for path in iter_log_paths(args.logs):
+                for raw in iter_unconsumed(path, state.sources):
+                    try:
+                        record = normalize_event(raw, org_ids)
+                    except RecordFormatError as exc:
+                        LOG.debug("skipping record in %s: %s", path, exc)
+                        continue
+                    collector.observe(record)
+            save_state(state, args.state)
+            summary: Dict[str, Any] = {
+                "status": "success",
+                "state": str(args.state),
+                "records": state.records - before,
+                "exceptions": len(state.exceptions),
+            }
+        elif args.command == "merge":
+            state = load_state(args.state, missing_ok=True)
+            for other in args.others:
+                state.merge(load_state(other))
+            save_state(state, args.state)
+            summary = {"status": "success", "state": str(args.state), "records": state.records, "merged": len(args.others)}
+        else:
+            state = load_state(args.state)
+            summary = {
+                "status": "success",
+                "records": state.records,
+                "allowed": state.allowed,
+                "attributed": state.attributed,
+                "exceptions": state.report(today, principal=args.principal, day=args.day),
+            }
+    except (UsageError, PolicyMergeError, RecordFormatError, OSError, EOFError, zlib.error, json.JSONDecodeError) as exc:
+        payload = {"status": "error", "message": str(exc)}
+        if args.json:
+            sys.stdout.write(json.dumps(payload) + "\n")
+        else:
+            LOG.error("exception usage failed: %s", exc)
+        return 2
+
+    if args.json:
+        sys.stdout.write(json.dumps(summary) + "\n")
+    elif args.command == "report":
+        sys.stdout.write(f"records={summary['records']} allowed={summary['allowed']} attributed={summary['attributed']}\n")
+        for row in summary["exceptions"]:
+            line = (
+                f"{row['id']}: {row['status']} hits={row['hits']} exclusive={row['exclusiveHits']} "
+                f"principals~{row['distinctPrincipals']} keys~{row['distinctKeys']} lastSeen={row['lastSeen']} "
+                f"expiresIn={row['daysToExpiry']}d"
+            )
+            if "estimatedHits" in row:
+                line += f" filtered~{row['estimatedHits']}"
+            sys.stdout.write(line + "\n")
+    else:
+        sys.stdout.write(f"{args.command} {summary['status']}: records={summary['records']} state={args.state}\n")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
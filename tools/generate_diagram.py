@@ -2,35 +2,55 @@
 from __future__ import annotations
 
 import argparse
-import json
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
 
-from merge_policy import (
-    _ensure_variables,
-    load_exceptions,
-    load_policy,
-    parse_variables,
-    MergeResult,
-    merge_policies,
-)
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.merge_policy import _ensure_variables, load_exceptions, load_requests_directory, parse_variables
+except ImportError:  # pragma: no cover
+    from merge_policy import _ensure_variables, load_exceptions, load_requests_directory, parse_variables
 
 LOG = logging.getLogger("s3_data_perimeter.diagram")
 DEFAULT_OUTPUT = Path("docs/diagrams.mmd")
+DEFAULT_NODE_BUDGET = 40
+DEFAULT_GROUP_DEPTH = 2
 
 
 def build_arg_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("--base", type=Path, default=Path("policies/bucket-policy.base.json"), help="Baseline policy JSON")
+    parser.add_argument(
+        "--base",
+        type=Path,
+        default=Path("policies/bucket-policy.base.json"),
+        help="Baseline policy JSON (accepted for compatibility; rendering only needs exceptions and variables)",
+    )
     parser.add_argument(
         "--exceptions",
         type=Path,
         default=Path("policies/bucket-policy.exceptions.json"),
         help="Exceptions JSON",
     )
+    parser.add_argument(
+        "--requests-dir",
+        type=Path,
+        default=None,
+        help="Directory containing pending exception request JSON files",
+    )
     parser.add_argument("--out", type=Path, default=DEFAULT_OUTPUT, help="Destination Mermaid file")
+    parser.add_argument(
+        "--node-budget",
+        type=int,
+        default=DEFAULT_NODE_BUDGET,
+        help="Maximum exception nodes before exceptions are grouped (0 disables grouping)",
+    )
+    parser.add_argument(
+        "--group-depth",
+        type=int,
+        default=DEFAULT_GROUP_DEPTH,
+        help="Deepest prefix level used when grouping exceptions",
+    )
     parser.add_argument(
         "--vars",
         metavar="KEY=VALUE",
@@ -62,13 +82,15 @@ def main(argv: Iterable[str] | None = None) -> int:
         datetime.strptime(args.now, "%Y-%m-%d").date() if args.now else datetime.now(timezone.utc).date()
     )
 
-    base_policy = load_policy(args.base)
     exceptions = load_exceptions(args.exceptions, current_date)
-    merge_result: MergeResult = merge_policies(base_policy, exceptions, variables)
+    if args.requests_dir:
+        exceptions.extend(load_requests_directory(args.requests_dir, current_date))
 
-    diagram = build_mermaid(merge_result.policy, exceptions, variables)
     args.out.parent.mkdir(parents=True, exist_ok=True)
-    args.out.write_text(diagram, encoding="utf-8")
+    with args.out.open("w", encoding="utf-8") as handle:
+        for line in iter_mermaid_lines(exceptions, variables, node_budget=args.node_budget, group_depth=args.group_depth):
+            handle.write(line)
+            handle.write("\n")
     LOG.info("diagram generated at %s", args.out)
     return 0
 
@@ -77,41 +99,120 @@ def build_mermaid(
     policy: Mapping[str, Any],
     exceptions: Iterable[Any],
     variables: Mapping[str, str],
+    *,
+    node_budget: int = 0,
+    group_depth: int = DEFAULT_GROUP_DEPTH,
 ) -> str:
+    lines = iter_mermaid_lines(exceptions, variables, node_budget=node_budget, group_depth=group_depth)
+    return "\n".join(lines) + "\n"
+
+
+def iter_mermaid_lines(
+    exceptions: Iterable[Any],
+    variables: Mapping[str, str],
+    *,
+    node_budget: int = DEFAULT_NODE_BUDGET,
+    group_depth: int = DEFAULT_GROUP_DEPTH,
+) -> Iterator[str]:
     org_id = variables["OrgId"]
     vpce_id = variables["VpcEndpointId"]
     bucket_name = variables["BucketName"]
 
-    lines: List[str] = [
-        "graph TD",
-        f"    POrg[Principal in Org ({org_id})] -->|Request via trusted network| VPC[Approved VPC Endpoint {vpce_id}]",
-        "    VPC -->|aws:SourceVpce match| Policy{Bucket Policy Evaluation}",
-        f"    Policy -->|Allow Get/List| Bucket[S3 Bucket {bucket_name}]",
-        "    PExt[Principal outside Org] -.Denied (Org mismatch).-> Policy",
-        "    PVPC[Principal via other VPCe] -.Denied (VPCe mismatch).-> Policy",
+    yield "graph TD"
+    yield f"    POrg[Principal in Org ({org_id})] -->|Request via trusted network| VPC[Approved VPC Endpoint {vpce_id}]"
+    yield "    VPC -->|aws:SourceVpce match| Policy{Bucket Policy Evaluation}"
+    yield f"    Policy -->|Allow Get/List| Bucket[S3 Bucket {bucket_name}]"
+    yield "    PExt[Principal outside Org] -.Denied (Org mismatch).-> Policy"
+    yield "    PVPC[Principal via other VPCe] -.Denied (VPCe mismatch).-> Policy"
+
+    active_exceptions = [_exception_fields(entry) for entry in exceptions]
+    if node_budget <= 0 or len(active_exceptions) <= node_budget:
+        for index, (principal, actions, prefix) in enumerate(active_exceptions):
+            label_actions = ",".join(actions) if actions else "s3:GetObject"
+            node_name = f"Exc{index + 1}"
+            yield f"    {node_name}[Approved Exception: {principal}] -->|Allow {label_actions} on {prefix}| Policy"
+            yield f"    class {node_name} exception;"
+    else:
+        yield from _grouped_exception_lines(active_exceptions, node_budget, group_depth)
+
+    yield "    classDef exception fill:#D5F5E3,stroke:#1E8449,stroke-width:2px;"
+    yield "    classDef deny fill:#FADBD8,stroke:#C0392B,stroke-width:2px,stroke-dasharray: 5 5;"
+    yield "    class PExt,PVPC deny;"
+
+
+def _exception_fields(entry: Any) -> Tuple[str, Tuple[str, ...], str]:
+    principal = entry.principal_arn if hasattr(entry, "principal_arn") else entry.get("principalArn")
+    prefix = entry.prefix if hasattr(entry, "prefix") else entry.get("prefix")
+    actions = entry.actions if hasattr(entry, "actions") else entry.get("actions", [])
+    return str(principal), tuple(actions), str(prefix)
+
+
+def principal_account(principal_arn: str) -> str:
+    parts = principal_arn.split(":")
+    return parts[4] if len(parts) > 5 and parts[4] else principal_arn
+
+
+def truncate_prefix(prefix: str, depth: int) -> str:
+    segments = [segment for segment in prefix.rstrip("*").split("/") if segment]
+    if depth <= 0 or not segments:
+        return "*"
+    if len(segments) <= depth and not prefix.endswith("*"):
+        return "/".join(segments)
+    return "/".join(segments[:depth]) + "/*"
+
+
+def group_exceptions(
+    exceptions: Sequence[Tuple[str, Tuple[str, ...], str]],
+    node_budget: int,
+    group_depth: int,
+) -> List[Tuple[Tuple[Optional[str], str, str], int, int]]:
+    """Group by account, action set and prefix, coarsening until the groups fit ``node_budget``.
+
+    Prefixes are truncated one level at a time from ``group_depth``; if that is not enough the
+    action set and then the prefix are dropped, and finally the smallest groups are folded into
+    a single overflow group whose account is ``None``. Returns
+    ``((account, actions, prefix), exceptions, distinct principals)``.
+    """
+    levels = [(depth, True) for depth in range(max(group_depth, 0), -1, -1)] + [(0, False)]
+    for depth, keep_actions in levels:
+        groups: Dict[Tuple[str, str, str], List[str]] = {}
+        for principal, actions, prefix in exceptions:
+            key = (
+                principal_account(principal),
+                ",".join(sorted(set(actions))) if keep_actions else "*",
+                truncate_prefix(prefix, depth),
+            )
+            groups.setdefault(key, []).append(principal)
+        if len(groups) <= node_budget:
+            break
+
+    ranked = sorted(groups.items(), key=lambda item: (-len(item[1]), item[0]))
+    summary: List[Tuple[Tuple[Optional[str], str, str], int, int]] = [
+        (key, len(principals), len(set(principals))) for key, principals in ranked
     ]
-
-    active_exceptions = list(exceptions)
-    for index, entry in enumerate(active_exceptions):
-        principal = entry.principal_arn if hasattr(entry, "principal_arn") else entry.get("principalArn")
-        prefix = entry.prefix if hasattr(entry, "prefix") else entry.get("prefix")
-        actions = entry.actions if hasattr(entry, "actions") else entry.get("actions", [])
-        label_actions = ",".join(actions) if actions else "s3:GetObject"
-        node_name = f"Exc{index + 1}"
-        lines.append(
-            f"    {node_name}[Approved Exception: {principal}] -->|Allow {label_actions} on {prefix}| Policy"
+    if len(summary) > node_budget:
+        cut = max(node_budget - 1, 0)
+        folded = [principals for _, principals in ranked[cut:]]
+        overflow = ((None, "*", "*"), sum(len(principals) for principals in folded), len(set().union(*folded)))
+        summary = summary[:cut] + [overflow]
+    return summary
+
+
+def _grouped_exception_lines(
+    exceptions: Sequence[Tuple[str, Tuple[str, ...], str]],
+    node_budget: int,
+    group_depth: int,
+) -> Iterator[str]:
+    for index, ((account, actions, prefix), count, principals) in enumerate(
+        group_exceptions(exceptions, node_budget, group_depth)
+    ):
+        node_name = f"ExcGroup{index + 1}"
+        label = "other accounts" if account is None else f"account {account}"
+        yield (
+            f"    {node_name}[Approved Exceptions: {label} ({principals} principals)]"
+            f" -->|Allow {actions} on {prefix} ({count} exceptions)| Policy"
         )
-        lines.append(f"    class {node_name} exception;")
-
-    lines.extend(
-        [
-            "    classDef exception fill:#D5F5E3,stroke:#1E8449,stroke-width:2px;",
-            "    classDef deny fill:#FADBD8,stroke:#C0392B,stroke-width:2px,stroke-dasharray: 5 5;",
-            "    class PExt,PVPC deny;",
-        ]
-    )
-
-    return "\n".join(lines) + "\n"
+        yield f"    class {node_name} exception;"
 
 
 if __name__ == "__main__":  # pragma: no cover
@@ -0,0 +1,347 @@
+"""Generate seeded synthetic exception requests, bucket manifests, and request traffic for scale testing."""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import logging
+import random
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, IO, Iterator, List, Sequence
+
+LOG = logging.getLogger("s3_data_perimeter.fixtures")
+DEFAULT_ORG_ID = "o-exampleorg"
+EXTERNAL_ORG_ID = "o-otherorg"
+ROGUE_VPCE_ID = "vpce-1234567890"
+GENERAL_ALLOW_ACTIONS = ("s3:GetObject", "s3:ListBucket")
+EXCEPTION_ACTION_POOL = (
+    "s3:GetObject",
+    "s3:GetObjectVersion",
+    "s3:GetObjectTagging",
+    "s3:PutObject",
+    "s3:DeleteObject",
+    "s3:ListBucket",
+)
+RESTRICTED_ACTIONS = ("s3:PutObject", "s3:DeleteObject", "s3:PutObjectTagging")
+BUCKET_LEVEL_ACTIONS = {"s3:ListBucket", "s3:ListBucketVersions", "s3:ListBucketMultipartUploads", "s3:GetBucketLocation"}
+ALLOW_SCENARIOS = ("org_access", "exception_allowed")
+DENY_SCENARIOS = (
+    "org_mismatch",
+    "vpce_mismatch",
+    "secure_transport_false",
+    "anonymous_access",
+    "exception_prefix_miss",
+    "action_not_allowed",
+)
+RESTRICTED_ROOT = "restricted"
+
+
+class FixtureGenerationError(RuntimeError):
+    """Raised when fixture generation parameters are invalid."""
+
+
+@dataclass(frozen=True)
+class GeneratorConfig:
+    seed: int = 0
+    buckets: int = 1
+    exceptions: int = 10
+    records: int = 1000
+    deny_ratio: float = 0.3
+    exception_share: float = 0.3
+    org_id: str = DEFAULT_ORG_ID
+    start: datetime = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    days: int = 7
+    expires_at: date = date(2099, 12, 31)
+
+
+@dataclass(frozen=True)
+class SyntheticException:
+    identifier: str
+    principal_arn: str
+    actions: Sequence[str]
+    prefix: str
+    expires_at: date
+    reason: str
+
+    def to_request(self) -> Dict[str, Any]:
+        return {
+            "id": self.identifier,
+            "principalArn": self.principal_arn,
+            "actions": list(self.actions),
+            "prefix": self.prefix,
+            "expiresAt": self.expires_at.isoformat(),
+            "reason": self.reason,
+        }
+
+
+def validate_config(config: GeneratorConfig) -> None:
+    if config.buckets < 1:
+        raise FixtureGenerationError("at least one bucket is required")
+    if config.exceptions < 0 or config.records < 0:
+        raise FixtureGenerationError("exception and record counts must not be negative")
+    if not 0.0 <= config.deny_ratio <= 1.0:
+        raise FixtureGenerationError("deny ratio must be between 0 and 1")
+    if not 0.0 <= config.exception_share <= 1.0:
+        raise FixtureGenerationError("exception share must be between 0 and 1")
+    if config.days < 1:
+        raise FixtureGenerationError("traffic must span at least one day")
+
+
+def build_manifest(config: GeneratorConfig) -> List[Dict[str, str]]:
+    rng = random.Random(f"{config.seed}:manifest")
+    manifest: List[Dict[str, str]] = []
+    for index in range(config.buckets):
+        bucket_name = f"example-data-perimeter-{index:05d}"
+        manifest.append(
+            {
+                "BucketName": bucket_name,
+                "BucketArn": f"arn:aws:s3:::{bucket_name}",
+                "OrgId": config.org_id,
+                "VpcEndpointId": f"vpce-{rng.getrandbits(68):017x}",
+            }
+        )
+    return manifest
+
+
+def build_exceptions(config: GeneratorConfig) -> List[SyntheticException]:
+    rng = random.Random(f"{config.seed}:exceptions")
+    principal_pool = max(1, config.exceptions // 3)
+    entries: List[SyntheticException] = []
+    for index in range(config.exceptions):
+        principal = rng.randrange(principal_pool)
+        account = 100000000000 + principal * 7919
+        actions = sorted(rng.sample(EXCEPTION_ACTION_POOL, rng.randint(1, 3)))
+        prefix = f"team-{index:04d}/*"
+        if rng.random() < 0.5:
+            prefix = f"team-{index:04d}/dataset-{rng.randrange(100):02d}/*"
+        entries.append(
+            SyntheticException(
+                identifier=f"exc-{index + 1:06d}",
+                principal_arn=f"arn:aws:iam::{account}:role/Partner{principal:04d}",
+                actions=actions,
+                prefix=prefix,
+                expires_at=config.expires_at,
+                reason=f"synthetic exception {index + 1}",
+            )
+        )
+    return entries
+
+
+def iter_traffic(
+    config: GeneratorConfig,
+    manifest: Sequence[Dict[str, str]],
+    exceptions: Sequence[SyntheticException],
+) -> Iterator[Dict[str, Any]]:
+    """Yield request records in the sample-requests shape with an ``expected`` outcome per scenario."""
+    rng = random.Random(f"{config.seed}:traffic")
+    span = timedelta(days=config.days).total_seconds()
+    step = span / config.records if config.records else 0.0
+    allow_weights = (1.0 - config.exception_share, config.exception_share if exceptions else 0.0)
+    if not any(allow_weights):
+        allow_weights = (1.0, 0.0)
+
+    for index in range(config.records):
+        bucket = manifest[rng.randrange(len(manifest))]
+        if rng.random() < config.deny_ratio:
+            scenario = DENY_SCENARIOS[rng.randrange(len(DENY_SCENARIOS))]
+            if scenario == "exception_prefix_miss" and not exceptions:
+                scenario = "action_not_allowed"
+        else:
+            scenario = rng.choices(ALLOW_SCENARIOS, weights=allow_weights)[0]
+
+        record = _build_record(rng, scenario, bucket, config.org_id, exceptions)
+        offset = index * step + rng.random() * step
+        record["id"] = f"req-{index + 1:010d}"
+        record["eventTime"] = (config.start + timedelta(seconds=offset)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        record["eventName"] = record["action"].split(":", 1)[1]
+        record["description"] = scenario
+        yield record
+
+
+def _build_record(
+    rng: random.Random,
+    scenario: str,
+    bucket: Dict[str, str],
+    org_id: str,
+    exceptions: Sequence[SyntheticException],
+) -> Dict[str, Any]:
+    bucket_arn = bucket["BucketArn"]
+    record: Dict[str, Any] = {
+        "principalOrgId": org_id,
+        "principalArn": _org_principal(rng),
+        "sourceVpce": bucket["VpcEndpointId"],
+        "action": GENERAL_ALLOW_ACTIONS[0],
+        "resource": f"{bucket_arn}/{_random_key(rng, 'shared')}",
+        "secureTransport": True,
+        "isAnonymous": False,
+        "expected": "Deny",
+    }
+
+    if scenario == "org_access":
+        record["action"] = GENERAL_ALLOW_ACTIONS[rng.randrange(len(GENERAL_ALLOW_ACTIONS))]
+        if record["action"] in BUCKET_LEVEL_ACTIONS:
+            record["resource"] = bucket_arn
+        record["expected"] = "Allow"
+    elif scenario == "exception_allowed":
+        entry = exceptions[rng.randrange(len(exceptions))]
+        record["principalArn"] = entry.principal_arn
+        record["action"] = entry.actions[rng.randrange(len(entry.actions))]
+        if record["action"] in BUCKET_LEVEL_ACTIONS:
+            record["resource"] = bucket_arn
+        else:
+            record["resource"] = f"{bucket_arn}/{_random_key(rng, entry.prefix.rstrip('*').rstrip('/'))}"
+        record["expected"] = "Allow"
+    elif scenario == "org_mismatch":
+        record["principalOrgId"] = EXTERNAL_ORG_ID
+        record["principalArn"] = f"arn:aws:iam::{rng.randrange(900000000000, 999999999999)}:role/External"
+    elif scenario == "vpce_mismatch":
+        record["sourceVpce"] = ROGUE_VPCE_ID
+    elif scenario == "secure_transport_false":
+        record["secureTransport"] = False
+    elif scenario == "anonymous_access":
+        record.update({"principalOrgId": None, "principalArn": "anonymous", "sourceVpce": None, "isAnonymous": True})
+    elif scenario == "exception_prefix_miss":
+        entry = exceptions[rng.randrange(len(exceptions))]
+        record["principalArn"] = entry.principal_arn
+        record["action"] = RESTRICTED_ACTIONS[rng.randrange(len(RESTRICTED_ACTIONS))]
+        record["resource"] = f"{bucket_arn}/{_random_key(rng, RESTRICTED_ROOT)}"
+    elif scenario == "action_not_allowed":
+        record["action"] = RESTRICTED_ACTIONS[rng.randrange(len(RESTRICTED_ACTIONS))]
+    else:  # pragma: no cover - guarded by scenario tables
+        raise FixtureGenerationError(f"unknown scenario {scenario}")
+    return record
+
+
+def _org_principal(rng: random.Random) -> str:
+    return f"arn:aws:iam::{111111111111 + rng.randrange(50)}:role/Engineering{rng.randrange(20):02d}"
+
+
+def _random_key(rng: random.Random, root: str) -> str:
+    return f"{root}/part-{rng.randrange(1000):03d}/object-{rng.getrandbits(32):08x}.csv"
+
+
+def open_output(path: Path) -> IO[str]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".gz":
+        return gzip.open(path, "wt", encoding="utf-8")
+    return path.open("w", encoding="utf-8")
+
+
+def write_ndjson(path: Path, records: Iterator[Dict[str, Any]]) -> int:
+    count = 0
+    with open_output(path) as handle:
+        for record in records:
+            handle.write(json.dumps(record, separators=(",", ":")))
+            handle.write("\n")
+            count += 1
+    return count
+
+
+def write_requests_directory(directory: Path, exceptions: Sequence[SyntheticException]) -> int:
+    directory.mkdir(parents=True, exist_ok=True)
+    for entry in exceptions:
+        path = directory / f"{entry.identifier}.json"
+        with path.open("w", encoding="utf-8") as handle:
+            json.dump(entry.to_request(), handle, indent=2)
+            handle.write("\n")
+    return len(exceptions)
+
+
+def generate(config: GeneratorConfig, out_dir: Path, *, compress: bool = False) -> Dict[str, Any]:
+    validate_config(config)
+    manifest = build_manifest(config)
+    exceptions = build_exceptions(config)
+    traffic_path = out_dir / ("traffic.ndjson.gz" if compress else "traffic.ndjson")
+
+    write_requests_directory(out_dir / "requests", exceptions)
+    write_ndjson(out_dir / "manifest.ndjson", iter(manifest))
+    record_count = write_ndjson(traffic_path, iter_traffic(config, manifest, exceptions))
+    return {
+        "status": "success",
+        "seed": config.seed,
+        "buckets": len(manifest),
+        "exceptions": len(exceptions),
+        "records": record_count,
+        "traffic": str(traffic_path),
+    }
+
+
+def _parse_date(value: str) -> date:
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError as exc:
+        raise FixtureGenerationError(f"invalid date: {value}") from exc
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", type=Path, required=True, help="Output directory for the generated dataset")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed; identical seeds produce identical output")
+    parser.add_argument("--buckets", type=int, default=1, help="Number of buckets in the variable manifest")
+    parser.add_argument("--exceptions", type=int, default=10, help="Number of exception request files")
+    parser.add_argument("--records", type=int, default=1000, help="Number of request records to stream")
+    parser.add_argument("--deny-ratio", type=float, default=0.3, help="Fraction of records expected to be denied")
+    parser.add_argument(
+        "--exception-share",
+        type=float,
+        default=0.3,
+        help="Fraction of allowed records granted through an exception rather than the org-wide allow",
+    )
+    parser.add_argument("--org-id", default=DEFAULT_ORG_ID, help="Organization ID used for in-org principals")
+    parser.add_argument("--start", default="2025-01-01", help="First day of generated traffic (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=7, help="Number of days the traffic spans")
+    parser.add_argument("--expires-at", default="2099-12-31", help="expiresAt for generated exceptions (YYYY-MM-DD)")
+    parser.add_argument("--gzip", action="store_true", help="Compress the traffic stream with gzip")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        start = _parse_date(args.start)
+        config = GeneratorConfig(
+            seed=args.seed,
+            buckets=args.buckets,
+            exceptions=args.exceptions,
+            records=args.records,
+            deny_ratio=args.deny_ratio,
+            exception_share=args.exception_share,
+            org_id=args.org_id,
+            start=datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+            days=args.days,
+            expires_at=_parse_date(args.expires_at),
+        )
+        summary = generate(config, args.out, compress=args.gzip)
+    except FixtureGenerationError as exc:
+        payload = {"status": "error", "message": str(exc)}
+        if args.json:
+            sys.stdout.write(json.dumps(payload) + "\n")
+        else:
+            LOG.error("fixture generation failed: %s", exc)
+        return 2
+
+    if args.json:
+        sys.stdout.write(json.dumps(summary) + "\n")
+    else:
+        sys.stdout.write(
+            f"generate success: buckets={summary['buckets']} exceptions={summary['exceptions']} "
+            f"records={summary['records']} traffic={summary['traffic']}\n"
+        )
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,229 @@
+"""Replay cross-account scenarios and request fixtures against the local enforcement proxy concurrently."""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+import time
+from array import array
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+from urllib.parse import urlsplit
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.enforcement_proxy import ProxyError, percentile, request_to_http
+    from tools.evaluate_policy import load_requests
+except ImportError:  # pragma: no cover
+    from enforcement_proxy import ProxyError, percentile, request_to_http
+    from evaluate_policy import load_requests
+
+LOG = logging.getLogger("s3_data_perimeter.load")
+DEFAULT_ENDPOINT = "http://127.0.0.1:9000"
+DEFAULT_FIXTURES = Path("tests/fixtures/sample-requests.json")
+DEFAULT_BUCKET = "example-data-perimeter-bucket"
+DEFAULT_ORG_ID = "o-exampleorg"
+DEFAULT_VPCE_ID = "vpce-00000000000000000"
+DEFAULT_PARTNER_ARN = "arn:aws:iam::123456789012:role/TeamADataConsumer"
+DEFAULT_EXTERNAL_ARN = "arn:aws:iam::999999999999:role/External"
+
+
+@dataclass(frozen=True)
+class PreparedRequest:
+    identifier: str
+    payload: bytes
+    expected: Optional[str]
+
+
+@dataclass
+class LoadReport:
+    sent: int = 0
+    errors: int = 0
+    mismatches: Counter = field(default_factory=Counter)
+    statuses: Counter = field(default_factory=Counter)
+    latencies: array = field(default_factory=lambda: array("d"))
+    elapsed: float = 0.0
+
+    def to_json(self) -> Dict[str, Any]:
+        samples = sorted(self.latencies)
+        return {
+            "status": "success" if not self.mismatches and not self.errors else "failed",
+            "sent": self.sent,
+            "errors": self.errors,
+            "requestsPerSecond": round(self.sent / self.elapsed, 1) if self.elapsed else None,
+            "latencyMillis": {
+                name: round(percentile(samples, q) * 1e3, 3)
+                for name, q in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+            },
+            "statuses": {str(key): value for key, value in sorted(self.statuses.items())},
+            "mismatches": dict(self.mismatches),
+        }
+
+
+def cross_account_scenarios(
+    bucket: str = DEFAULT_BUCKET,
+    *,
+    org_id: str = DEFAULT_ORG_ID,
+    vpce_id: str = DEFAULT_VPCE_ID,
+    partner_arn: str = DEFAULT_PARTNER_ARN,
+    external_arn: str = DEFAULT_EXTERNAL_ARN,
+    allow_key: str = "team-a/allowlisted-object.txt",
+    deny_key: str = "team-b/restricted-object.txt",
+) -> List[Dict[str, Any]]:
+    """The checks from ``scripts/cross_account_tests.sh`` expressed as request records."""
+    bucket_arn = f"arn:aws:s3:::{bucket}"
+    common = {"sourceVpce": vpce_id, "secureTransport": True, "isAnonymous": False}
+    external = dict(common, principalOrgId="o-otherorg", principalArn=external_arn)
+    partner = dict(common, principalOrgId=org_id, principalArn=partner_arn)
+    return [
+        dict(external, id="cross_account_external_get", action="s3:GetObject", resource=f"{bucket_arn}/{allow_key}", expected="Deny"),
+        dict(external, id="cross_account_external_list", action="s3:ListBucket", resource=bucket_arn, expected="Deny"),
+        dict(partner, id="cross_account_partner_get", action="s3:GetObject", resource=f"{bucket_arn}/{allow_key}", expected="Allow"),
+        dict(partner, id="cross_account_partner_get_denied", action="s3:GetObject", resource=f"{bucket_arn}/{deny_key}", expected="Deny"),
+    ]
+
+
+def prepare_requests(records: Iterable[Mapping[str, Any]], host: str) -> List[PreparedRequest]:
+    prepared: List[PreparedRequest] = []
+    for record in records:
+        try:
+            method, target, headers = request_to_http(record)
+        except ProxyError as exc:
+            LOG.warning("skipping %s: %s", record.get("id"), exc)
+            continue
+        lines = [f"{method} {target} HTTP/1.1", f"host: {host}", "content-length: 0"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+        prepared.append(PreparedRequest(str(record.get("id")), payload, record.get("expected")))
+    return prepared
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _worker(host: str, port: int, source: Iterator[PreparedRequest], report: LoadReport) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request in source:
+            started = time.perf_counter()
+            try:
+                writer.write(request.payload)
+                await writer.drain()
+                status = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                report.errors += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            report.latencies.append(time.perf_counter() - started)
+            report.sent += 1
+            report.statuses[status] += 1
+            if request.expected is not None:
+                observed = "Allow" if 200 <= status < 300 else "Deny" if status == 403 else f"HTTP {status}"
+                if observed != request.expected:
+                    report.mismatches[request.identifier] += 1
+    finally:
+        writer.close()
+
+
+async def run_load(
+    endpoint: str,
+    requests: Sequence[PreparedRequest],
+    *,
+    total: int,
+    concurrency: int = 32,
+) -> LoadReport:
+    """Send ``total`` requests, cycling through ``requests``, over ``concurrency`` keep-alive connections."""
+    parts = urlsplit(endpoint)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    report = LoadReport()
+    if not requests or total <= 0:
+        return report
+    source = itertools.islice(itertools.cycle(requests), total)
+    started = time.perf_counter()
+    await asyncio.gather(*(_worker(host, port, source, report) for _ in range(max(1, concurrency))))
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--endpoint", default=DEFAULT_ENDPOINT, help="Enforcement proxy base URL")
+    parser.add_argument(
+        "--requests",
+        type=Path,
+        action="append",
+        default=[],
+        help="Request fixtures (JSON array or NDJSON); repeatable. Defaults to the sample fixtures",
+    )
+    parser.add_argument("--skip", action="append", default=[], metavar="ID", help="Drop records with this id (repeatable)")
+    parser.add_argument("--no-cross-account", action="store_true", help="Do not add the cross-account scenarios")
+    parser.add_argument("--bucket", default=DEFAULT_BUCKET, help="Bucket name used by the cross-account scenarios")
+    parser.add_argument("--partner-arn", default=DEFAULT_PARTNER_ARN, help="Principal holding the scoped exception")
+    parser.add_argument("--total", type=int, default=10000, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent keep-alive connections")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    records: List[Dict[str, Any]] = []
+    if not args.no_cross_account:
+        records.extend(cross_account_scenarios(args.bucket, partner_arn=args.partner_arn))
+    try:
+        for path in args.requests or [DEFAULT_FIXTURES]:
+            records.extend(load_requests(path))
+    except (OSError, json.JSONDecodeError) as exc:
+        LOG.error("failed to load requests: %s", exc)
+        return 2
+
+    skipped = set(args.skip)
+    host = urlsplit(args.endpoint).netloc
+    prepared = prepare_requests((record for record in records if record.get("id") not in skipped), host)
+    try:
+        report = asyncio.run(run_load(args.endpoint, prepared, total=args.total, concurrency=args.concurrency))
+    except OSError as exc:
+        LOG.error("cannot reach %s: %s", args.endpoint, exc)
+        return 2
+
+    summary = report.to_json()
+    if args.json:
+        sys.stdout.write(json.dumps(summary) + "\n")
+    else:
+        latency = summary["latencyMillis"]
+        sys.stdout.write(
+            f"load {summary['status']}: sent={summary['sent']} rps={summary['requestsPerSecond']} "
+            f"p50={latency['p50']}ms p99={latency['p99']}ms errors={summary['errors']} "
+            f"mismatches={sum(report.mismatches.values())}\n"
+        )
+        for identifier, count in sorted(report.mismatches.items()):
+            sys.stdout.write(f"  mismatch {identifier}: {count}\n")
+    return 0 if summary["status"] == "success" else 1
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -8,7 +8,24 @@ import sys
 from dataclasses import dataclass
 from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Sequence
+from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Sequence, Tuple, TypeVar, Union
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.policy_model import (
+        ConditionBlock,
+        FrozenMapping,
+        PolicyDocument,
+        PolicyStatement,
+        Substitution,
+        freeze,
+        thaw,
+    )
+    from tools.policy_artifact import PolicyArtifact, PolicyArtifactError, artifact_path, policy_digest, write_artifact
+    from tools.policy_fingerprint import policy_fingerprint
+except ImportError:  # pragma: no cover
+    from policy_model import ConditionBlock, FrozenMapping, PolicyDocument, PolicyStatement, Substitution, freeze, thaw
+    from policy_artifact import PolicyArtifact, PolicyArtifactError, artifact_path, policy_digest, write_artifact
+    from policy_fingerprint import policy_fingerprint
 
 LOG = logging.getLogger("s3_data_perimeter.merge")
 DEFAULT_POLICY_VERSION = "2012-10-17"
@@ -32,15 +49,52 @@ class MergeResult:
     skipped_exception_ids: Sequence[str]
 
 
-@dataclass(frozen=True)
+StatementT = TypeVar("StatementT", bound=Union[Dict[str, Any], PolicyStatement])
+
+
+@dataclass(frozen=True, slots=True)
 class ExceptionEntry:
     identifier: str
     principal_arn: str
-    actions: List[str]
+    actions: Tuple[str, ...]
     prefix: str
     expires_at: date
     reason: str
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "identifier", sys.intern(self.identifier))
+        object.__setattr__(self, "principal_arn", sys.intern(self.principal_arn))
+        object.__setattr__(self, "actions", tuple(sys.intern(action) for action in self.actions))
+        object.__setattr__(self, "prefix", sys.intern(self.prefix))
+
+    @classmethod
+    def from_json(cls, raw: Mapping[str, Any]) -> "ExceptionEntry":
+        """Build an entry from the request-file shape without expiry checks; see :func:`load_exceptions`."""
+        actions = raw.get("actions")
+        if "actions" in raw and (not isinstance(actions, list) or not actions or not all(isinstance(a, str) for a in actions)):
+            raise PolicyMergeError("actions must be a non-empty list of strings")
+        try:
+            return cls(
+                identifier=str(raw.get("id") or raw["principalArn"]),
+                principal_arn=str(raw["principalArn"]),
+                actions=tuple(raw["actions"]),
+                prefix=str(raw["prefix"]),
+                expires_at=_parse_date(str(raw["expiresAt"])),
+                reason=str(raw["reason"]),
+            )
+        except KeyError as exc:
+            raise PolicyMergeError(f"exception missing field {exc}") from exc
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "id": self.identifier,
+            "principalArn": self.principal_arn,
+            "actions": list(self.actions),
+            "prefix": self.prefix,
+            "expiresAt": self.expires_at.isoformat(),
+            "reason": self.reason,
+        }
+
 
 def load_policy(path: Path) -> Dict[str, Any]:
     if not path.exists():
@@ -92,7 +146,7 @@ def load_exceptions(path: Path, current_date: date, *, fail_on_expired: bool = T
         entry = ExceptionEntry(
             identifier=str(identifier),
             principal_arn=str(raw["principalArn"]),
-            actions=sorted(actions),
+            actions=tuple(sorted(actions)),
             prefix=prefix,
             expires_at=_parse_date(str(raw["expiresAt"])),
             reason=str(raw["reason"]),
@@ -139,13 +193,13 @@ def merge_policies(
     exceptions: Sequence[ExceptionEntry],
     variables: Mapping[str, str],
 ) -> MergeResult:
-    statements = [json.loads(json.dumps(stmt)) for stmt in base_policy.get("Statement", [])]
+    statements = [PolicyStatement.from_json(stmt) for stmt in base_policy.get("Statement", [])]
     applied: List[str] = []
     skipped: List[str] = []
 
     for index, entry in enumerate(exceptions):
         try:
-            statement = build_exception_statement(entry, variables, index)
+            statement = build_exception_model(entry, variables, index)
         except PolicyMergeError as exc:
             LOG.error("failed to build exception %s: %s", entry.identifier, exc)
             skipped.append(entry.identifier)
@@ -156,44 +210,42 @@ def merge_policies(
     statements = deduplicate_statements(statements)
     statements = sort_statements(statements)
 
-    policy = {
-        "Version": base_policy.get("Version", DEFAULT_POLICY_VERSION),
-        "Statement": statements,
-    }
-    policy = apply_variables(policy, variables)
+    document = PolicyDocument(base_policy.get("Version", DEFAULT_POLICY_VERSION), statements)
+    policy = _apply_variables_model(document, variables).to_json()
     return MergeResult(policy=policy, applied_exception_ids=applied, skipped_exception_ids=skipped)
 
 
 def build_exception_statement(entry: ExceptionEntry, variables: Mapping[str, str], index: int) -> Dict[str, Any]:
+    return build_exception_model(entry, variables, index).to_json()
+
+
+def build_exception_model(entry: ExceptionEntry, variables: Mapping[str, str], index: int) -> PolicyStatement:
     bucket_arn = variables["BucketArn"]
     bucket_name = variables["BucketName"]
     org_id = variables["OrgId"]
     vpce_id = variables["VpcEndpointId"]
 
     resources = derive_resources(entry.actions, bucket_arn, entry.prefix)
-    condition: Dict[str, Any] = {
-        "StringEquals": {
-            "aws:SourceVpce": vpce_id,
-            "aws:PrincipalOrgID": org_id,
-        }
-    }
-
-    sid = f"AllowException{index + 1}"
-    statement = {
-        "Sid": sid,
-        "Effect": "Allow",
-        "Principal": {
-            "AWS": entry.principal_arn,
-        },
-        "Action": sorted(set(entry.actions)),
-        "Resource": sorted(resources),
-        "Condition": condition,
-        "_comment": f"Exception reason: {entry.reason}",
-    }
-
+    condition = [
+        ConditionBlock(
+            "StringEquals",
+            FrozenMapping(sorted([("aws:SourceVpce", freeze(vpce_id)), ("aws:PrincipalOrgID", freeze(org_id))])),
+        )
+    ]
     if any(action.startswith("s3:PutObject") for action in entry.actions):
-        condition.setdefault("StringEqualsIfPresent", {})["s3:x-amz-server-side-encryption"] = ["AES256", "aws:kms"]
-    return statement
+        condition.append(
+            ConditionBlock("StringEqualsIfPresent", FrozenMapping([("s3:x-amz-server-side-encryption", ("AES256", "aws:kms"))]))
+        )
+
+    return PolicyStatement(
+        sid=sys.intern(f"AllowException{index + 1}"),
+        effect="Allow",
+        principal=FrozenMapping([("AWS", entry.principal_arn)]),
+        action=tuple(sorted(set(entry.actions))),
+        resource=freeze(sorted(resources)),
+        condition=tuple(condition),
+        extras=FrozenMapping([("_comment", f"Exception reason: {entry.reason}")]),
+    )
 
 
 def derive_resources(actions: Sequence[str], bucket_arn: str, prefix: str) -> List[str]:
@@ -205,23 +257,25 @@ def derive_resources(actions: Sequence[str], bucket_arn: str, prefix: str) -> Li
     return sorted(resources)
 
 
-def deduplicate_statements(statements: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def deduplicate_statements(statements: Sequence[StatementT]) -> List[StatementT]:
     seen = set()
-    unique: List[Dict[str, Any]] = []
+    unique: List[StatementT] = []
     for statement in statements:
-        encoded = json.dumps(statement, sort_keys=True)
-        if encoded in seen:
+        model = statement if isinstance(statement, PolicyStatement) else PolicyStatement.from_json(statement)
+        key = model.canonical()
+        if key in seen:
             continue
-        seen.add(encoded)
+        seen.add(key)
         unique.append(statement)
     return unique
 
 
-def sort_statements(statements: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    def sort_key(statement: Mapping[str, Any]) -> tuple:
-        sid = statement.get("Sid")
-        effect = statement.get("Effect")
-        action = statement.get("Action")
+def sort_statements(statements: Sequence[StatementT]) -> List[StatementT]:
+    def sort_key(statement: Union[Mapping[str, Any], PolicyStatement]) -> tuple:
+        if isinstance(statement, PolicyStatement):
+            sid, effect, action = statement.sid, statement.effect, thaw(statement.action)
+        else:
+            sid, effect, action = statement.get("Sid"), statement.get("Effect"), statement.get("Action")
         return (
             sid if isinstance(sid, str) else "",
             effect if isinstance(effect, str) else "",
@@ -246,7 +300,7 @@ def load_requests_directory(directory: Path, current_date: date) -> List[Excepti
             raise PolicyMergeError(f"request {path} must be a JSON object")
         try:
             entry = ExceptionEntry(
-                identifier=payload.get("id") or payload["principalArn"],
+                identifier=str(payload.get("id") or payload["principalArn"]),
                 principal_arn=str(payload["principalArn"]),
                 actions=_coerce_actions(payload["actions"], path),
                 prefix=str(payload["prefix"]),
@@ -267,24 +321,37 @@ def _coerce_actions(raw: Any, source: Path) -> List[str]:
     if not all(isinstance(item, str) for item in raw):
         raise PolicyMergeError(f"request {source} actions must contain only strings")
     return list(dict.fromkeys(raw))
+
+
 def apply_variables(document: Dict[str, Any], variables: Mapping[str, str]) -> Dict[str, Any]:
-    def substitute(value: Any) -> Any:
-        if isinstance(value, str):
-            result = value
-            for key, val in variables.items():
-                result = result.replace(f"${{{key}}}", val)
-            return result
-        if isinstance(value, list):
-            return [substitute(item) for item in value]
-        if isinstance(value, dict):
-            return {substitute(key): substitute(val) for key, val in value.items()}
-        return value
-
-    substituted = substitute(document)
-    serialized = json.dumps(substituted, sort_keys=True)
-    if "${" in serialized:
+    return _apply_variables_model(PolicyDocument.from_json(document), variables).to_json()
+
+
+def _apply_variables_model(document: PolicyDocument, variables: Mapping[str, str]) -> PolicyDocument:
+    substitution = Substitution(variables)
+    substituted = document.substitute(substitution)
+    if substitution.unresolved:
         raise PolicyMergeError("unresolved template variables remain after substitution")
-    return json.loads(json.dumps(substituted))
+    return substituted
+
+
+def _existing_policy(path: Path) -> Dict[str, Any] | None:
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            document = json.load(handle)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return document if isinstance(document, dict) else None
+
+
+def _existing_artifact_digest(path: Path) -> str | None:
+    if not path.exists():
+        return None
+    try:
+        with PolicyArtifact.open(path) as artifact:
+            return artifact.digest
+    except (OSError, PolicyArtifactError):
+        return None
 
 
 def build_arg_parser() -> argparse.ArgumentParser:
@@ -308,6 +375,19 @@ def build_arg_parser() -> argparse.ArgumentParser:
     parser.add_argument("--verbose", action="store_true", help="Enable verbose logging for troubleshooting")
     parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
     parser.add_argument("--dry-run", action="store_true", help="Compute the merge without writing output")
+    parser.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="Leave --out untouched when its canonical fingerprint already matches the merge result",
+    )
+    parser.add_argument(
+        "--artifact",
+        type=Path,
+        nargs="?",
+        const=True,
+        default=None,
+        help="Also write a precompiled policy artifact (default path: --out with a .bin suffix)",
+    )
     parser.add_argument(
         "--now",
         default=None,
@@ -344,28 +424,41 @@ def main(argv: Sequence[str] | None = None) -> int:
             sys.stderr.write("merge failed: see logs for details\n")
         return 2
 
+    fingerprint = policy_fingerprint(result.policy).digest
+    existing = _existing_policy(args.out) if args.skip_unchanged else None
+    unchanged = existing is not None and policy_fingerprint(existing).digest == fingerprint
     summary = {
-        "status": "dry-run" if args.dry_run else "success",
+        "status": "dry-run" if args.dry_run else "unchanged" if unchanged else "success",
         "applied": list(result.applied_exception_ids),
         "skipped": list(result.skipped_exception_ids),
         "statementCount": len(result.policy.get("Statement", [])),
+        "fingerprint": fingerprint,
     }
+    artifact = None
+    if args.artifact is not None:
+        artifact = artifact_path(args.out) if args.artifact is True else args.artifact
+        summary["artifact"] = str(artifact)
 
     if args.json:
         sys.stdout.write(json.dumps(summary) + "\n")
     else:
         sys.stdout.write(
-            f"merge {summary['status']}: statements={summary['statementCount']} applied={summary['applied']} skipped={summary['skipped']}\n"
+            f"merge {summary['status']}: statements={summary['statementCount']} applied={summary['applied']} skipped={summary['skipped']} fingerprint={fingerprint[:12]}\n"
         )
 
     if args.dry_run:
         return 0
 
     try:
-        args.out.parent.mkdir(parents=True, exist_ok=True)
-        with args.out.open("w", encoding="utf-8") as handle:
-            json.dump(result.policy, handle, indent=2, sort_keys=True)
-            handle.write("\n")
+        if not unchanged:
+            args.out.parent.mkdir(parents=True, exist_ok=True)
+            with args.out.open("w", encoding="utf-8") as handle:
+                json.dump(result.policy, handle, indent=2, sort_keys=True)
+                handle.write("\n")
+        # An unchanged --out may still order its statements differently; the artifact must match the file on disk.
+        written = existing if unchanged and existing is not None else result.policy
+        if artifact is not None and (not unchanged or _existing_artifact_digest(artifact) != policy_digest(written)):
+            write_artifact(written, artifact)
     except OSError as exc:  # pragma: no cover - filesystem error path
         LOG.error("failed to write merged policy %s: %s", args.out, exc)
         return 1
@@ -0,0 +1,627 @@
+"""Precompile a merged bucket policy into a memory-mapped binary artifact for fast cold-start evaluation."""
+from __future__ import annotations
+
+import argparse
+import json
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.evaluate_policy import (
+        WILDCARD_ACTION,
+        Decision,
+        PolicyEvaluationError,
+        _as_lookup,
+        _compile_statement,
+        _CompiledStatement,
+        _flatten,
+        _request_keys,
+    )
+except ImportError:  # pragma: no cover
+    from evaluate_policy import (
+        WILDCARD_ACTION,
+        Decision,
+        PolicyEvaluationError,
+        _as_lookup,
+        _compile_statement,
+        _CompiledStatement,
+        _flatten,
+        _request_keys,
+    )
+
+LOG = logging.getLogger("s3_data_perimeter.artifact")
+MAGIC = b"S3PART01"
+FORMAT_VERSION = 2
+NONE_ID = 0xFFFFFFFF
+ARTIFACT_SUFFIX = ".bin"
+PRINCIPAL_CACHE_SIZE = 4096
+
+# magic, version, reserved, sha256 policy digest (see :func:`policy_digest`), crc32 of everything after the header,
+# then (offset, count) for: string offsets, string blob, statements, conditions, actions,
+# principals, trie nodes, id lists and trie labels.
+HEADER = struct.Struct("<8sHH32sI18I")
+# sid, effect, any principal, reserved, then (start, count) into the id lists for conditions,
+# principals, exact resources and resource prefixes.
+STATEMENT = struct.Struct("<IBBH8I")
+# operator code, value kind, reserved, key string id, value (string id, bool or list start), list count.
+CONDITION = struct.Struct("<BBHIII")
+# action string id, then (start, count) of Deny and of Allow statement ids in policy order; a
+# trailing row holds the ``s3:*`` statements used for any other action.
+ACTION = struct.Struct("<5I")
+# principal string id, (start, count) of the statements naming it; a trailing row lists the
+# statements with ``Principal: "*"``.
+PRINCIPAL = struct.Struct("<3I")
+# label offset and length, first child and child count, (start, count) of statements whose
+# resource prefix ends here and of statements whose exact resource ends here.
+NODE = struct.Struct("<8I")
+
+EFFECT_CODES = {"Allow": 1, "Deny": 2}
+_KIND_STRING, _KIND_JSON, _KIND_BOOL, _KIND_LIST = range(4)
+
+
+class PolicyArtifactError(RuntimeError):
+    """Raised when an artifact cannot be built, is corrupt, or does not match its source policy."""
+
+
+class _TrieBuilder:
+    __slots__ = ("label", "children", "prefixes", "exact")
+
+    def __init__(self, label: bytes = b"") -> None:
+        self.label = label
+        self.children: Dict[int, "_TrieBuilder"] = {}
+        self.prefixes: List[int] = []
+        self.exact: List[int] = []
+
+    def insert(self, text: bytes, statement: int, exact: bool) -> None:
+        node = self
+        while text:
+            child = node.children.get(text[0])
+            if child is None:
+                child = node.children[text[0]] = _TrieBuilder(text)
+                text = b""
+            else:
+                shared = 0
+                limit = min(len(child.label), len(text))
+                while shared < limit and child.label[shared] == text[shared]:
+                    shared += 1
+                if shared < len(child.label):
+                    middle = _TrieBuilder(child.label[:shared])
+                    child.label = child.label[shared:]
+                    middle.children[child.label[0]] = child
+                    node.children[text[0]] = middle
+                    child = middle
+                text = text[shared:]
+            node = child
+        (node.exact if exact else node.prefixes).append(statement)
+
+
+def artifact_path(policy_path: Path) -> Path:
+    """Default artifact location next to the merged policy JSON."""
+    return policy_path.with_suffix(ARTIFACT_SUFFIX)
+
+
+def build_artifact(policy: Mapping[str, Any]) -> bytes:
+    """Serialize ``policy`` with the same statement semantics as :class:`CompiledPolicy`."""
+    raw_statements = policy.get("Statement", [])
+    if not isinstance(raw_statements, list):
+        raise PolicyEvaluationError("policy must contain a Statement list")
+    compiled: List[Tuple[_CompiledStatement, str]] = []
+    by_action: Dict[str, List[int]] = {}
+    wildcard: List[int] = []
+    for raw in raw_statements:
+        if not isinstance(raw, dict):
+            raise PolicyEvaluationError("each statement must be an object")
+        effect = raw.get("Effect")
+        actions = _flatten(raw.get("Action"))
+        if effect not in EFFECT_CODES or not actions:
+            continue
+        index = len(compiled)
+        compiled.append((_compile_statement(raw), effect))
+        if WILDCARD_ACTION in actions:
+            wildcard.append(index)
+            continue
+        for action in dict.fromkeys(actions):
+            by_action.setdefault(action, []).append(index)
+
+    strings: Dict[str, int] = {}
+
+    def intern(value: Optional[str]) -> int:
+        if value is None:
+            return NONE_ID
+        if not isinstance(value, str):
+            raise PolicyArtifactError(f"artifact values must be strings, got {type(value).__name__}")
+        return strings.setdefault(value, len(strings))
+
+    lists = array("I")
+
+    def span(values: Sequence[int]) -> Tuple[int, int]:
+        start = len(lists)
+        lists.extend(values)
+        return start, len(values)
+
+    # Strings are interned with provisional ids and renumbered in byte order once all are
+    # known, so lookups can binary search the table; id lists are written after renumbering.
+    principal_statements: Dict[int, List[int]] = {}
+    trie = _TrieBuilder()
+    sids: List[int] = []
+    members: List[Tuple[List[int], List[int], List[int]]] = []
+    conditions: List[Tuple[int, int, int, Any]] = []
+    for index, (statement, _) in enumerate(compiled):
+        principal_ids = [intern(principal) for principal in statement.principals]
+        for principal_id in principal_ids:
+            principal_statements.setdefault(principal_id, []).append(index)
+        for resource in statement.exact_resources:
+            trie.insert(resource.encode("utf-8"), index, exact=True)
+        for prefix in statement.resource_prefixes:
+            trie.insert(prefix.encode("utf-8"), index, exact=False)
+        sids.append(intern(statement.sid))
+        members.append(
+            (principal_ids, [intern(item) for item in statement.exact_resources], [intern(item) for item in statement.resource_prefixes])
+        )
+        for code, key, expected in statement.conditions:
+            if isinstance(expected, bool):
+                conditions.append((code, _KIND_BOOL, intern(key), int(expected)))
+            elif isinstance(expected, (frozenset, tuple)):
+                conditions.append((code, _KIND_LIST, intern(key), [intern(json.dumps(item, sort_keys=True)) for item in expected]))
+            elif isinstance(expected, str):
+                conditions.append((code, _KIND_STRING, intern(key), intern(expected)))
+            else:
+                conditions.append((code, _KIND_JSON, intern(key), intern(json.dumps(expected, sort_keys=True))))
+    action_ids = {intern(action): indexes for action, indexes in by_action.items()}
+
+    ordered = sorted(strings, key=lambda text: text.encode("utf-8"))
+    renumber = {strings[text]: new for new, text in enumerate(ordered)}
+    renumber[NONE_ID] = NONE_ID
+
+    condition_rows = bytearray()
+    for code, kind, key, value in conditions:
+        if kind == _KIND_LIST:
+            condition_rows += CONDITION.pack(code, kind, 0, renumber[key], *span([renumber[item] for item in value]))
+        elif kind == _KIND_BOOL:
+            condition_rows += CONDITION.pack(code, kind, 0, renumber[key], value, 0)
+        else:
+            condition_rows += CONDITION.pack(code, kind, 0, renumber[key], renumber[value], 0)
+
+    statement_rows = bytearray()
+    first_condition = 0
+    for (statement, effect), sid, ids in zip(compiled, sids, members):
+        spans = [span(sorted(renumber[item] for item in group)) for group in ids]
+        statement_rows += STATEMENT.pack(
+            renumber[sid],
+            EFFECT_CODES[effect],
+            int(statement.any_principal),
+            0,
+            first_condition,
+            len(statement.conditions),
+            *spans[0],
+            *spans[1],
+            *spans[2],
+        )
+        first_condition += len(statement.conditions)
+
+    def split(indexes: Sequence[int]) -> Tuple[int, int, int, int]:
+        ordered_indexes = sorted(set(indexes))
+        denies = [i for i in ordered_indexes if compiled[i][1] == "Deny"]
+        allows = [i for i in ordered_indexes if compiled[i][1] == "Allow"]
+        return (*span(denies), *span(allows))
+
+    action_rows = bytearray()
+    for string_id in sorted(action_ids, key=renumber.__getitem__):
+        action_rows += ACTION.pack(renumber[string_id], *split(action_ids[string_id] + wildcard))
+    action_rows += ACTION.pack(NONE_ID, *split(wildcard))
+
+    principal_rows = bytearray()
+    for string_id in sorted(principal_statements, key=renumber.__getitem__):
+        principal_rows += PRINCIPAL.pack(renumber[string_id], *span(sorted(set(principal_statements[string_id]))))
+    principal_rows += PRINCIPAL.pack(NONE_ID, *span([index for index, (statement, _) in enumerate(compiled) if statement.any_principal]))
+
+    node_rows: List[bytes] = []
+    labels = bytearray()
+    queue = [trie]
+    position = 0
+    first_child: Dict[int, int] = {}
+    while position < len(queue):  # breadth-first so each node's children are contiguous
+        node = queue[position]
+        first_child[id(node)] = len(queue)
+        queue.extend(node.children[head] for head in sorted(node.children))
+        position += 1
+    for node in queue:
+        label_at = len(labels)
+        labels += node.label
+        node_rows.append(
+            NODE.pack(
+                label_at,
+                len(node.label),
+                first_child[id(node)],
+                len(node.children),
+                *span(sorted(set(node.prefixes))),
+                *span(sorted(set(node.exact))),
+            )
+        )
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for text in ordered:
+        blob += text.encode("utf-8")
+        offsets.append(len(blob))
+    sections = [
+        (offsets.tobytes(), len(ordered)),
+        (bytes(blob), len(blob)),
+        (bytes(statement_rows), len(compiled)),
+        (bytes(condition_rows), len(conditions)),
+        (bytes(action_rows), len(action_ids)),
+        (bytes(principal_rows), len(principal_statements)),
+        (b"".join(node_rows), len(node_rows)),
+        (lists.tobytes(), len(lists)),
+        (bytes(labels), len(labels)),
+    ]
+    table: List[int] = []
+    body = bytearray()
+    for payload, count in sections:
+        body += b"\0" * (-len(body) % 4)
+        table.extend((HEADER.size + len(body), count))
+        body += payload
+    digest = bytes.fromhex(policy_digest(policy))
+    return HEADER.pack(MAGIC, FORMAT_VERSION, 0, digest, zlib.crc32(body), *table) + bytes(body)
+
+
+def policy_digest(policy: Mapping[str, Any]) -> str:
+    """sha256 over the statements in policy order.
+
+    Unlike ``policy_fingerprint`` this is order-sensitive: decisions report the first
+    matching Sid, so reordering statements must invalidate an artifact.
+    """
+    statements = json.dumps(policy.get("Statement", []), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(statements.encode("utf-8")).hexdigest()
+
+
+def write_artifact(policy: Mapping[str, Any], path: Path) -> str:
+    """Write the artifact atomically and return the policy digest it records."""
+    payload = build_artifact(policy)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(payload)
+    os.replace(tmp, path)
+    return payload[12:44].hex()
+
+
+class PolicyArtifact:
+    """Evaluator over an artifact; same decisions as :class:`CompiledPolicy`.
+
+    Opening maps the file and reads the header only. Action, principal and resource lookups
+    go straight to the mapped tables, so a request only materializes the statements that
+    share its action, name its principal (or any principal) and cover its resource.
+    """
+
+    def __init__(self, buffer: Union[bytes, mmap.mmap], *, source: str = "<memory>", handle: Any = None) -> None:
+        self.source = source
+        self._buffer = buffer
+        self._handle = handle
+        try:
+            header = HEADER.unpack_from(buffer, 0)
+        except struct.error as exc:
+            self.close()
+            raise PolicyArtifactError(f"truncated artifact {source}") from exc
+        magic, version, _, digest, checksum = header[:5]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise PolicyArtifactError(f"{source} is not a version {FORMAT_VERSION} policy artifact")
+        self.digest = digest.hex()
+        self._checksum = checksum
+        sections = header[5:]
+        self._offsets_at, self.strings = sections[0:2]
+        self._blob_at = sections[2]
+        self._statements_at, self.statements = sections[4:6]
+        self._conditions_at = sections[6]
+        self._actions_at, self._action_count = sections[8:10]
+        self._principals_at, self._principal_count = sections[10:12]
+        self._nodes_at = sections[12]
+        self._lists_at = sections[14]
+        self._labels_at = sections[16]
+        self._strings: Dict[int, str] = {}
+        self._compiled: Dict[int, Tuple[Optional[str], _CompiledStatement]] = {}
+        self._actions: Dict[Any, Tuple[FrozenSet[int], FrozenSet[int]]] = {}
+        self._principals: Dict[Any, FrozenSet[int]] = {}
+
+    @classmethod
+    def open(cls, path: Path, *, expected_digest: Optional[str] = None, verify: bool = True) -> "PolicyArtifact":
+        handle = path.open("rb")
+        try:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as exc:
+            handle.close()
+            raise PolicyArtifactError(f"empty artifact {path}") from exc
+        artifact = cls(buffer, source=str(path), handle=handle)
+        if verify:
+            try:
+                artifact.verify(expected_digest)
+            except PolicyArtifactError:
+                artifact.close()
+                raise
+        return artifact
+
+    @classmethod
+    def from_policy(cls, policy: Mapping[str, Any]) -> "PolicyArtifact":
+        return cls(build_artifact(policy))
+
+    def verify(self, expected_digest: Optional[str] = None) -> None:
+        """Check the body checksum and, when given, that the artifact was built from the policy with that digest."""
+        if zlib.crc32(memoryview(self._buffer)[HEADER.size :]) != self._checksum:
+            raise PolicyArtifactError(f"checksum mismatch in {self.source}")
+        if expected_digest is not None and expected_digest != self.digest:
+            raise PolicyArtifactError(f"{self.source} was built from policy {self.digest[:12]}, expected {expected_digest[:12]}")
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap) and not self._buffer.closed:
+            self._buffer.close()
+        if self._handle is not None:
+            self._handle.close()
+
+    def __enter__(self) -> "PolicyArtifact":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def string(self, string_id: int) -> Optional[str]:
+        if string_id == NONE_ID:
+            return None
+        cached = self._strings.get(string_id)
+        if cached is None:
+            start, end = struct.unpack_from("<II", self._buffer, self._offsets_at + 4 * string_id)
+            cached = self._strings[string_id] = bytes(self._buffer[self._blob_at + start : self._blob_at + end]).decode("utf-8")
+        return cached
+
+    def find(self, text: Any) -> Optional[int]:
+        """Binary search the sorted string table."""
+        if not isinstance(text, str):
+            return None
+        target = text.encode("utf-8")
+        low, high = 0, self.strings
+        while low < high:
+            middle = (low + high) // 2
+            start, end = struct.unpack_from("<II", self._buffer, self._offsets_at + 4 * middle)
+            probe = self._buffer[self._blob_at + start : self._blob_at + end]
+            if probe < target:
+                low = middle + 1
+            elif probe > target:
+                high = middle
+            else:
+                return middle
+        return None
+
+    def _ids(self, start: int, count: int) -> Tuple[int, ...]:
+        return struct.unpack_from(f"<{count}I", self._buffer, self._lists_at + 4 * start) if count else ()
+
+    def _search(self, table_at: int, row: struct.Struct, rows: int, string_id: int) -> Optional[Tuple[int, ...]]:
+        low, high = 0, rows
+        while low < high:
+            middle = (low + high) // 2
+            fields = row.unpack_from(self._buffer, table_at + row.size * middle)
+            if fields[0] < string_id:
+                low = middle + 1
+            elif fields[0] > string_id:
+                high = middle
+            else:
+                return fields
+        return None
+
+    def _candidates(self, action: Any) -> Tuple[FrozenSet[int], FrozenSet[int]]:
+        try:
+            cached = self._actions.get(action)
+        except TypeError:
+            action, cached = None, None
+        if cached is None:
+            string_id = self.find(action)
+            fields = None if string_id is None else self._search(self._actions_at, ACTION, self._action_count, string_id)
+            if fields is None:
+                fields = ACTION.unpack_from(self._buffer, self._actions_at + ACTION.size * self._action_count)
+            cached = (frozenset(self._ids(fields[1], fields[2])), frozenset(self._ids(fields[3], fields[4])))
+            if action is not None:
+                self._actions[action] = cached
+        return cached
+
+    def _admitted(self, principal_arn: Any) -> FrozenSet[int]:
+        """Statements naming ``principal_arn`` plus those open to any principal."""
+        try:
+            cached = self._principals.get(principal_arn)
+        except TypeError:
+            principal_arn, cached = None, None
+        if cached is None:
+            anyone = PRINCIPAL.unpack_from(self._buffer, self._principals_at + PRINCIPAL.size * self._principal_count)
+            string_id = self.find(principal_arn)
+            fields = None if string_id is None else self._search(self._principals_at, PRINCIPAL, self._principal_count, string_id)
+            cached = frozenset(self._ids(anyone[1], anyone[2]))
+            if fields is not None:
+                cached |= frozenset(self._ids(fields[1], fields[2]))
+            if principal_arn is None:
+                return cached
+            if len(self._principals) >= PRINCIPAL_CACHE_SIZE:
+                self._principals.clear()
+            self._principals[principal_arn] = cached
+        return cached
+
+    def _covering(self, resource: Any) -> FrozenSet[int]:
+        """Statements with a resource prefix of ``resource`` or exactly ``resource``, via the trie."""
+        if not isinstance(resource, str):
+            return frozenset()
+        text = resource.encode("utf-8")
+        found: List[int] = []
+        position = 0
+        node = NODE.unpack_from(self._buffer, self._nodes_at)
+        while True:
+            found.extend(self._ids(node[4], node[5]))
+            if position == len(text):
+                found.extend(self._ids(node[6], node[7]))
+                break
+            child = None
+            for index in range(node[2], node[2] + node[3]):
+                candidate = NODE.unpack_from(self._buffer, self._nodes_at + NODE.size * index)
+                label_at = self._labels_at + candidate[0]
+                if self._buffer[label_at] == text[position]:
+                    child = candidate
+                    break
+            if child is None:
+                break
+            label = self._buffer[self._labels_at + child[0] : self._labels_at + child[0] + child[1]]
+            if text[position : position + child[1]] != label:
+                break
+            position += child[1]
+            node = child
+        return frozenset(found)
+
+    def _statement(self, index: int) -> _CompiledStatement:
+        cached = self._compiled.get(index)
+        if cached is None:
+            fields = STATEMENT.unpack_from(self._buffer, self._statements_at + STATEMENT.size * index)
+            sid, _, any_principal, _, cond_start, cond_count = fields[:6]
+            principals, exact, prefixes = (
+                [self.string(item) for item in self._ids(fields[start], fields[start + 1])] for start in (6, 8, 10)
+            )
+            conditions = []
+            for offset in range(cond_start, cond_start + cond_count):
+                code, kind, _, key, value, count = CONDITION.unpack_from(self._buffer, self._conditions_at + CONDITION.size * offset)
+                if kind == _KIND_BOOL:
+                    expected: Any = bool(value)
+                elif kind == _KIND_LIST:
+                    expected = _as_lookup(json.loads(self.string(item) or "null") for item in self._ids(value, count))
+                elif kind == _KIND_STRING:
+                    expected = self.string(value)
+                else:
+                    expected = json.loads(self.string(value) or "null")
+                conditions.append((code, self.string(key) or "", expected))
+            cached = self._compiled[index] = _CompiledStatement(
+                sid=self.string(sid),
+                any_principal=bool(any_principal),
+                principals=_as_lookup(principals),
+                exact_resources=_as_lookup(exact),
+                resource_prefixes=tuple(item or "" for item in prefixes),
+                conditions=tuple(conditions),
+            )
+        return cached
+
+    def _matching(
+        self, request: Mapping[str, Any], indexes: FrozenSet[int], covering: FrozenSet[int], *, first: bool
+    ) -> List[_CompiledStatement]:
+        """Statements for the action that cover the resource and admit the principal, in policy order."""
+        principal_arn, resource, context = _request_keys(request)
+        candidates = self._admitted(principal_arn) & covering & indexes  # smallest set first
+        matched: List[_CompiledStatement] = []
+        for index in sorted(candidates):  # statement ids ascend in policy order
+            statement = self._statement(index)
+            if statement.matches(principal_arn, resource, context):
+                matched.append(statement)
+                if first:
+                    break
+        return matched
+
+    def decide(self, request: Mapping[str, Any]) -> Decision:
+        denies, allows = self._candidates(request.get("action"))
+        covering = self._covering(request.get("resource"))
+        if covering:
+            for statement in self._matching(request, denies, covering, first=True):
+                return Decision(allowed=False, sid=statement.sid)
+            for statement in self._matching(request, allows, covering, first=True):
+                return Decision(allowed=True, sid=statement.sid)
+        return Decision(allowed=False, sid=None)
+
+    def is_allowed(self, request: Mapping[str, Any]) -> bool:
+        return self.decide(request).allowed
+
+    def matching_allow_sids(self, request: Mapping[str, Any]) -> List[Optional[str]]:
+        _, allows = self._candidates(request.get("action"))
+        return [statement.sid for statement in self._matching(request, allows, self._covering(request.get("resource")), first=False)]
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "source": self.source,
+            "version": FORMAT_VERSION,
+            "digest": self.digest,
+            "bytes": len(self._buffer),
+            "strings": self.strings,
+            "statements": self.statements,
+            "actions": self._action_count,
+            "principals": self._principal_count,
+        }
+
+
+def load_artifact_for(policy_path: Path, artifact: Optional[Path] = None) -> PolicyArtifact:
+    """Open the artifact for ``policy_path`` and check that it was built from the same statements in the same order."""
+    try:
+        with policy_path.open("r", encoding="utf-8") as handle:
+            policy = json.load(handle)
+    except (OSError, json.JSONDecodeError) as exc:
+        raise PolicyArtifactError(f"failed to read policy {policy_path}: {exc}") from exc
+    return PolicyArtifact.open(artifact or artifact_path(policy_path), expected_digest=policy_digest(policy))
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Compile a merged policy JSON into an artifact")
+    build.add_argument("policy", type=Path, help="Merged policy JSON")
+    build.add_argument("--out", type=Path, default=None, help=f"Artifact path (default: policy path with {ARTIFACT_SUFFIX})")
+
+    inspect = commands.add_parser("inspect", help="Verify an artifact and print its header")
+    inspect.add_argument("artifact", type=Path, help="Artifact to inspect")
+    inspect.add_argument("--policy", type=Path, default=None, help="Merged policy JSON the artifact must match")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        if args.command == "build":
+            with args.policy.open("r", encoding="utf-8") as handle:
+                policy = json.load(handle)
+            out = args.out or artifact_path(args.policy)
+            write_artifact(policy, out)
+            with PolicyArtifact.open(out) as artifact:
+                summary = artifact.describe()
+        elif args.policy is not None:
+            with load_artifact_for(args.policy, args.artifact) as artifact:
+                summary = artifact.describe()
+        else:
+            with PolicyArtifact.open(args.artifact) as artifact:
+                summary = artifact.describe()
+    except (PolicyArtifactError, PolicyEvaluationError, OSError, json.JSONDecodeError) as exc:
+        payload = {"status": "error", "message": str(exc)}
+        if args.json:
+            sys.stdout.write(json.dumps(payload) + "\n")
+        else:
+            LOG.error("artifact %s failed: %s", args.command, exc)
+        return 2
+
+    summary = {"status": "success", **summary}
+    if args.json:
+        sys.stdout.write(json.dumps(summary) + "\n")
+    else:
+        sys.stdout.write(
+            f"{summary['source']}: v{summary['version']} digest={summary['digest'][:12]} "
+            f"statements={summary['statements']} actions={summary['actions']} principals={summary['principals']} "
+            f"bytes={summary['bytes']}\n"
+        )
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,136 @@
+"""Compute canonical fingerprints of policy documents to detect no-op policy updates."""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.policy_model import PolicyDocument, PolicyStatement, thaw
+except ImportError:  # pragma: no cover
+    from policy_model import PolicyDocument, PolicyStatement, thaw
+
+LOG = logging.getLogger("s3_data_perimeter.fingerprint")
+CANONICAL_FIELDS = ("Sid", "Effect", "Principal", "Action", "Resource")
+
+
+@dataclass(frozen=True)
+class PolicyFingerprint:
+    digest: str
+    statements: Tuple[Tuple[Optional[str], str], ...]
+
+    def diff(self, other: "PolicyFingerprint") -> Dict[str, List[str]]:
+        """Statement digests present only in ``other`` (added) or only in ``self`` (removed)."""
+        mine = {digest for _, digest in self.statements}
+        theirs = {digest for _, digest in other.statements}
+        return {"added": sorted(theirs - mine), "removed": sorted(mine - theirs)}
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"fingerprint": self.digest, "statements": [{"sid": sid, "fingerprint": digest} for sid, digest in self.statements]}
+
+
+def canonical_statement(statement: Union[Mapping[str, Any], PolicyStatement]) -> Dict[str, Any]:
+    if not isinstance(statement, PolicyStatement):
+        statement = PolicyStatement.from_json(statement)
+    sid, effect, principal, action, resource, condition, extras = statement.canonical()
+    document: Dict[str, Any] = {}
+    for key, value in zip(CANONICAL_FIELDS, (sid, effect, principal, action, resource)):
+        if value is not None:
+            document[key] = thaw(value)
+    if condition:
+        document["Condition"] = {operator: thaw(entries) for operator, entries in condition}
+    document.update(thaw(extras))
+    return document
+
+
+def _digest(payload: Any) -> str:
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def statement_fingerprint(statement: Union[Mapping[str, Any], PolicyStatement]) -> str:
+    return _digest(canonical_statement(statement))
+
+
+def policy_fingerprint(policy: Union[Mapping[str, Any], PolicyDocument]) -> PolicyFingerprint:
+    """Fingerprint ``Version``, the other top-level keys and the set of statements.
+
+    Statement order and duplicates do not matter; a single statement object counts as a
+    one-element list.
+    """
+    document = policy if isinstance(policy, PolicyDocument) else PolicyDocument.from_json(policy)
+    statements = tuple((statement.sid, statement_fingerprint(statement)) for statement in document.statements)
+    payload = thaw(document.extras)
+    payload.update({"Version": thaw(document.version), "Statement": sorted({item for _, item in statements})})
+    digest = _digest(payload)
+    return PolicyFingerprint(digest=digest, statements=statements)
+
+
+def load_document(path: Path) -> Dict[str, Any]:
+    with path.open("r", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("policy", type=Path, help="Policy JSON to fingerprint")
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        default=None,
+        help="Deployed policy JSON to compare against; exits 1 when the policies differ",
+    )
+    parser.add_argument("--statements", action="store_true", help="Include per-statement fingerprints")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        fingerprint = policy_fingerprint(load_document(args.policy))
+        baseline = policy_fingerprint(load_document(args.compare)) if args.compare else None
+    except (OSError, json.JSONDecodeError) as exc:
+        LOG.error("fingerprint failed: %s", exc)
+        return 2
+
+    payload: Dict[str, Any] = {"path": str(args.policy), "fingerprint": fingerprint.digest}
+    if args.statements:
+        payload["statements"] = fingerprint.to_json()["statements"]
+    if baseline is not None:
+        payload["compare"] = str(args.compare)
+        payload["changed"] = baseline.digest != fingerprint.digest
+        payload.update(baseline.diff(fingerprint))
+
+    if args.json:
+        sys.stdout.write(json.dumps(payload) + "\n")
+    else:
+        sys.stdout.write(f"{fingerprint.digest}  {args.policy}\n")
+        if args.statements:
+            for sid, digest in fingerprint.statements:
+                sys.stdout.write(f"  {digest}  {sid}\n")
+        if baseline is not None:
+            state = "changed" if payload["changed"] else "unchanged"
+            sys.stdout.write(f"{state}: added={len(payload['added'])} removed={len(payload['removed'])}\n")
+
+    if baseline is not None and payload["changed"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
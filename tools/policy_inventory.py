@@ -0,0 +1,397 @@
+"""Inventory bucket policies across a fleet and index which principals hold which actions on which buckets."""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.policy_fingerprint import policy_fingerprint
+    from tools.validate_policy import allows_placeholders, validate_document
+except ImportError:  # pragma: no cover
+    from policy_fingerprint import policy_fingerprint
+    from validate_policy import allows_placeholders, validate_document
+
+LOG = logging.getLogger("s3_data_perimeter.inventory")
+STATE_VERSION = 1
+DEFAULT_STATE = Path("artifacts/policy-inventory.json")
+S3_ARN_PREFIX = "arn:aws:s3:::"
+ANY_PRINCIPAL = "*"
+PARALLEL_THRESHOLD = 16
+
+
+class InventoryError(RuntimeError):
+    """Raised when the inventory state cannot be read or written."""
+
+
+@dataclass(frozen=True)
+class Grant:
+    """One principal/action/resource combination a policy statement names."""
+
+    principal: str
+    action: str
+    bucket: str
+    prefix: str
+    effect: str
+    sid: Optional[str]
+    conditional: bool
+
+    def to_json(self) -> List[Any]:
+        return [self.principal, self.action, self.bucket, self.prefix, self.effect, self.sid, self.conditional]
+
+    @classmethod
+    def from_json(cls, row: Sequence[Any]) -> "Grant":
+        principal, action, bucket, prefix, effect, sid, conditional = row
+        return cls(principal, action, bucket, prefix, effect, sid, bool(conditional))
+
+
+@dataclass
+class FileScan:
+    """What the inventory remembers about one JSON file, keyed by its mtime and size."""
+
+    path: str
+    mtime_ns: int
+    size: int
+    policy: bool = True
+    fingerprint: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+    grants: List[Grant] = field(default_factory=list)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "mtimeNs": self.mtime_ns,
+            "size": self.size,
+            "policy": self.policy,
+            "fingerprint": self.fingerprint,
+            "errors": self.errors,
+            "grants": [grant.to_json() for grant in self.grants],
+        }
+
+    @classmethod
+    def from_json(cls, path: str, payload: Mapping[str, Any]) -> "FileScan":
+        return cls(
+            path=path,
+            mtime_ns=int(payload["mtimeNs"]),
+            size=int(payload["size"]),
+            policy=bool(payload.get("policy", True)),
+            fingerprint=payload.get("fingerprint"),
+            errors=list(payload.get("errors", [])),
+            grants=[Grant.from_json(row) for row in payload.get("grants", [])],
+        )
+
+
+def _strings(value: Any) -> List[str]:
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, list):
+        return [item for item in value if isinstance(item, str)]
+    return []
+
+
+def split_s3_resource(resource: str) -> Tuple[str, str]:
+    """``(bucket, key pattern)``; the key pattern is empty for the bucket itself."""
+    if resource == "*":
+        return "*", "*"
+    if not resource.startswith(S3_ARN_PREFIX):
+        return resource, ""
+    bucket, _, key = resource[len(S3_ARN_PREFIX) :].partition("/")
+    return bucket, key
+
+
+def statement_grants(statement: Mapping[str, Any]) -> Iterator[Grant]:
+    principal = statement.get("Principal")
+    if principal == ANY_PRINCIPAL:
+        principals = [ANY_PRINCIPAL]
+    elif isinstance(principal, dict):
+        principals = [item for value in principal.values() for item in _strings(value)]
+    else:
+        principals = []
+    effect = statement.get("Effect")
+    sid = statement.get("Sid") if isinstance(statement.get("Sid"), str) else None
+    conditional = bool(statement.get("Condition"))
+    resources = [split_s3_resource(resource) for resource in _strings(statement.get("Resource"))]
+    for principal_arn in dict.fromkeys(principals):
+        for action in dict.fromkeys(_strings(statement.get("Action"))):
+            for bucket, prefix in dict.fromkeys(resources):
+                yield Grant(principal_arn, action, bucket, prefix, str(effect), sid, conditional)
+
+
+def scan_policy(path: str) -> FileScan:
+    """Parse, validate and extract grants from one file; runs in worker processes."""
+    stat = os.stat(path)
+    scan = FileScan(path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            document = json.load(handle)
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        scan.errors.append(f"invalid JSON: {exc}")
+        return scan
+    if not isinstance(document, dict) or "Statement" not in document:
+        scan.policy = False  # exceptions files, manifests and other JSON that happen to live alongside
+        return scan
+    scan.errors = validate_document(document, allow_placeholders=allows_placeholders(Path(path)))
+    statements = document.get("Statement")
+    if isinstance(statements, list):
+        try:
+            scan.fingerprint = policy_fingerprint(document).digest
+        except (TypeError, ValueError) as exc:
+            LOG.debug("cannot fingerprint %s: %s", path, exc)
+        for statement in statements:
+            if isinstance(statement, dict) and statement.get("Effect") in ("Allow", "Deny"):
+                scan.grants.extend(statement_grants(statement))
+    return scan
+
+
+def iter_policy_paths(roots: Iterable[Path], exclude: Optional[Path] = None) -> Iterator[Path]:
+    for root in roots:
+        if root.is_dir():
+            paths: Iterable[Path] = sorted(path for path in root.rglob("*.json") if path.is_file())
+        elif root.exists():
+            paths = [root]
+        else:
+            raise InventoryError(f"policy path not found: {root}")
+        for path in paths:
+            if exclude is None or path.resolve() != exclude:
+                yield path
+
+
+Posting = Tuple[str, str, str, str, Optional[str], bool]  # path, bucket, prefix, effect, sid, conditional
+
+
+class Inventory:
+    """Per-file scan results plus an inverted index ``principal -> action -> postings``.
+
+    Refreshing re-reads only files whose mtime or size changed, and leaves the index alone
+    for files whose content fingerprint did not change either.
+    """
+
+    def __init__(self) -> None:
+        self.files: Dict[str, FileScan] = {}
+        self.index: Dict[str, Dict[str, Set[Posting]]] = {}
+
+    def _add(self, scan: FileScan) -> None:
+        self.files[scan.path] = scan
+        for grant in scan.grants:
+            posting = (scan.path, grant.bucket, grant.prefix, grant.effect, grant.sid, grant.conditional)
+            self.index.setdefault(grant.principal, {}).setdefault(grant.action, set()).add(posting)
+
+    def _remove(self, path: str) -> None:
+        scan = self.files.pop(path, None)
+        if scan is None:
+            return
+        for grant in scan.grants:
+            actions = self.index.get(grant.principal, {})
+            postings = actions.get(grant.action)
+            if postings is None:
+                continue
+            postings.discard((scan.path, grant.bucket, grant.prefix, grant.effect, grant.sid, grant.conditional))
+            if not postings:
+                del actions[grant.action]
+                if not actions:
+                    del self.index[grant.principal]
+
+    def refresh(self, roots: Sequence[Path], *, workers: int = 1, exclude: Optional[Path] = None) -> Dict[str, int]:
+        seen: Set[str] = set()
+        stale: List[str] = []
+        for path in iter_policy_paths(roots, exclude):
+            key = str(path)
+            seen.add(key)
+            previous = self.files.get(key)
+            stat = path.stat()
+            if previous is None or previous.mtime_ns != stat.st_mtime_ns or previous.size != stat.st_size:
+                stale.append(key)
+
+        if workers > 1 and len(stale) >= PARALLEL_THRESHOLD:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                scans = list(pool.map(scan_policy, stale, chunksize=max(1, len(stale) // (workers * 4))))
+        else:
+            scans = [scan_policy(key) for key in stale]
+
+        reindexed = 0
+        for scan in scans:
+            previous = self.files.get(scan.path)
+            if previous is not None and scan.fingerprint is not None and previous.fingerprint == scan.fingerprint:
+                previous.mtime_ns, previous.size, previous.errors = scan.mtime_ns, scan.size, scan.errors
+                continue
+            self._remove(scan.path)
+            self._add(scan)
+            reindexed += 1
+
+        resolved = [root.resolve() for root in roots]
+        removed = [
+            key for key in self.files if key not in seen and any(Path(key).resolve().is_relative_to(root) for root in resolved)
+        ]
+        for key in removed:
+            self._remove(key)
+        policies = [scan for scan in self.files.values() if scan.policy]
+        return {
+            "files": len(seen),
+            "parsed": len(stale),
+            "reindexed": reindexed,
+            "removed": len(removed),
+            "policies": len(policies),
+            "invalid": sum(1 for scan in policies if scan.errors),
+            "principals": len(self.index),
+        }
+
+    def query(
+        self,
+        *,
+        principal: Optional[str] = None,
+        action: Optional[str] = None,
+        bucket: Optional[str] = None,
+        effect: Optional[str] = None,
+        exact: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Postings for the principal (plus ``*`` and its account unless ``exact``) whose action pattern covers ``action``."""
+        if principal is None:
+            principals = list(self.index)
+        else:
+            principals = [principal]
+            if not exact:
+                parts = principal.split(":")
+                if len(parts) >= 6 and parts[4]:
+                    principals += [parts[4], f"arn:aws:iam::{parts[4]}:root"]
+                principals.append(ANY_PRINCIPAL)
+        results = []
+        for principal_key in dict.fromkeys(principals):
+            for pattern, postings in self.index.get(principal_key, {}).items():
+                if action is not None and not (pattern == action or (not exact and fnmatchcase(action, pattern))):
+                    continue
+                for path, posting_bucket, prefix, posting_effect, sid, conditional in postings:
+                    if bucket is not None and posting_bucket not in (bucket, "*"):
+                        continue
+                    if effect is not None and posting_effect != effect:
+                        continue
+                    results.append(
+                        {
+                            "principal": principal_key,
+                            "action": pattern,
+                            "bucket": posting_bucket,
+                            "prefix": prefix,
+                            "effect": posting_effect,
+                            "sid": sid,
+                            "conditional": conditional,
+                            "path": path,
+                        }
+                    )
+        results.sort(key=lambda item: (item["bucket"], item["prefix"], item["action"], item["principal"], item["path"]))
+        return results
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"version": STATE_VERSION, "files": {path: scan.to_json() for path, scan in sorted(self.files.items())}}
+
+    @classmethod
+    def from_json(cls, payload: Mapping[str, Any]) -> "Inventory":
+        if payload.get("version") != STATE_VERSION:
+            raise InventoryError(f"unsupported inventory version {payload.get('version')}")
+        inventory = cls()
+        for path, scan in payload.get("files", {}).items():
+            inventory._add(FileScan.from_json(path, scan))
+        return inventory
+
+
+def load_inventory(path: Path, *, missing_ok: bool = False) -> Inventory:
+    if missing_ok and not path.exists():
+        return Inventory()
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            return Inventory.from_json(json.load(handle))
+    except (OSError, json.JSONDecodeError, KeyError, ValueError) as exc:
+        raise InventoryError(f"failed to read inventory {path}: {exc}") from exc
+
+
+def save_inventory(inventory: Inventory, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as handle:
+        json.dump(inventory.to_json(), handle, separators=(",", ":"))
+        handle.write("\n")
+    os.replace(tmp, path)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE, help="Inventory state JSON")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", help="Scan policy files or directories and update the inventory")
+    scan.add_argument("roots", type=Path, nargs="+", help="Policy JSON files or directories to walk")
+    scan.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes for parsing")
+
+    query = commands.add_parser("query", help="List buckets and prefixes a principal or action is granted on")
+    query.add_argument("--principal", default=None, help="Principal ARN; also matches '*' and its account unless --exact")
+    query.add_argument("--action", default=None, help="Action; also matches wildcard patterns such as s3:* unless --exact")
+    query.add_argument("--bucket", default=None, help="Only this bucket")
+    query.add_argument("--effect", choices=("Allow", "Deny"), default=None, help="Only Allow or Deny statements")
+    query.add_argument("--exact", action="store_true", help="Match principal and action literally")
+    query.add_argument("--buckets", action="store_true", help="Print only the distinct buckets")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        inventory = load_inventory(args.state, missing_ok=args.command == "scan")
+        if args.command == "scan":
+            summary = inventory.refresh(args.roots, workers=max(1, args.workers), exclude=args.state.resolve())
+            save_inventory(inventory, args.state)
+        else:
+            results = inventory.query(
+                principal=args.principal, action=args.action, bucket=args.bucket, effect=args.effect, exact=args.exact
+            )
+    except (InventoryError, OSError) as exc:
+        payload = {"status": "error", "message": str(exc)}
+        if args.json:
+            sys.stdout.write(json.dumps(payload) + "\n")
+        else:
+            LOG.error("inventory %s failed: %s", args.command, exc)
+        return 2
+
+    if args.command == "scan":
+        invalid = {path: scan.errors for path, scan in inventory.files.items() if scan.policy and scan.errors}
+        if args.json:
+            sys.stdout.write(json.dumps({"status": "failed" if invalid else "success", **summary, "errors": invalid}) + "\n")
+        else:
+            sys.stdout.write(
+                f"inventory: {summary['policies']} policies, {summary['principals']} principals; parsed {summary['parsed']} "
+                f"of {summary['files']} files, removed {summary['removed']}\n"
+            )
+            for path, errors in sorted(invalid.items()):
+                sys.stdout.write(f"  invalid {path}: {', '.join(errors)}\n")
+        return 2 if invalid else 0
+
+    buckets = sorted({item["bucket"] for item in results})
+    if args.json:
+        sys.stdout.write(json.dumps({"buckets": buckets} if args.buckets else {"count": len(results), "grants": results}) + "\n")
+    elif args.buckets:
+        sys.stdout.writelines(f"{bucket}\n" for bucket in buckets)
+    else:
+        for item in results:
+            condition = " (conditional)" if item["conditional"] else ""
+            sys.stdout.write(
+                f"{item['effect']} {item['principal']} {item['action']} {item['bucket']}/{item['prefix']} "
+                f"sid={item['sid']}{condition} [{item['path']}]\n"
+            )
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
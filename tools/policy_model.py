@@ -0,0 +1,388 @@
+"""Compact, immutable in-memory representation of bucket policy documents."""
+from __future__ import annotations
+
+import sys
+from typing import Any, Dict, Iterator, Mapping, Optional, Sequence, Set, Tuple
+
+STATEMENT_FIELDS = ("Sid", "Effect", "Principal", "Action", "Resource", "Condition")
+SET_VALUED_EXTRAS = ("NotAction", "NotResource", "NotPrincipal")
+
+
+class FrozenMapping(tuple):
+    """A JSON object frozen into a key-sorted tuple of ``(key, value)`` pairs."""
+
+    __slots__ = ()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        for item_key, value in self:
+            if item_key == key:
+                return value
+        return default
+
+    def keys(self) -> Iterator[str]:
+        return (key for key, _ in self)
+
+
+def freeze(value: Any) -> Any:
+    """Convert decoded JSON into hashable, interned tuples; lists become tuples, objects FrozenMappings."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    if isinstance(value, dict):
+        return FrozenMapping(sorted((sys.intern(str(key)), freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """Inverse of :func:`freeze`: rebuild plain dicts and lists."""
+    if isinstance(value, FrozenMapping):
+        return {key: thaw(item) for key, item in value}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+def iter_strings(value: Any) -> Iterator[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, FrozenMapping):
+        for key, item in value:
+            yield key
+            yield from iter_strings(item)
+    elif isinstance(value, tuple):
+        for item in value:
+            yield from iter_strings(item)
+
+
+def _memo_key(value: Any) -> Any:
+    """Equality key that also compares leaf types, so ``(True,)``, ``(1,)`` and ``(1.0,)`` stay distinct."""
+    if isinstance(value, tuple):
+        return (value.__class__, tuple(_memo_key(item) for item in value))
+    return (value.__class__, value)
+
+
+class Substitution:
+    """Applies ``${Name}`` template variables to frozen values.
+
+    Results are memoized per distinct value and unchanged values are returned as-is, so
+    statements sharing resources or conditions are only rewritten once. Strings that still
+    contain a placeholder after substitution are collected in ``unresolved``.
+    """
+
+    __slots__ = ("_variables", "_strings", "_values", "unresolved")
+
+    def __init__(self, variables: Mapping[str, str]) -> None:
+        self._variables = tuple((f"${{{key}}}", value) for key, value in variables.items())
+        self._strings: Dict[str, str] = {}
+        self._values: Dict[Any, Any] = {}
+        self.unresolved: Set[str] = set()
+
+    def string(self, value: str) -> str:
+        if "${" not in value:
+            return value
+        cached = self._strings.get(value)
+        if cached is None:
+            result = value
+            for placeholder, replacement in self._variables:
+                result = result.replace(placeholder, replacement)
+            cached = self._strings[value] = sys.intern(result)
+            if "${" in cached:
+                self.unresolved.add(cached)
+        return cached
+
+    def __call__(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self.string(value)
+        if not isinstance(value, tuple):
+            return value
+        memo_key = _memo_key(value)
+        cached = self._values.get(memo_key)
+        if cached is not None:
+            return cached
+        if isinstance(value, FrozenMapping):
+            items = [(self.string(key), self(item)) for key, item in value]
+            changed = any(new[0] is not old[0] or new[1] is not old[1] for new, old in zip(items, value))
+            result = FrozenMapping(sorted(items)) if changed else value
+        else:
+            substituted = tuple(self(item) for item in value)
+            changed = any(new is not old for new, old in zip(substituted, value))
+            result = substituted if changed else value
+        self._values[memo_key] = result
+        return result
+
+
+class ConditionBlock:
+    """One condition operator and its frozen ``key -> value`` entries."""
+
+    __slots__ = ("operator", "entries")
+
+    def __init__(self, operator: str, entries: Any) -> None:
+        self.operator = operator
+        self.entries = entries
+
+    def _key(self) -> Tuple[str, Any]:
+        return (self.operator, self.entries)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, ConditionBlock) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        return hash(self._key())
+
+    def __repr__(self) -> str:
+        return f"ConditionBlock({self.operator!r}, {thaw(self.entries)!r})"
+
+
+class PolicyStatement:
+    """A single policy statement.
+
+    ``Action`` and ``Resource`` keep their string-or-list shape (lists as tuples) so that
+    :meth:`to_json` reproduces the source document. Keys outside :data:`STATEMENT_FIELDS`,
+    and modelled keys whose value is ``null``, are kept verbatim in ``extras``.
+    """
+
+    __slots__ = ("sid", "effect", "principal", "action", "resource", "condition", "extras", "_hash", "_canonical")
+
+    def __init__(
+        self,
+        *,
+        sid: Optional[str] = None,
+        effect: Optional[str] = None,
+        principal: Any = None,
+        action: Any = None,
+        resource: Any = None,
+        condition: Optional[Tuple[ConditionBlock, ...]] = None,
+        extras: FrozenMapping = FrozenMapping(),
+    ) -> None:
+        self.sid = sid
+        self.effect = effect
+        self.principal = principal
+        self.action = action
+        self.resource = resource
+        self.condition = condition
+        self.extras = extras
+        self._hash: Optional[int] = None
+        self._canonical: Optional[Tuple[Any, ...]] = None
+
+    @classmethod
+    def from_json(cls, raw: Mapping[str, Any]) -> "PolicyStatement":
+        fields: Dict[str, Any] = {}
+        extras: Dict[str, Any] = {}
+        for key, value in raw.items():
+            if key in STATEMENT_FIELDS and value is not None:
+                fields[key] = value
+            else:
+                extras[key] = value
+
+        condition: Optional[Tuple[ConditionBlock, ...]] = None
+        raw_condition = fields.get("Condition")
+        if isinstance(raw_condition, dict):
+            condition = tuple(
+                ConditionBlock(sys.intern(operator), freeze(expression))
+                for operator, expression in sorted(raw_condition.items())
+            )
+        elif raw_condition is not None:
+            extras["Condition"] = raw_condition
+
+        return cls(
+            sid=freeze(fields.get("Sid")),
+            effect=freeze(fields.get("Effect")),
+            principal=freeze(fields.get("Principal")),
+            action=freeze(fields.get("Action")),
+            resource=freeze(fields.get("Resource")),
+            condition=condition,
+            extras=freeze(extras),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        document: Dict[str, Any] = {}
+        for key, value in (
+            ("Sid", self.sid),
+            ("Effect", self.effect),
+            ("Principal", self.principal),
+            ("Action", self.action),
+            ("Resource", self.resource),
+        ):
+            if value is not None:
+                document[key] = thaw(value)
+        if self.condition is not None:
+            document["Condition"] = {block.operator: thaw(block.entries) for block in self.condition}
+        document.update(thaw(self.extras))
+        return document
+
+    @property
+    def actions(self) -> Tuple[str, ...]:
+        return _as_tuple(self.action)
+
+    @property
+    def resources(self) -> Tuple[str, ...]:
+        return _as_tuple(self.resource)
+
+    def substitute(self, substitution: Substitution) -> "PolicyStatement":
+        condition = self.condition
+        if condition is not None:
+            blocks = [ConditionBlock(substitution.string(block.operator), substitution(block.entries)) for block in condition]
+            if all(new.operator is old.operator and new.entries is old.entries for new, old in zip(blocks, condition)):
+                blocks = list(condition)
+            condition = tuple(blocks)
+        fields = (
+            substitution(self.sid),
+            substitution(self.effect),
+            substitution(self.principal),
+            substitution(self.action),
+            substitution(self.resource),
+            substitution(self.extras),
+        )
+        current = (self.sid, self.effect, self.principal, self.action, self.resource, self.extras)
+        if all(new is old for new, old in zip(fields, current)) and condition is self.condition:
+            return self
+        sid, effect, principal, action, resource, extras = fields
+        return PolicyStatement(
+            sid=sid,
+            effect=effect,
+            principal=principal,
+            action=action,
+            resource=resource,
+            condition=condition,
+            extras=extras,
+        )
+
+    def strings(self) -> Iterator[str]:
+        for value in (self.sid, self.effect, self.principal, self.action, self.resource, self.extras):
+            yield from iter_strings(value)
+        for block in self.condition or ():
+            yield block.operator
+            yield from iter_strings(block.entries)
+
+    def canonical(self) -> Tuple[Any, ...]:
+        """Order-insensitive form: Action/Resource and condition values become sorted sets,
+        a lone string equals a one-item list, boolean condition values compare as strings and
+        empty condition operators are dropped.
+        """
+        if self._canonical is None:
+            condition = tuple(
+                sorted(
+                    (block.operator, _canonical_entries(block.entries))
+                    for block in self.condition or ()
+                    if block.entries != ()
+                )
+            )
+            extras = FrozenMapping(
+                (key, _canonical_set(value) if key in SET_VALUED_EXTRAS else value) for key, value in self.extras
+            )
+            self._canonical = (
+                self.sid,
+                self.effect,
+                _canonical_principal(self.principal),
+                _canonical_set(self.action),
+                _canonical_set(self.resource),
+                condition,
+                extras,
+            )
+        return self._canonical
+
+    def _key(self) -> Tuple[Any, ...]:
+        return (self.sid, self.effect, self.principal, self.action, self.resource, self.condition, self.extras)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, PolicyStatement) and self._key() == other._key()
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(self._key())
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"PolicyStatement({self.to_json()!r})"
+
+
+class PolicyDocument:
+    """A policy document: ``Version``, its statements and any other top-level keys."""
+
+    __slots__ = ("version", "statements", "extras")
+
+    def __init__(self, version: Any, statements: Sequence[PolicyStatement], extras: FrozenMapping = FrozenMapping()) -> None:
+        self.version = version
+        self.statements = tuple(statements)
+        self.extras = extras
+
+    @classmethod
+    def from_json(cls, raw: Mapping[str, Any]) -> "PolicyDocument":
+        statements = raw.get("Statement")
+        if isinstance(statements, dict):
+            statements = [statements]  # IAM accepts a single statement object in place of a list
+        extras = {key: value for key, value in raw.items() if key != "Version"}
+        if isinstance(statements, list) and all(isinstance(item, dict) for item in statements):
+            del extras["Statement"]
+            modelled = [PolicyStatement.from_json(item) for item in statements]
+        else:
+            modelled = []
+        return cls(freeze(raw.get("Version")), modelled, freeze(extras))
+
+    def to_json(self) -> Dict[str, Any]:
+        document: Dict[str, Any] = {}
+        if self.version is not None:
+            document["Version"] = thaw(self.version)
+        document.update(thaw(self.extras))
+        if "Statement" not in document:
+            document["Statement"] = [statement.to_json() for statement in self.statements]
+        return document
+
+    def substitute(self, substitution: Substitution) -> "PolicyDocument":
+        return PolicyDocument(
+            substitution(self.version),
+            [statement.substitute(substitution) for statement in self.statements],
+            substitution(self.extras),
+        )
+
+    def strings(self) -> Iterator[str]:
+        yield from iter_strings(self.version)
+        yield from iter_strings(self.extras)
+        for statement in self.statements:
+            yield from statement.strings()
+
+
+def _as_tuple(value: Any) -> Tuple[str, ...]:
+    if isinstance(value, str):
+        return (value,)
+    if isinstance(value, tuple) and not isinstance(value, FrozenMapping):
+        return tuple(item for item in value if isinstance(item, str))
+    return ()
+
+
+def _sort_key(value: Any) -> Tuple[str, str]:
+    return (type(value).__name__, repr(value))
+
+
+def _canonical_set(value: Any) -> Any:
+    if value is None:
+        return None
+    if isinstance(value, FrozenMapping) or not isinstance(value, tuple):
+        value = (value,)
+    items = set(value)
+    if all(isinstance(item, str) for item in items):
+        return tuple(sorted(items))
+    return tuple(sorted(items, key=_sort_key))
+
+
+def _is_list(value: Any) -> bool:
+    return isinstance(value, tuple) and not isinstance(value, FrozenMapping)
+
+
+def _canonical_principal(value: Any) -> Any:
+    if isinstance(value, FrozenMapping):
+        return FrozenMapping((key, _canonical_set(item)) for key, item in value)
+    return value
+
+
+def _canonical_entries(entries: Any) -> Any:
+    if not isinstance(entries, FrozenMapping):
+        return entries
+
+    def scalar(item: Any) -> Any:
+        return ("true" if item else "false") if isinstance(item, bool) else item
+
+    return FrozenMapping(
+        (key, _canonical_set(tuple(map(scalar, value)) if _is_list(value) else scalar(value))) for key, value in entries
+    )
@@ -0,0 +1,393 @@
+"""Recommend least-privilege exception prefixes and actions from observed access per principal."""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.access_index import AccessIndex, AccessIndexError, IndexQuery
+    from tools.access_records import RecordFormatError, iter_log_paths, iter_records, load_org_ids, split_resource
+    from tools.evaluate_policy import CompiledPolicy, PolicyEvaluationError
+    from tools.merge_policy import BUCKET_LEVEL_ACTIONS, ExceptionEntry, PolicyMergeError, _parse_date, load_exceptions, load_policy
+except ImportError:  # pragma: no cover
+    from access_index import AccessIndex, AccessIndexError, IndexQuery
+    from access_records import RecordFormatError, iter_log_paths, iter_records, load_org_ids, split_resource
+    from evaluate_policy import CompiledPolicy, PolicyEvaluationError
+    from merge_policy import BUCKET_LEVEL_ACTIONS, ExceptionEntry, PolicyMergeError, _parse_date, load_exceptions, load_policy
+
+LOG = logging.getLogger("s3_data_perimeter.recommend")
+DEFAULT_MAX_NODES = 4096
+DEFAULT_BUDGET = 3
+DEFAULT_VALIDITY_DAYS = 90
+
+
+class RecommendationError(RuntimeError):
+    """Raised when inputs cannot be read or no recommendation can be produced."""
+
+
+class TrieNode:
+    """Radix-trie node; ``label`` is the run of key characters on the edge into this node."""
+
+    __slots__ = ("label", "children", "hits", "terminal", "actions", "collapsed")
+
+    def __init__(self, label: str = "") -> None:
+        self.label = label
+        self.children: Dict[str, "TrieNode"] = {}
+        self.hits = 0  # requests at or below this node
+        self.terminal = 0  # requests whose key directory ends exactly here
+        self.actions: Set[str] = set()
+        self.collapsed = False  # subtree was dropped to stay within the node budget
+
+
+class PrefixTrie:
+    """Object-key directories of one principal, path-compressed and capped at ``max_nodes``.
+
+    Only the directory part of each key (up to the last ``/``) is stored, never object names,
+    so millions of keys under a handful of directories take a handful of nodes. Keys with no
+    ``/`` have no directory; they are kept by name in ``objects`` so they can be granted
+    exactly instead of forcing a whole-bucket prefix. Edges are
+    character runs, so siblings such as ``team-0001/`` and ``team-0002/`` share a ``team-000``
+    node. When the cap is reached every node below the current depth limit is folded into
+    its ancestor at the limit and the limit shrinks, trading precision for memory; top-level
+    object keys are folded into the root first.
+    """
+
+    def __init__(self, max_nodes: int = DEFAULT_MAX_NODES) -> None:
+        self.root = TrieNode()
+        self.max_nodes = max(8, max_nodes)
+        self.nodes = 1
+        self.depth_limit: Optional[int] = None
+        self.bucket_actions: Set[str] = set()
+        self.objects: Dict[str, TrieNode] = {}  # top-level object keys, granted by exact name
+        self.objects_folded = False
+        self.requests = 0
+
+    def add(self, key: str, action: str) -> None:
+        self.requests += 1
+        if action in BUCKET_LEVEL_ACTIONS or not key:
+            self.bucket_actions.add(action)
+            if action in BUCKET_LEVEL_ACTIONS:
+                return
+        directory = key[: key.rfind("/") + 1]
+        if key and not directory and not self.objects_folded:
+            self._add_object(key, action)
+            return
+        if self.depth_limit is not None:
+            directory = directory[: self.depth_limit]
+        node = self.root
+        node.hits += 1
+        node.actions.add(action)
+        position = 0
+        while position < len(directory) and not node.collapsed:
+            child = node.children.get(directory[position])
+            if child is None:
+                child = node.children[directory[position]] = TrieNode(directory[position:])
+                self.nodes += 1
+                position = len(directory)
+            else:
+                label = child.label
+                shared = 0
+                while shared < len(label) and position + shared < len(directory) and label[shared] == directory[position + shared]:
+                    shared += 1
+                if shared < len(label):
+                    middle = TrieNode(label[:shared])
+                    middle.hits, middle.actions = child.hits, set(child.actions)
+                    child.label = label[shared:]
+                    middle.children[child.label[0]] = child
+                    node.children[directory[position]] = middle
+                    self.nodes += 1
+                    child = middle
+                position += shared
+            child.hits += 1
+            child.actions.add(action)
+            node = child
+        node.terminal += 1
+        if self.nodes > self.max_nodes:
+            self._shrink()
+
+    def _add_object(self, key: str, action: str) -> None:
+        self.root.hits += 1
+        self.root.actions.add(action)
+        node = self.objects.get(key)
+        if node is None:
+            node = self.objects[key] = TrieNode(key)
+            self.nodes += 1
+        node.hits += 1
+        node.terminal += 1
+        node.actions.add(action)
+        if self.nodes > self.max_nodes:
+            self._shrink()
+
+    def _shrink(self) -> None:
+        if self.objects:
+            self.root.terminal += sum(node.hits for node in self.objects.values())
+            self.nodes -= len(self.objects)
+            self.objects.clear()
+            self.objects_folded = True
+            LOG.debug("prefix trie over budget; top-level object keys folded into the bucket root")
+            if self.nodes <= self.max_nodes * 3 // 4:
+                return
+        while self.nodes > self.max_nodes * 3 // 4:
+            deepest = max(depth for _, depth in self.walk())
+            self.depth_limit = max(0, deepest - 1)
+            self.nodes = 1 + self._truncate(self.root, 0, self.depth_limit)
+            LOG.debug("prefix trie over budget; depth limited to %d characters", self.depth_limit)
+            if self.depth_limit == 0:
+                break
+
+    def _truncate(self, node: TrieNode, depth: int, limit: int) -> int:
+        kept = 0
+        for head, child in list(node.children.items()):
+            child_depth = depth + len(child.label)
+            if child_depth > limit:
+                keep = limit - depth
+                if keep <= 0:
+                    del node.children[head]
+                    node.terminal += child.hits
+                    node.collapsed = True
+                    continue
+                child.label = child.label[:keep]
+                child.terminal = child.hits
+                child.children = {}
+                child.collapsed = True
+                kept += 1
+                continue
+            kept += 1 + self._truncate(child, child_depth, limit)
+        return kept
+
+    def walk(self) -> Iterator[Tuple[TrieNode, int]]:
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            yield node, depth
+            for child in node.children.values():
+                stack.append((child, depth + len(child.label)))
+
+
+@dataclass(frozen=True)
+class PrefixGrant:
+    prefix: str
+    actions: Tuple[str, ...]
+    requests: int
+
+
+def recommend_prefixes(trie: PrefixTrie, budget: int) -> List[PrefixGrant]:
+    """Tightest key prefixes, at most ``budget`` of them, covering every recorded request.
+
+    Starts from the directories that requests actually hit (dropping those already covered
+    by a shallower one) plus the top-level object keys, granted by exact name, and, while over
+    budget, replaces the cover nodes under the deepest common ancestor with that ancestor.
+    Visiting nodes deepest first makes that a single bottom-up pass: a node's cover count is
+    final once all deeper nodes are settled.
+    """
+    if trie.root.hits == 0:
+        if not trie.bucket_actions:
+            return []
+        return [PrefixGrant(prefix="*", actions=tuple(sorted(trie.bucket_actions)), requests=trie.requests)]
+    order = sorted(trie.walk(), key=lambda item: (-item[1], item[0].hits))
+
+    def cover_counts(merge: bool, total: int) -> Tuple[int, Set[int]]:
+        counts: Dict[int, int] = {}
+        merged: Set[int] = set()
+        for node, _ in order:
+            count = 1 if node.terminal else sum(counts[id(child)] for child in node.children.values())
+            if node is trie.root and not node.terminal:
+                count += len(trie.objects)
+            if merge and count >= 2 and total > budget:
+                merged.add(id(node))
+                total -= count - 1
+                count = 1
+            counts[id(node)] = count
+        return counts[id(trie.root)], merged
+
+    total, _ = cover_counts(False, 0)
+    _, merged = cover_counts(True, total)
+
+    grants = []
+    stack = [(trie.root, trie.root.label)]
+    while stack:
+        node, prefix = stack.pop()
+        if node.terminal or id(node) in merged:
+            grants.append(PrefixGrant(prefix=f"{prefix}*", actions=tuple(sorted(node.actions)), requests=node.hits))
+            continue
+        stack.extend((child, prefix + child.label) for child in node.children.values())
+        if node is trie.root:
+            grants.extend(
+                PrefixGrant(prefix=key, actions=tuple(sorted(leaf.actions)), requests=leaf.hits) for key, leaf in trie.objects.items()
+            )
+    grants.sort(key=lambda grant: (-grant.requests, grant.prefix))
+    if trie.bucket_actions and grants:
+        first = grants[0]
+        grants[0] = PrefixGrant(first.prefix, tuple(sorted(set(first.actions) | trie.bucket_actions)), first.requests)
+    return grants
+
+
+class Recommender:
+    """Streams records into one :class:`PrefixTrie` per tracked principal."""
+
+    def __init__(
+        self,
+        principals: Iterable[str],
+        *,
+        max_nodes: int = DEFAULT_MAX_NODES,
+        include_denied: bool = False,
+        policy: Optional[CompiledPolicy] = None,
+        bucket: Optional[str] = None,
+    ) -> None:
+        self.tries: Dict[str, PrefixTrie] = {principal: PrefixTrie(max_nodes) for principal in principals}
+        self.include_denied = include_denied
+        self.policy = policy
+        self.bucket = bucket
+        self.skipped = 0
+
+    def _allowed(self, record: Mapping[str, Any]) -> bool:
+        for field_name in ("observed", "effect"):
+            if record.get(field_name) in ("Allow", "Deny"):
+                return record[field_name] == "Allow"
+        if self.policy is not None:
+            return self.policy.is_allowed(record)
+        return record.get("expected", "Allow") == "Allow"
+
+    def observe(self, record: Mapping[str, Any]) -> None:
+        trie = self.tries.get(str(record.get("principalArn")))
+        if trie is None:
+            return
+        bucket, key = split_resource(str(record.get("resource", "")))
+        if (self.bucket and bucket != self.bucket) or (not self.include_denied and not self._allowed(record)):
+            self.skipped += 1
+            return
+        trie.add(key, str(record.get("action")))
+
+    def recommend(self, budget: int, expires_at: date, current: Sequence[ExceptionEntry] = ()) -> List[ExceptionEntry]:
+        """One entry per recommended prefix, ids continuing from the principal's current exceptions."""
+        entries: List[ExceptionEntry] = []
+        for principal in sorted(self.tries):
+            trie = self.tries[principal]
+            grants = recommend_prefixes(trie, budget)
+            if not grants:
+                LOG.warning("no observed access for %s; recommending removal of its exceptions", principal)
+                continue
+            existing = [entry for entry in current if entry.principal_arn == principal]
+            stem = existing[0].identifier if existing else _default_identifier(principal)
+            for index, grant in enumerate(grants):
+                entries.append(
+                    ExceptionEntry(
+                        identifier=stem if len(grants) == 1 else f"{stem}-{index + 1}",
+                        principal_arn=principal,
+                        actions=grant.actions,
+                        prefix=grant.prefix,
+                        expires_at=expires_at,
+                        reason=(
+                            f"Least-privilege recommendation: {grant.requests} of {trie.requests} observed requests "
+                            f"under {grant.prefix}" + (f" (replaces {', '.join(e.prefix for e in existing)})" if existing else "")
+                        ),
+                    )
+                )
+        return entries
+
+
+def _default_identifier(principal: str) -> str:
+    parts = principal.split(":")
+    account, name = (parts[4], parts[-1]) if len(parts) >= 6 else ("", principal)
+    return "-".join(part for part in ("rec", account, name.rsplit("/", 1)[-1]) if part)
+
+
+def iter_corpus(args: argparse.Namespace, principals: Sequence[str]) -> Iterator[Dict[str, Any]]:
+    if args.index is not None:
+        with AccessIndex(args.index) as index:
+            for principal in principals:
+                yield from index.query(IndexQuery(principal=principal, bucket=args.bucket))
+        return
+    org_ids = load_org_ids(args.org_ids)
+    for path in iter_log_paths(args.logs):
+        yield from iter_records(path, org_ids)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    corpus = parser.add_mutually_exclusive_group(required=True)
+    corpus.add_argument("--index", type=Path, default=None, help="Access index built by access_index.py")
+    corpus.add_argument("--logs", type=Path, nargs="+", default=None, help="Raw log files or directories to scan")
+    parser.add_argument("--principal", action="append", default=[], help="Principal ARN to analyze; repeatable")
+    parser.add_argument(
+        "--exceptions",
+        type=Path,
+        default=None,
+        help="Current exceptions JSON; its principals are analyzed and its ids reused",
+    )
+    parser.add_argument("--bucket", default=None, help="Only consider requests to this bucket")
+    parser.add_argument("--policy", type=Path, default=None, help="Merged policy used to decide which requests were allowed")
+    parser.add_argument("--include-denied", action="store_true", help="Also cover requests that were denied")
+    parser.add_argument("--org-ids", type=Path, default=None, help="JSON map of CloudTrail accountId to org id (--logs)")
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="Maximum exception statements per principal")
+    parser.add_argument("--max-nodes", type=int, default=DEFAULT_MAX_NODES, help="Trie node cap per principal")
+    parser.add_argument("--expires-at", default=None, help=f"expiresAt for recommendations (default: {DEFAULT_VALIDITY_DAYS} days)")
+    parser.add_argument("--now", default=None, help="Override current date (YYYY-MM-DD) for deterministic testing")
+    parser.add_argument("--out", type=Path, default=None, help="Write the exceptions JSON here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        today = _parse_date(args.now) if args.now else datetime.now(timezone.utc).date()
+        expires_at = _parse_date(args.expires_at) if args.expires_at else today + timedelta(days=DEFAULT_VALIDITY_DAYS)
+        current = load_exceptions(args.exceptions, today, fail_on_expired=False) if args.exceptions else []
+        principals = list(dict.fromkeys(args.principal + [entry.principal_arn for entry in current]))
+        if not principals:
+            raise RecommendationError("pass --principal or --exceptions to choose principals to analyze")
+        policy = CompiledPolicy.compile(load_policy(args.policy)) if args.policy is not None else None
+        recommender = Recommender(
+            principals, max_nodes=args.max_nodes, include_denied=args.include_denied, policy=policy, bucket=args.bucket
+        )
+        for record in iter_corpus(args, principals):
+            recommender.observe(record)
+        entries = recommender.recommend(max(1, args.budget), expires_at, current)
+    except (RecommendationError, PolicyMergeError, PolicyEvaluationError, AccessIndexError, RecordFormatError, OSError) as exc:
+        payload = {"status": "error", "message": str(exc)}
+        if args.json:
+            sys.stdout.write(json.dumps(payload) + "\n")
+        else:
+            LOG.error("recommendation failed: %s", exc)
+        return 2
+
+    document = {"Exceptions": [entry.to_json() for entry in entries]}
+    rendered = json.dumps(document, indent=2, ensure_ascii=False) + "\n"
+    if args.out is not None:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(rendered, encoding="utf-8")
+    summary = {
+        "status": "success",
+        "principals": len(principals),
+        "recommended": len(entries),
+        "requests": sum(trie.requests for trie in recommender.tries.values()),
+        "skipped": recommender.skipped,
+        "out": str(args.out) if args.out else None,
+    }
+    if args.json:
+        sys.stdout.write(json.dumps(summary if args.out else dict(summary, **document)) + "\n")
+    elif args.out is None:
+        sys.stdout.write(rendered)
+    else:
+        sys.stdout.write(f"recommended {len(entries)} exceptions for {len(principals)} principals -> {args.out}\n")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
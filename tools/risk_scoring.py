@@ -0,0 +1,448 @@
+"""Incremental risk scoring: sliding-window severity counts, risk scores and top offenders over streamed findings."""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.access_records import iter_raw, iter_unconsumed, merge_sources, parse_event_time
+    from tools.sketches import SketchError, SpaceSaving
+except ImportError:  # pragma: no cover
+    from access_records import iter_raw, iter_unconsumed, merge_sources, parse_event_time
+    from sketches import SketchError, SpaceSaving
+
+LOG = logging.getLogger("s3_data_perimeter.risk")
+DEFAULT_STATE = Path("artifacts/risk-state.json")
+DEFAULT_WINDOWS = ("1h", "24h", "7d")
+STATE_VERSION = 1
+HIGH_RISK = 80
+MEDIUM_RISK = 40
+SEVERITIES = ("high", "medium", "low")
+UNKNOWN = "-"
+# Per-offender auxiliary sums carried by the Space-Saving counters.
+FINDINGS, HIGH, SCORE_SUM, SCORE_SQUARES = range(4)
+
+
+class RiskScoringError(RuntimeError):
+    """Raised when findings or scoring state cannot be read, merged or summarized."""
+
+
+def severity(score: float) -> str:
+    if score >= HIGH_RISK:
+        return "high"
+    if score >= MEDIUM_RISK:
+        return "medium"
+    return "low"
+
+
+def parse_duration(value: str) -> int:
+    """Seconds in ``30m``/``12h``/``7d``."""
+    units = {"d": 86400, "h": 3600, "m": 60}
+    try:
+        seconds = int(value[:-1]) * units[value[-1]]
+    except (IndexError, KeyError, ValueError) as exc:
+        raise RiskScoringError(f"invalid duration {value!r}; use e.g. 7d, 12h or 30m") from exc
+    if seconds <= 0:
+        raise RiskScoringError(f"duration {value!r} must be positive")
+    return seconds
+
+
+def blended_score(score_sum: int, score_squares: int) -> int:
+    """Score-weighted mean of finding scores: one critical finding outweighs many low ones, and the value stays in 0-100."""
+    return round(score_squares / score_sum) if score_sum else 0
+
+
+class Slot:
+    """Aggregates of every finding whose ``eventTime`` falls in one ``slot_seconds`` interval."""
+
+    __slots__ = ("counts", "score_sum", "score_squares", "buckets", "principals")
+
+    def __init__(self, capacity: int) -> None:
+        self.counts = [0, 0, 0]
+        self.score_sum = 0
+        self.score_squares = 0
+        self.buckets = SpaceSaving(capacity, extras=4)
+        self.principals = SpaceSaving(capacity, extras=4)
+
+    def add(self, bucket: str, principal: str, score: int) -> None:
+        level = severity(score)
+        self.counts[SEVERITIES.index(level)] += 1
+        self.score_sum += score
+        self.score_squares += score * score
+        extra = (1, level == "high", score, score * score)
+        self.buckets.add(bucket, score, extra)
+        self.principals.add(principal, score, extra)
+
+    @classmethod
+    def union(cls, slots: Sequence["Slot"], capacity: int) -> "Slot":
+        combined = cls(capacity)
+        for slot in slots:
+            combined.counts = [a + b for a, b in zip(combined.counts, slot.counts)]
+            combined.score_sum += slot.score_sum
+            combined.score_squares += slot.score_squares
+        if slots:
+            combined.buckets = SpaceSaving.union([slot.buckets for slot in slots])
+            combined.principals = SpaceSaving.union([slot.principals for slot in slots])
+        return combined
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "counts": self.counts,
+            "scoreSum": self.score_sum,
+            "scoreSquares": self.score_squares,
+            "buckets": self.buckets.to_json(),
+            "principals": self.principals.to_json(),
+        }
+
+    @classmethod
+    def from_json(cls, raw: Mapping[str, Any], capacity: int) -> "Slot":
+        slot = cls(capacity)
+        slot.counts = [int(value) for value in raw["counts"]]
+        slot.score_sum = int(raw["scoreSum"])
+        slot.score_squares = int(raw["scoreSquares"])
+        slot.buckets = SpaceSaving.from_json(raw["buckets"])
+        slot.principals = SpaceSaving.from_json(raw["principals"])
+        return slot
+
+
+def _offenders(summary: SpaceSaving, label: str, top: int) -> List[Dict[str, Any]]:
+    rows = []
+    for item, weight, error, extra in summary.top(top):
+        rows.append(
+            {
+                label: item,
+                "riskScore": blended_score(extra[SCORE_SUM], extra[SCORE_SQUARES]),
+                "riskWeight": weight,
+                "error": error,
+                "findings": extra[FINDINGS],
+                "high": extra[HIGH],
+            }
+        )
+    return rows
+
+
+class RiskScorer:
+    """Sliding-window risk summaries over a findings stream in bounded, mergeable state.
+
+    Findings land in fixed ``slot_seconds`` slots by ``eventTime``; slots older than ``retention`` behind the newest
+    event are dropped, so state holds at most ``retention / slot_seconds`` slots of ``capacity`` offenders each.
+    A window summary merges the slots it covers, so its edges have one-slot resolution. Severity counts and the
+    overall score are exact; offender weights come from Space-Saving summaries and carry an ``error`` bound.
+    """
+
+    def __init__(self, slot_seconds: int = 300, retention: int = 7 * 86400, capacity: int = 64) -> None:
+        if slot_seconds <= 0 or retention < slot_seconds or capacity < 1:
+            raise RiskScoringError("slot, retention and capacity must be positive and retention at least one slot")
+        self.slot_seconds = slot_seconds
+        self.retention = retention
+        self.capacity = capacity
+        self.slots: Dict[int, Slot] = {}
+        self.watermark: Optional[int] = None
+        self.observed = 0
+        self.late = 0
+        self.invalid = 0
+        self.sources: Dict[str, Dict[str, Any]] = {}  # consumed findings files, as in the access index manifest
+        self.shards: Dict[str, str] = {}  # sha256 of each shard state file merged in -> its path
+
+    def observe(self, finding: Mapping[str, Any], now: Optional[datetime] = None) -> bool:
+        """Fold one finding into its slot; findings without ``eventTime`` count at ``now``."""
+        score = finding.get("riskScore")
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 100:
+            self.invalid += 1
+            return False
+        when = parse_event_time(finding.get("eventTime")) or now or datetime.now(timezone.utc)
+        epoch = int(when.timestamp())
+        if self.watermark is not None and epoch <= self.watermark - self.retention:
+            self.late += 1
+            return False
+        start = epoch - epoch % self.slot_seconds
+        slot = self.slots.get(start)
+        if slot is None:
+            slot = self.slots[start] = Slot(self.capacity)
+        slot.add(str(finding.get("bucketName") or UNKNOWN), str(finding.get("principal") or UNKNOWN), round(score))
+        self.observed += 1
+        if self.watermark is None or epoch > self.watermark:
+            advanced = self.watermark is None or start > self.watermark - self.watermark % self.slot_seconds
+            self.watermark = epoch
+            if advanced:
+                self._expire()
+        return True
+
+    def observe_all(self, findings: Iterable[Mapping[str, Any]], now: Optional[datetime] = None) -> int:
+        return sum(self.observe(finding, now) for finding in findings)
+
+    def _expire(self) -> None:
+        if self.watermark is None:
+            return
+        horizon = self.watermark - self.retention
+        for start in [start for start in self.slots if start + self.slot_seconds <= horizon]:
+            del self.slots[start]
+
+    def merge(self, other: "RiskScorer") -> None:
+        """Fold another shard's state into this one; the result matches scoring both streams in one process."""
+        if (self.slot_seconds, self.capacity) != (other.slot_seconds, other.capacity):
+            raise RiskScoringError(
+                f"cannot merge scoring state with slot={other.slot_seconds}s capacity={other.capacity} "
+                f"into slot={self.slot_seconds}s capacity={self.capacity}"
+            )
+        for start, slot in other.slots.items():
+            mine = self.slots.get(start)
+            self.slots[start] = Slot.union([slot] if mine is None else [mine, slot], self.capacity)
+        if other.watermark is not None and (self.watermark is None or other.watermark > self.watermark):
+            self.watermark = other.watermark
+        self.observed += other.observed
+        self.late += other.late
+        self.invalid += other.invalid
+        merge_sources(self.sources, other.sources)
+        self.shards.update(other.shards)
+        self._expire()
+
+    def summary(self, window: int, now: Optional[datetime] = None, top: int = 10) -> Dict[str, Any]:
+        """Severity counts, overall score and top offenders for the ``window`` seconds ending at ``now``."""
+        if window > self.retention:
+            raise RiskScoringError(f"window of {window}s exceeds the {self.retention}s retained in state")
+        end = int(now.timestamp()) if now is not None else self.watermark
+        if end is None:
+            end = int(datetime.now(timezone.utc).timestamp())
+        begin = end - window + 1  # the window is the ``window`` whole seconds ending at ``end`` inclusive
+        covered = Slot.union(
+            [slot for start, slot in sorted(self.slots.items()) if begin < start + self.slot_seconds and start <= end],
+            self.capacity,
+        )
+        high, medium, low = covered.counts
+        return {
+            "start": _isoformat(begin),
+            "end": _isoformat(end),
+            "summary": {
+                "totalFindings": high + medium + low,
+                "high": high,
+                "medium": medium,
+                "low": low,
+                "riskScore": blended_score(covered.score_sum, covered.score_squares),
+            },
+            "topBuckets": _offenders(covered.buckets, "bucketName", top),
+            "topPrincipals": _offenders(covered.principals, "principal", top),
+        }
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "version": STATE_VERSION,
+            "slotSeconds": self.slot_seconds,
+            "retention": self.retention,
+            "capacity": self.capacity,
+            "watermark": self.watermark,
+            "observed": self.observed,
+            "late": self.late,
+            "invalid": self.invalid,
+            "slots": {str(start): slot.to_json() for start, slot in sorted(self.slots.items())},
+            "sources": self.sources,
+            "shards": self.shards,
+        }
+
+    @classmethod
+    def from_json(cls, payload: Mapping[str, Any]) -> "RiskScorer":
+        if payload.get("version") != STATE_VERSION:
+            raise RiskScoringError(f"unsupported scoring state version {payload.get('version')}")
+        scorer = cls(int(payload["slotSeconds"]), int(payload["retention"]), int(payload["capacity"]))
+        scorer.watermark = payload.get("watermark")
+        scorer.observed = int(payload.get("observed", 0))
+        scorer.late = int(payload.get("late", 0))
+        scorer.invalid = int(payload.get("invalid", 0))
+        scorer.slots = {int(start): Slot.from_json(raw, scorer.capacity) for start, raw in payload.get("slots", {}).items()}
+        scorer.sources = {str(key): dict(entry) for key, entry in payload.get("sources", {}).items()}
+        scorer.shards = {str(digest): str(path) for digest, path in payload.get("shards", {}).items()}
+        return scorer
+
+
+def _isoformat(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def iter_findings(path: Path, sources: Optional[Dict[str, Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+    """Findings from analyzer NDJSON alerts, a JSON array, ``findings.json`` or webhook ``{"findings": [...]}`` batches.
+
+    With ``sources``, only data earlier runs have not consumed is read (see ``iter_unconsumed``).
+    """
+    for item in iter_raw(path) if sources is None else iter_unconsumed(path, sources):
+        if isinstance(item, dict) and isinstance(item.get("findings"), list):
+            yield from item["findings"]
+        elif isinstance(item, dict):
+            yield item
+
+
+def load_scorer(path: Path, *, missing_ok: bool = False, **defaults: int) -> RiskScorer:
+    if missing_ok and not path.exists():
+        return RiskScorer(**defaults)
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            return RiskScorer.from_json(json.load(handle))
+    except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError) as exc:
+        raise RiskScoringError(f"failed to read scoring state {path}: {exc}") from exc
+
+
+def shard_digest(path: Path) -> str:
+    with path.open("rb") as handle:
+        return hashlib.sha256(handle.read()).hexdigest()
+
+
+def merge_shard(scorer: RiskScorer, path: Path) -> bool:
+    """Fold the shard state at ``path`` into ``scorer`` unless it was already merged; True when merged.
+
+    Shards are recorded by content digest, so re-running a merge over the same files is a no-op. A shard
+    that changed after it was merged is refused: its earlier counts are already in ``scorer`` and cannot be
+    separated from the new ones, so merge it into a fresh state instead.
+    """
+    digest, key = shard_digest(path), str(path.resolve())
+    if digest in scorer.shards:
+        LOG.info("%s was already merged into this state; skipping", path)
+        return False
+    if key in scorer.shards.values():
+        raise RiskScoringError(f"{path} changed since it was merged into this state; merge the shards into a fresh --state")
+    shard = load_scorer(path)
+    overlap = sorted(set(shard.shards) & set(scorer.shards))
+    if overlap:
+        raise RiskScoringError(f"{path} includes shard {scorer.shards[overlap[0]]} that was already merged into this state")
+    scorer.merge(shard)
+    scorer.shards[digest] = key
+    return True
+
+
+def save_scorer(scorer: RiskScorer, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as handle:
+        json.dump(scorer.to_json(), handle, separators=(",", ":"))
+        handle.write("\n")
+    os.replace(tmp, path)
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--state", type=Path, default=DEFAULT_STATE, help="Scoring state JSON")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    ingest = commands.add_parser("ingest", help="Fold findings files into the scoring state")
+    ingest.add_argument("findings", type=Path, nargs="+", help="NDJSON alerts, findings.json or webhook batch files")
+    ingest.add_argument("--slot", default="5m", help="Slot width for a new state (e.g. 5m, 1h)")
+    ingest.add_argument("--retention", default="7d", help="History kept for a new state; bounds the widest window")
+    ingest.add_argument("--capacity", type=int, default=64, help="Offenders tracked per slot for a new state")
+    ingest.add_argument("--now", default=None, help="Time for findings without eventTime (default: current time)")
+
+    merge = commands.add_parser("merge", help="Merge scoring state from other shards into --state")
+    merge.add_argument("shards", type=Path, nargs="+", help="Scoring state files written by other workers")
+
+    summary = commands.add_parser("summary", help="Print windowed findings summaries and top offenders")
+    summary.add_argument("--window", action="append", default=None, help=f"Window to report (default: {', '.join(DEFAULT_WINDOWS)})")
+    summary.add_argument("--top", type=int, default=10, help="Offenders listed per window")
+    summary.add_argument("--now", default=None, help="Window end as ISO-8601 (default: newest eventTime)")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def _parse_now(value: Optional[str]) -> Optional[datetime]:
+    if value is None:
+        return None
+    parsed = parse_event_time(value)
+    if parsed is None:
+        raise RiskScoringError(f"--now must be an ISO-8601 timestamp, got {value!r}")
+    return parsed
+
+
+def _run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.command == "ingest":
+        scorer = load_scorer(
+            args.state,
+            missing_ok=True,
+            slot_seconds=parse_duration(args.slot),
+            retention=parse_duration(args.retention),
+            capacity=args.capacity,
+        )
+        now = _parse_now(args.now) or datetime.now(timezone.utc)
+        before = (scorer.observed, scorer.late, scorer.invalid)
+        for path in args.findings:
+            scorer.observe_all(iter_findings(path, scorer.sources), now)
+        save_scorer(scorer, args.state)
+        observed, late, invalid = (after - prior for after, prior in zip((scorer.observed, scorer.late, scorer.invalid), before))
+        return {"status": "success", "observed": observed, "late": late, "invalid": invalid, "slots": len(scorer.slots)}
+    if args.command == "merge":
+        if args.state.exists():
+            merged = load_scorer(args.state)
+        else:
+            first = load_scorer(args.shards[0])
+            merged = RiskScorer(first.slot_seconds, first.retention, first.capacity)
+        folded = sum(merge_shard(merged, path) for path in args.shards)
+        save_scorer(merged, args.state)
+        return {
+            "status": "success",
+            "shards": folded,
+            "skipped": len(args.shards) - folded,
+            "observed": merged.observed,
+            "slots": len(merged.slots),
+        }
+
+    scorer = load_scorer(args.state)
+    now = _parse_now(args.now)
+    windows = args.window or [window for window in DEFAULT_WINDOWS if parse_duration(window) <= scorer.retention]
+    return {"windows": {window: scorer.summary(parse_duration(window), now, max(0, args.top)) for window in windows}}
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        result = _run(args)
+    except (RiskScoringError, SketchError, OSError, EOFError, zlib.error, ValueError) as exc:
+        payload = {"status": "error", "message": str(exc)}
+        if args.json:
+            sys.stdout.write(json.dumps(payload) + "\n")
+        else:
+            LOG.error("risk %s failed: %s", args.command, exc)
+        return 2
+
+    if args.json:
+        sys.stdout.write(json.dumps(result) + "\n")
+    elif args.command == "ingest":
+        sys.stdout.write(
+            f"risk ingest: observed {result['observed']} findings, late {result['late']}, "
+            f"invalid {result['invalid']}; {result['slots']} slots in state\n"
+        )
+    elif args.command == "merge":
+        sys.stdout.write(
+            f"risk merge: {result['shards']} shards merged, {result['skipped']} already merged; "
+            f"{result['observed']} findings, {result['slots']} slots\n"
+        )
+    else:
+        for window, report in result["windows"].items():
+            totals = report["summary"]
+            sys.stdout.write(
+                f"{window} ({report['start']} .. {report['end']}): {totals['totalFindings']} findings "
+                f"high={totals['high']} medium={totals['medium']} low={totals['low']} riskScore={totals['riskScore']}\n"
+            )
+            for label, key in (("bucket", "topBuckets"), ("principal", "topPrincipals")):
+                for row in report[key]:
+                    name = row["bucketName"] if label == "bucket" else row["principal"]
+                    sys.stdout.write(
+                        f"  {label} {name}: riskScore={row['riskScore']} weight={row['riskWeight']}"
+                        f" error={row['error']} findings={row['findings']} high={row['high']}\n"
+                    )
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,253 @@
+"""Mergeable streaming sketches with deterministic hashing and compact JSON serialization."""
+from __future__ import annotations
+
+import base64
+import hashlib
+import heapq
+import math
+import sys
+import zlib
+from array import array
+from typing import Any, Dict, Iterator, List, Mapping, Sequence, Tuple
+
+
+class SketchError(ValueError):
+    """Raised when sketches with different shapes are merged or state cannot be decoded."""
+
+
+def _hash64(item: str, salt: bytes = b"") -> int:
+    # blake2b rather than hash(): state files are merged across processes and hosts.
+    return int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8, salt=salt).digest(), "big")
+
+
+def _encode(payload: bytes) -> str:
+    return base64.b64encode(zlib.compress(payload, 6)).decode("ascii")
+
+
+def _decode(payload: str) -> bytes:
+    try:
+        return zlib.decompress(base64.b64decode(payload.encode("ascii")))
+    except (ValueError, zlib.error) as exc:
+        raise SketchError(f"corrupt sketch payload: {exc}") from exc
+
+
+def _counters_to_bytes(counters: array) -> bytes:
+    if sys.byteorder == "little":
+        return counters.tobytes()
+    swapped = array(counters.typecode, counters)
+    swapped.byteswap()
+    return swapped.tobytes()
+
+
+def _counters_from_bytes(payload: bytes) -> array:
+    counters = array("Q")
+    counters.frombytes(payload)
+    if sys.byteorder != "little":
+        counters.byteswap()
+    return counters
+
+
+class CountMinSketch:
+    """Frequency estimates that never undercount; overcount is at most ``e / width`` of the total with
+    probability ``1 - exp(-depth)``."""
+
+    __slots__ = ("width", "depth", "total", "_counters")
+
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        if width < 1 or depth < 1:
+            raise SketchError("count-min width and depth must be positive")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._counters = array("Q", bytes(8 * width * depth))
+
+    @classmethod
+    def for_error(cls, epsilon: float, delta: float) -> "CountMinSketch":
+        return cls(width=math.ceil(math.e / epsilon), depth=math.ceil(math.log(1 / delta)))
+
+    def _cells(self, item: str) -> Iterator[int]:
+        first = _hash64(item)
+        second = _hash64(item, b"cms") | 1
+        for row in range(self.depth):
+            yield row * self.width + (first + row * second) % self.width
+
+    def add(self, item: str, count: int = 1) -> None:
+        counters = self._counters
+        for cell in self._cells(item):
+            counters[cell] += count
+        self.total += count
+
+    def estimate(self, item: str) -> int:
+        counters = self._counters
+        return min(counters[cell] for cell in self._cells(item))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise SketchError("cannot merge count-min sketches of different shapes")
+        counters = self._counters
+        for index, value in enumerate(other._counters):
+            if value:
+                counters[index] += value
+        self.total += other.total
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"width": self.width, "depth": self.depth, "total": self.total, "counters": _encode(_counters_to_bytes(self._counters))}
+
+    @classmethod
+    def from_json(cls, raw: Mapping[str, Any]) -> "CountMinSketch":
+        sketch = cls(int(raw["width"]), int(raw["depth"]))
+        counters = _counters_from_bytes(_decode(raw["counters"]))
+        if len(counters) != sketch.width * sketch.depth:
+            raise SketchError("count-min counters do not match width x depth")
+        sketch._counters = counters
+        sketch.total = int(raw.get("total", 0))
+        return sketch
+
+
+class HyperLogLog:
+    """Distinct-count estimate in ``2 ** precision`` bytes; relative error is about ``1.04 / sqrt(2 ** precision)``."""
+
+    __slots__ = ("precision", "_registers")
+
+    def __init__(self, precision: int = 10) -> None:
+        if not 4 <= precision <= 16:
+            raise SketchError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def add(self, item: str) -> None:
+        value = _hash64(item)
+        width = 64 - self.precision
+        index = value >> width
+        rank = width - (value & ((1 << width) - 1)).bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def estimate(self) -> int:
+        registers = self._registers
+        size = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / size)
+        raw = alpha * size * size / sum(2.0**-register for register in registers)
+        zeros = registers.count(0)
+        if raw <= 2.5 * size and zeros:
+            return round(size * math.log(size / zeros))
+        return round(raw)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if self.precision != other.precision:
+            raise SketchError("cannot merge HyperLogLog sketches of different precision")
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"precision": self.precision, "registers": _encode(bytes(self._registers))}
+
+    @classmethod
+    def from_json(cls, raw: Mapping[str, Any]) -> "HyperLogLog":
+        sketch = cls(int(raw["precision"]))
+        registers = _decode(raw["registers"])
+        if len(registers) != len(sketch._registers):
+            raise SketchError("HyperLogLog registers do not match precision")
+        sketch._registers = bytearray(registers)
+        return sketch
+
+
+class SpaceSaving:
+    """Weighted heavy hitters in ``capacity`` counters: every item heavier than ``total / capacity`` is kept and
+    each reported weight overcounts by at most its ``error``.
+
+    Each counter also carries ``extras`` auxiliary sums that are exact for the period the item has been tracked.
+    """
+
+    __slots__ = ("capacity", "extras", "total", "_counters")
+
+    def __init__(self, capacity: int = 64, extras: int = 0) -> None:
+        if capacity < 1 or extras < 0:
+            raise SketchError("space-saving capacity must be positive")
+        self.capacity = capacity
+        self.extras = extras
+        self.total = 0
+        self._counters: Dict[str, List[int]] = {}  # item -> [weight, error, *extras]
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    @property
+    def floor(self) -> int:
+        """Largest weight an untracked item can have."""
+        if len(self._counters) < self.capacity:
+            return 0
+        return min(counter[0] for counter in self._counters.values())
+
+    def add(self, item: str, weight: int = 1, extra: Sequence[int] = ()) -> None:
+        counters = self._counters
+        counter = counters.get(item)
+        if counter is None:
+            if len(counters) < self.capacity:
+                counter = counters[item] = [0, 0] + [0] * self.extras
+            else:
+                victim = min(counters, key=lambda key: counters[key][0])
+                floor = counters.pop(victim)[0]
+                counter = counters[item] = [floor, floor] + [0] * self.extras
+        counter[0] += weight
+        for index, value in enumerate(extra, 2):
+            counter[index] += value
+        self.total += weight
+
+    def top(self, count: int | None = None) -> List[Tuple[str, int, int, List[int]]]:
+        """``(item, weight, error, extras)`` for the heaviest items, heaviest first."""
+        ranked = sorted(self._counters.items(), key=lambda entry: (-entry[1][0], entry[0]))
+        return [(item, counter[0], counter[1], counter[2:]) for item, counter in ranked[:count]]
+
+    def merge(self, other: "SpaceSaving") -> None:
+        combined = SpaceSaving.union([self, other])
+        self._counters = combined._counters
+        self.total = combined.total
+
+    @classmethod
+    def union(cls, sketches: Sequence["SpaceSaving"]) -> "SpaceSaving":
+        """Merge any number of summaries in one pass (Agarwal et al., "Mergeable Summaries").
+
+        An item missing from a full summary may have weighed up to that summary's floor, so the floor is added to
+        both its weight and its error.
+        """
+        if not sketches:
+            raise SketchError("nothing to merge")
+        shape = (sketches[0].capacity, sketches[0].extras)
+        if any((sketch.capacity, sketch.extras) != shape for sketch in sketches):
+            raise SketchError("cannot merge space-saving summaries of different shapes")
+        result = cls(*shape)
+        floors = 0
+        merged: Dict[str, List[int]] = {}
+        for sketch in sketches:
+            floor = sketch.floor
+            floors += floor
+            for item, counter in sketch._counters.items():
+                target = merged.get(item)
+                if target is None:
+                    target = merged[item] = [0] * len(counter)
+                target[0] += counter[0] - floor
+                target[1] += counter[1] - floor
+                for index in range(2, len(counter)):
+                    target[index] += counter[index]
+            result.total += sketch.total
+        ranked = heapq.nsmallest(result.capacity, merged, key=lambda key: (-merged[key][0], key))
+        for item in ranked:
+            counter = merged[item]
+            counter[0] += floors
+            counter[1] += floors
+            result._counters[item] = counter
+        return result
+
+    def to_json(self) -> Dict[str, Any]:
+        counters = [[item, *counter] for item, counter in sorted(self._counters.items())]
+        return {"capacity": self.capacity, "extras": self.extras, "total": self.total, "counters": counters}
+
+    @classmethod
+    def from_json(cls, raw: Mapping[str, Any]) -> "SpaceSaving":
+        sketch = cls(int(raw["capacity"]), int(raw.get("extras", 0)))
+        counters = {str(row[0]): [int(value) for value in row[1:]] for row in raw.get("counters", [])}
+        if len(counters) > sketch.capacity or any(len(counter) != 2 + sketch.extras for counter in counters.values()):
+            raise SketchError("space-saving counters do not match capacity and extras")
+        sketch._counters = counters
+        sketch.total = int(raw.get("total", 0))
+        return sketch
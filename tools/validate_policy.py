@@ -118,6 +118,11 @@ def find_placeholders(document: Mapping[str, Any]) -> List[str]:
     return cleaned
 
 
+def allows_placeholders(path: Path) -> bool:
+    """Templates (base policy, exceptions) may still contain ``${...}`` variables."""
+    return path.name.endswith(".base.json") or path.name.endswith(".exceptions.json")
+
+
 def run_validations(paths: Iterable[Path]) -> List[ValidationResult]:
     results: List[ValidationResult] = []
     for path in paths:
@@ -127,8 +132,7 @@ def run_validations(paths: Iterable[Path]) -> List[ValidationResult]:
         except json.JSONDecodeError as exc:
             errors.append(f"invalid JSON: {exc}")
         else:
-            allow_placeholders = path.name.endswith(".base.json") or path.name.endswith(".exceptions.json")
-            errors.extend(validate_document(document, allow_placeholders=allow_placeholders))
+            errors.extend(validate_document(document, allow_placeholders=allows_placeholders(path)))
         results.append(ValidationResult(path=path, errors=errors))
     return results
 
@@ -0,0 +1,288 @@
+"""Estimate which recorded requests a proposed exception would newly allow or deny before it is approved."""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+try:  # pragma: no cover - import shim for package vs script execution
+    from tools.access_index import AccessIndex, AccessIndexError, IndexQuery
+    from tools.access_records import RecordFormatError, iter_log_paths, iter_records, load_org_ids
+    from tools.evaluate_policy import CompiledPolicy
+    from tools.merge_policy import (
+        BUCKET_LEVEL_ACTIONS,
+        ExceptionEntry,
+        PolicyMergeError,
+        _ensure_variables,
+        _parse_date,
+        build_exception_statement,
+        load_exceptions,
+        load_policy,
+        load_requests_directory,
+        merge_policies,
+        parse_variables,
+    )
+except ImportError:  # pragma: no cover
+    from access_index import AccessIndex, AccessIndexError, IndexQuery
+    from access_records import RecordFormatError, iter_log_paths, iter_records, load_org_ids
+    from evaluate_policy import CompiledPolicy
+    from merge_policy import (
+        BUCKET_LEVEL_ACTIONS,
+        ExceptionEntry,
+        PolicyMergeError,
+        _ensure_variables,
+        _parse_date,
+        build_exception_statement,
+        load_exceptions,
+        load_policy,
+        load_requests_directory,
+        merge_policies,
+        parse_variables,
+    )
+
+LOG = logging.getLogger("s3_data_perimeter.whatif")
+DEFAULT_SAMPLES = 10
+
+
+class WhatIfError(RuntimeError):
+    """Raised when the candidate, the current policy or the corpus cannot be loaded."""
+
+
+@dataclass
+class DeltaStatement:
+    """One statement that the change adds or removes, compiled on its own."""
+
+    entry: ExceptionEntry
+    statement: Dict[str, Any]
+    matcher: CompiledPolicy = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.matcher = CompiledPolicy.compile({"Statement": [self.statement]})
+
+    @property
+    def sid(self) -> str:
+        return str(self.statement["Sid"])
+
+    def matches(self, record: Mapping[str, Any]) -> bool:
+        return self.matcher.is_allowed(record)
+
+    def index_filter(self, bucket: str) -> Tuple[Optional[str], Optional[str], str]:
+        """``(principal, key prefix, bucket)`` that every record this statement can match shares."""
+        principal = None if "*" in self.entry.principal_arn else self.entry.principal_arn
+        prefix = None
+        if not any(action in BUCKET_LEVEL_ACTIONS for action in self.entry.actions):
+            prefix = self.entry.prefix.split("*", 1)[0] or None
+        return principal, prefix, bucket
+
+
+@dataclass
+class WhatIfReport:
+    scanned: int = 0
+    touched: int = 0
+    newly_allowed: int = 0
+    newly_denied: int = 0
+    samples_allowed: List[Dict[str, Any]] = field(default_factory=list)
+    samples_denied: List[Dict[str, Any]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "scanned": self.scanned,
+            "touched": self.touched,
+            "newlyAllowed": self.newly_allowed,
+            "newlyDenied": self.newly_denied,
+            "samples": {"newlyAllowed": self.samples_allowed, "newlyDenied": self.samples_denied},
+            "elapsedMillis": round(self.elapsed * 1e3, 3),
+        }
+
+
+def simulate(
+    current: CompiledPolicy,
+    added: Sequence[DeltaStatement],
+    removed: Sequence[DeltaStatement],
+    records: Iterable[Mapping[str, Any]],
+    *,
+    samples: int = DEFAULT_SAMPLES,
+) -> WhatIfReport:
+    """Compare outcomes before and after the change, visiting the full policy only for touched records.
+
+    An added Allow can only flip an implicit deny (no statement matched); an explicit Deny
+    still wins. A removed Allow can only flip a request that no other Allow admits.
+    """
+    report = WhatIfReport()
+    started = time.perf_counter()
+    removed_sids = {delta.sid for delta in removed}
+    for record in records:
+        report.scanned += 1
+        in_added = any(delta.matches(record) for delta in added)
+        in_removed = any(delta.matches(record) for delta in removed)
+        if not in_added and not in_removed:
+            continue
+        report.touched += 1
+        decision = current.decide(record)
+        if not decision.allowed:
+            if in_added and decision.sid is None:
+                report.newly_allowed += 1
+                if len(report.samples_allowed) < samples:
+                    report.samples_allowed.append(dict(record))
+        elif in_removed and not in_added:
+            if all(sid in removed_sids for sid in current.matching_allow_sids(record)):
+                report.newly_denied += 1
+                if len(report.samples_denied) < samples:
+                    report.samples_denied.append(dict(decision_record(record, decision.sid)))
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def decision_record(record: Mapping[str, Any], sid: Optional[str]) -> Dict[str, Any]:
+    sample = dict(record)
+    sample["allowedBy"] = sid
+    return sample
+
+
+def load_candidate(path: Path, today: date) -> ExceptionEntry:
+    """Parse one request file the way :func:`load_requests_directory` does."""
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+    except (OSError, json.JSONDecodeError) as exc:
+        raise WhatIfError(f"failed to read candidate {path}: {exc}") from exc
+    if not isinstance(payload, dict):
+        raise WhatIfError(f"candidate {path} must be a JSON object")
+    if isinstance(payload.get("prefix"), str):
+        payload["prefix"] = payload["prefix"].lstrip("/")
+    entry = ExceptionEntry.from_json(payload)
+    if entry.expires_at < today:
+        LOG.warning("candidate %s already expired on %s", entry.identifier, entry.expires_at)
+    return entry
+
+
+def plan_change(
+    current: Sequence[ExceptionEntry], candidates: Sequence[ExceptionEntry], variables: Mapping[str, str]
+) -> Tuple[List[DeltaStatement], List[DeltaStatement], List[ExceptionEntry]]:
+    """Added and removed statements plus the exception list the merge would use after approval.
+
+    A candidate with the same id as an approved exception replaces it (renewal or scope change).
+    """
+    replaced_ids = {entry.identifier for entry in candidates}
+    removed = [
+        DeltaStatement(entry, build_exception_statement(entry, variables, index))
+        for index, entry in enumerate(current)
+        if entry.identifier in replaced_ids
+    ]
+    proposed = [entry for entry in current if entry.identifier not in replaced_ids] + list(candidates)
+    offset = len(proposed) - len(candidates)
+    added = [DeltaStatement(entry, build_exception_statement(entry, variables, offset + index)) for index, entry in enumerate(candidates)]
+    return added, removed, proposed
+
+
+def iter_index_records(index: AccessIndex, deltas: Sequence[DeltaStatement], bucket: str) -> Iterator[Dict[str, Any]]:
+    """Only the index postings the delta statements can match; duplicates across filters are dropped."""
+    filters = list(dict.fromkeys(delta.index_filter(bucket) for delta in deltas))
+    seen = set()
+    for principal, prefix, bucket_name in filters:
+        for record in index.query(IndexQuery(principal=principal, prefix=prefix, bucket=bucket_name)):
+            if len(filters) > 1:
+                key = json.dumps(record, sort_keys=True)
+                if key in seen:
+                    continue
+                seen.add(key)
+            yield record
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--candidate", type=Path, action="append", required=True, help="Proposed request file; repeatable")
+    parser.add_argument("--base", type=Path, default=Path("policies/bucket-policy.base.json"), help="Baseline policy")
+    parser.add_argument("--exceptions", type=Path, default=Path("policies/bucket-policy.exceptions.json"), help="Exceptions JSON")
+    parser.add_argument("--requests-dir", type=Path, default=None, help="Approved request files (candidates inside are ignored)")
+    parser.add_argument("--vars", metavar="KEY=VALUE", nargs="*", default=[], help="Template variables")
+    parser.add_argument("--now", default=None, help="Override current date (YYYY-MM-DD) for deterministic testing")
+    corpus = parser.add_mutually_exclusive_group(required=True)
+    corpus.add_argument("--index", type=Path, default=None, help="Access index built by access_index.py")
+    corpus.add_argument("--logs", type=Path, nargs="+", default=None, help="Raw log files or directories to scan")
+    parser.add_argument("--org-ids", type=Path, default=None, help="JSON map of CloudTrail accountId to org id (--logs)")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="Sample records to include per outcome")
+    parser.add_argument("--verbose", action="store_true", help="Enable verbose logging")
+    parser.add_argument("--json", action="store_true", help="Emit machine-readable JSON summary")
+    return parser
+
+
+def configure_logging(verbose: bool) -> None:
+    level = logging.DEBUG if verbose else logging.INFO
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s - %(message)s")
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    configure_logging(args.verbose)
+
+    try:
+        today = _parse_date(args.now) if args.now else datetime.now(timezone.utc).date()
+        variables = _ensure_variables(parse_variables(args.vars))
+        candidates = [load_candidate(path, today) for path in args.candidate]
+        current = load_exceptions(args.exceptions, today, fail_on_expired=False)
+        if args.requests_dir:
+            candidate_paths = {path.resolve() for path in args.candidate}
+            approved = load_requests_directory(args.requests_dir, today)
+            files = sorted(args.requests_dir.glob("*.json"))
+            current.extend(entry for entry, path in zip(approved, files) if path.resolve() not in candidate_paths)
+        added, removed, _ = plan_change(current, candidates, variables)
+        policy = CompiledPolicy.compile(merge_policies(load_policy(args.base), current, variables).policy)
+
+        deltas = added + removed
+        if args.index is not None:
+            index = AccessIndex(args.index)
+            corpus_size = index.manifest["records"]
+            records: Iterable[Dict[str, Any]] = iter_index_records(index, deltas, variables["BucketName"])
+        else:
+            index = None
+            corpus_size = None
+            org_ids = load_org_ids(args.org_ids)
+            records = (record for path in iter_log_paths(args.logs) for record in iter_records(path, org_ids))
+        try:
+            report = simulate(policy, added, removed, records, samples=max(0, args.samples))
+        finally:
+            if index is not None:
+                index.close()
+    except (WhatIfError, PolicyMergeError, AccessIndexError, RecordFormatError, OSError) as exc:
+        payload = {"status": "error", "message": str(exc)}
+        if args.json:
+            sys.stdout.write(json.dumps(payload) + "\n")
+        else:
+            LOG.error("what-if failed: %s", exc)
+        return 2
+
+    summary = {
+        "status": "success",
+        "candidates": [entry.identifier for entry in candidates],
+        "replaces": [delta.entry.identifier for delta in removed],
+        "statements": [delta.statement for delta in added],
+        "corpusRecords": corpus_size if corpus_size is not None else report.scanned,
+        **report.to_json(),
+    }
+    if args.json:
+        sys.stdout.write(json.dumps(summary) + "\n")
+    else:
+        sys.stdout.write(
+            f"what-if {', '.join(summary['candidates'])}: newlyAllowed={report.newly_allowed} "
+            f"newlyDenied={report.newly_denied} touched={report.touched} scanned={report.scanned}/{summary['corpusRecords']} "
+            f"in {summary['elapsedMillis']}ms\n"
+        )
+        for label, items in (("allow", report.samples_allowed), ("deny", report.samples_denied)):
+            for record in items:
+                sys.stdout.write(
+                    f"  +{label} {record.get('eventTime')} {record.get('principalArn')} {record.get('action')} {record.get('resource')}\n"
+                )
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())